@@ -2,6 +2,9 @@
 ASGI config for app project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Besides the Django application it serves the household server-sent events
+stream, which needs long-lived connections. With `DEBUG` it also serves the
+static files, as `runserver` does.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
@@ -9,8 +12,16 @@ https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+if settings.DEBUG:
+    django_application = ASGIStaticFilesHandler(django_application)
+
+from household.sse import HouseholdEventsRouter  # noqa: E402
+
+application = HouseholdEventsRouter(django_application)
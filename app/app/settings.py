@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -40,13 +41,17 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework.authtoken',
-    'core',
+    'core.apps.CoreConfig',
     'app',
-    'household',
+    'household.apps.HouseholdConfig',
     'user',
+    'batch.apps.BatchConfig',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -91,6 +96,22 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+# Shared by all processes through memcached when CACHE_LOCATION is set,
+# e.g. "memcached:11211". The local memory fallback is private to each
+# process, so other processes miss entries cached by one of them.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ['CACHE_LOCATION'],
+    } if os.environ.get('CACHE_LOCATION') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -134,3 +155,72 @@ STATIC_ROOT = '/vol/web/static'
 MEDIA_ROOT = '/vol/web/media'
 
 AUTH_USER_MODEL = 'core.User'
+
+# Token authentication cache
+# Maximum number of tokens kept per process and seconds an entry is
+# trusted before it is resolved from the database again.
+AUTH_TOKEN_CACHE_SIZE = 1024
+AUTH_TOKEN_CACHE_TTL = 60
+
+# Household API
+# Maximum number of items accepted by a single bulk grocery request.
+GROCERY_BULK_MAX_BATCH_SIZE = 500
+# Rows fetched per server-side cursor round trip by the grocery export.
+GROCERY_EXPORT_CHUNK_SIZE = 2000
+# Seconds a serialized grocery or shopping list stays in the cache.
+HOUSEHOLD_LIST_CACHE_TIMEOUT = 300
+# Number of recent events kept per household to resume event streams, and
+# seconds between keepalive comments on an idle stream.
+HOUSEHOLD_EVENTS_BUFFER_SIZE = 100
+HOUSEHOLD_EVENTS_KEEPALIVE = 15
+# Seconds the recent events of a household without subscribers are kept
+# after its last event.
+HOUSEHOLD_EVENTS_REPLAY_WINDOW = 300
+# Seconds a ticket opening the event stream from a URL stays valid.
+HOUSEHOLD_EVENTS_TICKET_MAX_AGE = 60
+# Seconds the delta-sync cursor trails the clock, so changes committed
+# late by slower transactions are sent again instead of missed.
+HOUSEHOLD_SYNC_CURSOR_LAG = 5
+
+# Batch API
+# Maximum number of sub-requests run by a single batch request.
+BATCH_MAX_REQUESTS = 20
+
+# Request timing
+# Send a Server-Timing header and log the SQL, authentication, view and
+# rendering times of every request. The header reveals timings to
+# clients, so enable it only where that is acceptable.
+SERVER_TIMING = os.environ.get('SERVER_TIMING') == '1'
+
+# Profiling
+# Fraction of requests profiled with cProfile, and a secret that profiles
+# any request sending it in an `X-Profile` header. Profiles are
+# aggregated per endpoint into a directory per window of
+# PROFILE_INTERVAL seconds, keeping the newest PROFILE_KEEP windows.
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_KEY = os.environ.get('PROFILE_KEY', '')
+PROFILE_DIR = os.environ.get('PROFILE_DIR',
+                             os.path.join(tempfile.gettempdir(), 'profiles'))
+PROFILE_INTERVAL = 3600
+PROFILE_KEEP = 24
+
+# Metrics
+# Record request, query and cache metrics served at /metrics. Every
+# process writes its own file in METRICS_DIR, which should be emptied
+# when the server is restarted. When METRICS_TOKEN is set, scrapers must
+# send it as a bearer token.
+METRICS = os.environ.get('METRICS') == '1'
+METRICS_DIR = os.environ.get('METRICS_DIR',
+                             os.path.join(tempfile.gettempdir(), 'metrics'))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.middleware': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
@@ -16,8 +16,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from core.views import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/users/', include('user.urls')),
-    path('api/household/', include('household.urls'))
+    path('api/household/', include('household.urls')),
+    path('api/batch/', include('batch.urls')),
+    path('metrics', metrics, name='metrics'),
 ]
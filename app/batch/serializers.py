@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import serializers
+
+
+class SubRequestSerializer(serializers.Serializer):
+    """Serializer to one request of a batch."""
+    method = serializers.ChoiceField(
+        choices=('GET', 'POST', 'PUT', 'PATCH', 'DELETE'))
+    path = serializers.CharField(max_length=2048)
+    body = serializers.JSONField(required=False)
+
+
+class BatchSerializer(serializers.ListSerializer):
+    """Serializer to the ordered requests of a batch."""
+    default_error_messages = {
+        'max_requests': _('Ensure this batch has no more than '
+                          '{max_requests} requests.'),
+    }
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('child', SubRequestSerializer())
+        kwargs.setdefault('allow_empty', False)
+        super().__init__(*args, **kwargs)
+
+    def to_internal_value(self, data):
+        max_requests = settings.BATCH_MAX_REQUESTS
+        if isinstance(data, list) and len(data) > max_requests:
+            self.fail('max_requests', max_requests=max_requests)
+
+        return super().to_internal_value(data)
@@ -0,0 +1,135 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from core.authentication import CachedTokenAuthentication, token_cache
+from core.models import Grocery
+from core.tests.query_budgets import QueryBudgetClient
+
+
+BATCH_URL = reverse('batch:batch')
+ME_URL = reverse('user:me')
+SHOPPING_LIST_URL = reverse('household:shoppinglist-list')
+EXPORT_URL = reverse('household:grocery-export')
+
+
+def get_grocery_adjust_url(grocery_id):
+    return reverse('household:grocery-adjust', args=[grocery_id])
+
+
+class PublicBatchApiTests(TestCase):
+    """Tests the publicly available batch API."""
+
+    def test_login_required(self):
+        """Tests that login is required to run a batch."""
+        res = QueryBudgetClient().post(BATCH_URL, [
+            {'method': 'GET', 'path': ME_URL},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBatchApiTests(TestCase):
+    """Tests the authorized user batch API."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='TestPass123',
+            name='Test User',
+            household='Test Household'
+        )
+        self.client = QueryBudgetClient()
+        self.client.force_authenticate(self.user)
+        self.grocery = Grocery.objects.create(name='Milk', quantity=1,
+                                              household=self.user.household)
+
+    def test_batch_runs_requests_in_order(self):
+        """Tests running user and household requests in one call."""
+        res = self.client.post(BATCH_URL, [
+            {'method': 'PATCH', 'path': ME_URL, 'body': {'name': 'New'}},
+            {'method': 'POST', 'path': get_grocery_adjust_url(
+                self.grocery.id), 'body': {'delta': 2}},
+            {'method': 'POST', 'path': SHOPPING_LIST_URL,
+             'body': {'name': 'Eggs', 'quantity': 6}},
+            {'method': 'GET', 'path': f'{SHOPPING_LIST_URL}?page_size=1'},
+        ], format='json')
+        self.user.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([response['status'] for response in res.data],
+                         [200, 200, 201, 200])
+        self.assertEqual(res.data[1]['body'],
+                         {'id': self.grocery.id, 'quantity': 3})
+        self.assertEqual(res.data[3]['body']['results'][0]['name'], 'Eggs')
+        self.assertEqual(self.user.name, 'New')
+
+    def test_failed_request_rolls_back_batch(self):
+        """Tests that a failing request rolls back the whole batch."""
+        res = self.client.post(BATCH_URL, [
+            {'method': 'POST', 'path': get_grocery_adjust_url(
+                self.grocery.id), 'body': {'delta': 2}},
+            {'method': 'POST', 'path': get_grocery_adjust_url(
+                self.grocery.id + 1), 'body': {'delta': 2}},
+            {'method': 'PATCH', 'path': ME_URL, 'body': {'name': 'New'}},
+        ], format='json')
+        self.grocery.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([response['status'] for response in res.data],
+                         [200, 404])
+        self.assertEqual(self.grocery.quantity, 1)
+
+    def test_unknown_route_fails(self):
+        """Tests that only user and household routes can be batched."""
+        for path in ('/admin/', BATCH_URL, '/api/unknown/'):
+            res = self.client.post(BATCH_URL, [
+                {'method': 'GET', 'path': path},
+            ], format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(res.data[0]['status'],
+                             status.HTTP_404_NOT_FOUND)
+
+    def test_streaming_route_fails(self):
+        """Tests that streamed responses are rejected instead of empty."""
+        res = self.client.post(BATCH_URL, [
+            {'method': 'GET', 'path': f'{EXPORT_URL}?format=jsonl'},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0]['status'],
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Streaming', res.data[0]['body']['detail'])
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_batch_size_limit(self):
+        """Tests that batches over the configured size are rejected."""
+        res = self.client.post(BATCH_URL, [
+            {'method': 'GET', 'path': ME_URL},
+        ] * 3, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_authenticates_once(self):
+        """Tests that sub-requests reuse the batch authentication."""
+        token_cache.clear()
+        token = Token.objects.create(user=self.user)
+        client = QueryBudgetClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        authenticate = CachedTokenAuthentication.authenticate_credentials
+        with patch.object(CachedTokenAuthentication,
+                          'authenticate_credentials',
+                          autospec=True,
+                          side_effect=authenticate) as mock:
+            res = client.post(BATCH_URL, [
+                {'method': 'GET', 'path': ME_URL},
+            ] * 3, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock.call_count, 1)
@@ -0,0 +1,110 @@
+import io
+import json
+from urllib.parse import urlsplit
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.http import Http404
+from django.urls import Resolver404, resolve
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from batch.serializers import BatchSerializer
+from core.authentication import CachedTokenAuthentication
+
+
+# URL namespaces a batch may dispatch to.
+BATCH_NAMESPACES = ('user', 'household')
+# Headers of the batch request that do not apply to its sub-requests.
+IGNORED_HEADERS = ('CONTENT_TYPE', 'CONTENT_LENGTH', 'QUERY_STRING',
+                   'HTTP_IF_NONE_MATCH', 'HTTP_IF_MATCH',
+                   'HTTP_IF_MODIFIED_SINCE', 'HTTP_IF_UNMODIFIED_SINCE')
+
+
+class BatchFailed(Exception):
+    """Raised to roll back a batch after a failed sub-request."""
+
+
+class BatchView(APIView):
+    """Run an ordered list of API requests in one transaction.
+
+    The caller is authenticated once and every sub-request is dispatched
+    in-process to the user and household views. The first failing
+    sub-request rolls back the whole batch and ends it, its response
+    being the last one returned.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        responses = []
+        try:
+            with transaction.atomic():
+                for sub_request in serializer.validated_data:
+                    response = self.dispatch_sub_request(request,
+                                                         **sub_request)
+                    responses.append(response)
+                    if response['status'] >= 400:
+                        raise BatchFailed()
+        except BatchFailed:
+            return Response(responses, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(responses)
+
+    def dispatch_sub_request(self, request, method, path, body=None):
+        """Run one request against its view and return its response."""
+        url = urlsplit(path)
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            match = None
+        if match is None or match.namespace not in BATCH_NAMESPACES:
+            return {'status': status.HTTP_404_NOT_FOUND,
+                    'body': {'detail': _('Not found.')}}
+
+        sub_request = self.build_sub_request(request, method, url, body)
+        sub_request.resolver_match = match
+        try:
+            response = match.func(sub_request, *match.args, **match.kwargs)
+        except Http404:
+            return {'status': status.HTTP_404_NOT_FOUND,
+                    'body': {'detail': _('Not found.')}}
+        if response.streaming:
+            # The body is generated while sent and has no data to embed.
+            # The response is not closed, as that would end the request
+            # and close its database connection mid-batch.
+            return {'status': status.HTTP_400_BAD_REQUEST,
+                    'body': {'detail': _('Streaming responses cannot be '
+                                         'batched.')}}
+
+        return {'status': response.status_code,
+                'body': getattr(response, 'data', None)}
+
+    def build_sub_request(self, request, method, url, body):
+        """Build a request sharing the batch request's authentication."""
+        content = b'' if body is None else json.dumps(body).encode()
+        environ = {key: value for key, value in request.META.items()
+                   if key not in IGNORED_HEADERS}
+        environ.update({
+            'REQUEST_METHOD': method,
+            'PATH_INFO': url.path,
+            'SCRIPT_NAME': '',
+            'wsgi.url_scheme': request.scheme,
+            'QUERY_STRING': url.query,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(content)),
+            'wsgi.input': io.BytesIO(content),
+        })
+        sub_request = WSGIRequest(environ)
+        # Picked up by DRF instead of running the authenticators again.
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+
+        return sub_request
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core.metrics import record_cache
+from core.timing import measure
+
+
+class TokenCache:
+    """Thread safe LRU of authenticated `(user, token)` pairs.
+
+    The cache is local to the process. Entries are evicted from signal
+    handlers when the token, the user or the household changes, and the
+    TTL bounds how long another process may serve a stale entry.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached pair for `key`, or None if missing/expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Store the pair for `key`, evicting the least recently used."""
+        expires = time.monotonic() + settings.AUTH_TOKEN_CACHE_TTL
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def evict(self, key):
+        """Remove the entry for a single token key."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def evict_matching(self, predicate):
+        """Remove every entry whose user matches `predicate`."""
+        with self._lock:
+            stale = [key for key, (expires, (user, token))
+                     in self._entries.items() if predicate(user)]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the user and their household.
+
+    A cache miss resolves token, user and household in one joined query.
+    """
+
+    def authenticate(self, request):
+        with measure('auth'):
+            return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        record_cache('token', cached is not None)
+        if cached is not None:
+            return cached
+
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user__household').get(
+                key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+
+        token_cache.set(key, (token.user, token))
+
+        return (token.user, token)
@@ -0,0 +1,79 @@
+import pstats
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import list_profiles
+
+
+SORT_KEYS = ('cumulative', 'tottime', 'calls')
+
+
+class Command(BaseCommand):
+    """Django command to merge and summarize the profiled requests.
+
+    Merges the pstats files written by `ProfilingMiddleware` per
+    endpoint, lists the endpoints by their total profiled time and
+    prints the top functions of each.
+    """
+    help = 'Merge and summarize the profiles of sampled requests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Profile directory, defaults to '
+                                          'PROFILE_DIR.')
+        parser.add_argument('-k', '--filter', default='',
+                            help='Only endpoints containing this text, '
+                                 'e.g. "grocery-list.POST".')
+        parser.add_argument('--hours', type=float,
+                            help='Only windows started in the last '
+                                 'hours.')
+        parser.add_argument('--sort', choices=SORT_KEYS,
+                            default='cumulative')
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Functions printed per endpoint, 0 for '
+                                 'only the endpoint summary.')
+        parser.add_argument('--output', help='Write the merged stats of '
+                                             'the endpoints to this file, '
+                                             'e.g. for snakeviz.')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['hours'] is not None:
+            since = time.time() - options['hours'] * 3600
+        profiles = list_profiles(options['dir'] or settings.PROFILE_DIR,
+                                 since=since)
+        stats = {
+            endpoint: self.merge(paths)
+            for endpoint, paths in profiles.items()
+            if options['filter'] in endpoint
+        }
+        if not stats:
+            raise CommandError('No profiles found.')
+
+        endpoints = sorted(stats, key=lambda name: stats[name].total_tt,
+                           reverse=True)
+        self.stdout.write(f'{"Endpoint":<50} {"Files":>5} {"Time (s)":>9}')
+        for endpoint in endpoints:
+            self.stdout.write(f'{endpoint:<50} {len(profiles[endpoint]):>5} '
+                              f'{stats[endpoint].total_tt:>9.3f}')
+
+        if options['limit']:
+            for endpoint in endpoints:
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f'\n{endpoint}'))
+                stats[endpoint].stream = self.stdout
+                stats[endpoint].sort_stats(options['sort']).print_stats(
+                    options['limit'])
+
+        if options['output']:
+            merged = stats[endpoints[0]]
+            for endpoint in endpoints[1:]:
+                merged.add(stats[endpoint])
+            merged.dump_stats(options['output'])
+
+    def merge(self, paths):
+        try:
+            return pstats.Stats(*paths, stream=self.stdout)
+        except (OSError, EOFError, ValueError, TypeError) as exc:
+            raise CommandError(f'Reading the profiles failed: {exc}')
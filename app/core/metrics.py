@@ -0,0 +1,301 @@
+"""Request, query and cache metrics shared by all server processes.
+
+Every process adds to its own file in `METRICS_DIR`, mapped into memory,
+so recording a sample never waits on another process. Scraping reads
+the files without locking and sums them: counters of exited processes
+are kept, gauges only count live processes.
+"""
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+
+
+# Metric names with their type and help text.
+METRICS = {
+    'http_requests_total': (
+        'counter', 'Requests by URL name, method and status.'),
+    'http_request_duration_seconds': (
+        'histogram', 'Request latency by URL name and method.'),
+    'http_requests_in_flight': (
+        'gauge', 'Requests being processed.'),
+    'db_queries_total': (
+        'counter', 'Database queries by URL name and method.'),
+    'db_query_duration_seconds_total': (
+        'counter', 'Time spent in database queries by URL name and method.'),
+    'cache_requests_total': (
+        'counter', 'Cache lookups by cache and result.'),
+    'cache_hit_ratio': (
+        'gauge', 'Fraction of cache lookups that were hits.'),
+}
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5,
+                    0.75, 1.0, 2.5, 5.0, 7.5, 10.0, math.inf)
+
+FILE_PREFIX = 'metrics.'
+FILE_SUFFIX = '.db'
+HEADER = struct.Struct('<Q')
+KEY_LENGTH = struct.Struct('<I')
+VALUE = struct.Struct('<d')
+
+
+class MetricsFile:
+    """Float values by key in a file mapped into memory.
+
+    The file starts with the number of bytes used, followed by entries
+    of a key length, the key padded to 8 bytes and the value. A single
+    process writes the file; entries are complete before the used size
+    covers them, so other processes can read it at any time.
+    """
+
+    def __init__(self, path, size=64 * 1024):
+        self.path = path
+        self._file = open(path, 'a+b')
+        self._map = None
+        self._offsets = {}
+        self._map_file(max(size, os.fstat(self._file.fileno()).st_size))
+
+        data = self._map[:]
+        self.used = HEADER.unpack_from(data)[0] or HEADER.size
+        for key, value, offset in iter_entries(data, self.used):
+            self._offsets[key] = offset
+
+    def _map_file(self, size):
+        if self._map is not None:
+            self._map.close()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def inc(self, key, amount=1.0):
+        offset = self._offsets.get(key)
+        if offset is None:
+            self._append(key, amount)
+        else:
+            value = VALUE.unpack_from(self._map, offset)[0]
+            VALUE.pack_into(self._map, offset, value + amount)
+
+    def _append(self, key, value):
+        encoded = key.encode()
+        padded = padded_length(KEY_LENGTH.size + len(encoded))
+        end = self.used + padded + VALUE.size
+        if end > len(self._map):
+            self._map_file(max(end, 2 * len(self._map)))
+
+        KEY_LENGTH.pack_into(self._map, self.used, len(encoded))
+        start = self.used + KEY_LENGTH.size
+        self._map[start:start + len(encoded)] = encoded
+        VALUE.pack_into(self._map, end - VALUE.size, value)
+        self._offsets[key] = end - VALUE.size
+        self.used = end
+        HEADER.pack_into(self._map, 0, end)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class MetricsStore:
+    """The metrics file of the current process, reopened after a fork."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._file = None
+        self._owner = None
+
+    def get_file(self):
+        owner = (os.getpid(), settings.METRICS_DIR)
+        if self._owner != owner:
+            if self._file is not None:
+                self._file.close()
+            os.makedirs(settings.METRICS_DIR, exist_ok=True)
+            self._file = MetricsFile(os.path.join(
+                settings.METRICS_DIR, f'{FILE_PREFIX}{owner[0]}{FILE_SUFFIX}'
+            ))
+            self._owner = owner
+        return self._file
+
+    def inc(self, name, amount=1.0, **labels):
+        key = get_key(name, labels)
+        with self._lock:
+            self.get_file().inc(key, amount)
+
+    def observe(self, name, value, **labels):
+        """Add a sample to a histogram with `DURATION_BUCKETS`.
+
+        Buckets are stored non-cumulative, one increment per sample.
+        """
+        le = next(bound for bound in DURATION_BUCKETS if value <= bound)
+        with self._lock:
+            file = self.get_file()
+            file.inc(get_key(f'{name}_bucket', dict(labels, le=le)))
+            file.inc(get_key(f'{name}_sum', labels), value)
+            file.inc(get_key(f'{name}_count', labels))
+
+
+store = MetricsStore()
+
+
+def record_cache(cache, hit):
+    """Count a cache lookup when metrics are enabled."""
+    if settings.METRICS:
+        store.inc('cache_requests_total', cache=cache,
+                  result='hit' if hit else 'miss')
+
+
+def get_key(name, labels):
+    return json.dumps([name, sorted(labels.items())])
+
+
+def padded_length(length):
+    return (length + 7) // 8 * 8
+
+
+def iter_entries(data, used):
+    """Yield the key, value and value offset of each entry."""
+    position = HEADER.size
+    while position < used:
+        length = KEY_LENGTH.unpack_from(data, position)[0]
+        start = position + KEY_LENGTH.size
+        key = bytes(data[start:start + length]).decode()
+        offset = position + padded_length(KEY_LENGTH.size + length)
+        yield key, VALUE.unpack_from(data, offset)[0], offset
+        position = offset + VALUE.size
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect(directory):
+    """Return the values of all processes summed by name and labels."""
+    values = {}
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return values
+
+    for name in names:
+        if not (name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX)):
+            continue
+        try:
+            pid = int(name[len(FILE_PREFIX):-len(FILE_SUFFIX)])
+            with open(os.path.join(directory, name), 'rb') as file:
+                data = file.read()
+        except (ValueError, OSError):
+            continue
+        if len(data) < HEADER.size:
+            continue
+
+        alive = None
+        used = min(HEADER.unpack_from(data)[0], len(data))
+        for key, value, _ in iter_entries(data, used):
+            metric, labels = json.loads(key)
+            if get_type(metric) == 'gauge':
+                if alive is None:
+                    alive = is_alive(pid)
+                if not alive:
+                    continue
+            key = (metric, tuple(tuple(label) for label in labels))
+            values[key] = values.get(key, 0.0) + value
+
+    return values
+
+
+def get_type(metric):
+    for suffix in ('_bucket', '_sum', '_count'):
+        if metric.endswith(suffix) and metric[:-len(suffix)] in METRICS:
+            return METRICS[metric[:-len(suffix)]][0]
+    return METRICS[metric][0]
+
+
+def add_derived(values):
+    """Add cumulative histogram buckets and the cache hit ratios."""
+    derived = {}
+    buckets = {}
+    lookups = {}
+    for (metric, labels), value in values.items():
+        if metric.endswith('_bucket'):
+            le = dict(labels)['le']
+            series = tuple(label for label in labels if label[0] != 'le')
+            buckets.setdefault((metric, series), {})[le] = value
+        else:
+            derived[(metric, labels)] = value
+        if metric == 'cache_requests_total':
+            cache, result = dict(labels)['cache'], dict(labels)['result']
+            counts = lookups.setdefault(cache, [0.0, 0.0])
+            counts[result == 'hit'] += value
+
+    for (metric, series), counts in buckets.items():
+        total = 0.0
+        for bound in DURATION_BUCKETS:
+            total += counts.get(bound, 0.0)
+            labels = tuple(sorted(series + (('le', bound),)))
+            derived[(metric, labels)] = total
+    for cache, (misses, hits) in lookups.items():
+        derived[('cache_hit_ratio', (('cache', cache),))] = \
+            hits / (hits + misses) if hits + misses else 0.0
+
+    return derived
+
+
+def render(values):
+    """Render values in the Prometheus text exposition format."""
+    values = add_derived(values)
+    families = {}
+    for (metric, labels), value in values.items():
+        family = metric
+        for suffix in ('_bucket', '_sum', '_count'):
+            if metric.endswith(suffix) and metric[:-len(suffix)] in METRICS:
+                family = metric[:-len(suffix)]
+        families.setdefault(family, []).append((metric, labels, value))
+
+    lines = []
+    for family in METRICS:
+        if family not in families and family != 'http_requests_in_flight':
+            continue
+        kind, description = METRICS[family]
+        lines.append(f'# HELP {family} {description}')
+        lines.append(f'# TYPE {family} {kind}')
+        samples = families.get(family) or [(family, (), 0.0)]
+        for metric, labels, value in sorted(samples, key=sort_key):
+            lines.append(f'{metric}{format_labels(labels)} '
+                         f'{format_value(value)}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def sort_key(sample):
+    metric, labels, _ = sample
+    return metric, [(value, 0.0) if isinstance(value, str) else ('', value)
+                    for _, value in labels]
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(format_value(value))}"'
+                          for name, value in labels) + '}'
+
+
+def format_value(value):
+    if isinstance(value, str):
+        return value
+    if value == math.inf:
+        return '+Inf'
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n') \
+                .replace('"', '\\"')
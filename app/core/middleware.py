@@ -0,0 +1,179 @@
+import cProfile
+import hmac
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core.metrics import store
+from core.profiling import ProfileStore, get_endpoint
+from core.timing import RequestTiming, timing_request
+
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """Records the count, latency and queries of requests by URL name.
+
+    The samples are served by the `/metrics` endpoint. The middleware
+    removes itself unless `METRICS` is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        store.inc('http_requests_in_flight')
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timing))
+                response = self.get_response(request)
+        finally:
+            store.inc('http_requests_in_flight', -1)
+
+        match = request.resolver_match
+        labels = {
+            'view': match.view_name if match else 'unresolved',
+            'method': request.method,
+        }
+        store.inc('http_requests_total', status=str(response.status_code),
+                  **labels)
+        store.observe('http_request_duration_seconds',
+                      time.perf_counter() - timing.started, **labels)
+        store.inc('db_queries_total', timing.queries, **labels)
+        store.inc('db_query_duration_seconds_total', timing.sql, **labels)
+
+        return response
+
+
+class ServerTimingMiddleware:
+    """Times the SQL, authentication, view and rendering of each request.
+
+    The durations are sent in a `Server-Timing` header and logged as one
+    JSON line per request. Authentication runs inside the view, so
+    `view` excludes it; `db` overlaps both. The middleware removes
+    itself unless `SERVER_TIMING` is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        request.timing = timing
+        with timing_request(timing), ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing))
+            response = self.get_response(request)
+        if 'view' not in timing.durations and hasattr(timing, 'view_started'):
+            self.view_finished(timing)
+        timing.add('total', time.perf_counter() - timing.started)
+
+        response['Server-Timing'] = format_header(timing)
+        logger.info(json.dumps(get_fields(request, response, timing)))
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timing.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        timing = request.timing
+        self.view_finished(timing)
+        started = time.perf_counter()
+
+        def rendered(response):
+            timing.add('render', time.perf_counter() - started)
+        response.add_post_render_callback(rendered)
+
+        return response
+
+    def view_finished(self, timing):
+        seconds = time.perf_counter() - timing.view_started
+        timing.add('view', seconds - timing.durations.get('auth', 0.0))
+
+
+class ProfilingMiddleware:
+    """Profiles a sample of requests with cProfile.
+
+    A `PROFILE_SAMPLE_RATE` fraction of requests is profiled, as is every
+    request whose `X-Profile` header matches `PROFILE_KEY`. The profiles
+    are aggregated per endpoint into `PROFILE_DIR`, to be read with the
+    `profile_stats` command. One request per process is profiled at a
+    time, sampled requests arriving meanwhile are not profiled. The
+    middleware removes itself unless sampling or the key is configured.
+    """
+
+    def __init__(self, get_response):
+        if not (settings.PROFILE_SAMPLE_RATE > 0 or settings.PROFILE_KEY):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.store = ProfileStore(settings.PROFILE_DIR,
+                                  interval=settings.PROFILE_INTERVAL,
+                                  keep=settings.PROFILE_KEEP)
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        requested = self.is_requested(request)
+        if not requested and random.random() >= settings.PROFILE_SAMPLE_RATE:
+            return self.get_response(request)
+        if not self.lock.acquire(blocking=requested):
+            return self.get_response(request)
+
+        try:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            self.store.add(get_endpoint(request), profiler)
+        finally:
+            self.lock.release()
+
+        return response
+
+    def is_requested(self, request):
+        """Return whether the request asks to be profiled."""
+        key = request.headers.get('X-Profile')
+        return bool(key and settings.PROFILE_KEY and
+                    hmac.compare_digest(key.encode(),
+                                        settings.PROFILE_KEY.encode()))
+
+
+def format_header(timing):
+    metrics = [f'db;dur={timing.sql * 1000:.1f};desc="{timing.queries} '
+               f'queries"']
+    metrics += [f'{name};dur={seconds * 1000:.1f}'
+                for name, seconds in timing.durations.items()]
+    return ', '.join(metrics)
+
+
+def get_fields(request, response, timing):
+    """Return the fields of the request log line."""
+    match = request.resolver_match
+    fields = {
+        'method': request.method,
+        'path': request.path,
+        'route': match.view_name if match else None,
+        'status': response.status_code,
+        'queries': timing.queries,
+        'db_ms': round(timing.sql * 1000, 2),
+    }
+    for name, seconds in timing.durations.items():
+        fields[f'{name}_ms'] = round(seconds * 1000, 2)
+
+    return fields
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_auto_20210301_2152'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='grocery',
+            index=models.Index(fields=['household', 'id'], name='grocery_household_id_idx'),
+        ),
+    ]
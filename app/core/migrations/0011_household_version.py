@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_grocery_household_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='household',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
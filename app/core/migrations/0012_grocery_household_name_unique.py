@@ -0,0 +1,82 @@
+from django.db import migrations
+
+
+# Merge groceries sharing a household and case-insensitive name into the
+# oldest one: quantities are summed up to the integer column maximum, list
+# memberships are moved over and the duplicates are deleted, all with
+# set-based statements.
+MERGE_DUPLICATES_SQL = [
+    '''
+    CREATE TEMPORARY TABLE grocery_merge ON COMMIT DROP AS
+    SELECT id, keeper_id, total_quantity FROM (
+        SELECT id,
+               first_value(id) OVER w AS keeper_id,
+               LEAST(sum(quantity::bigint) OVER w_all, 2147483647)
+                   AS total_quantity,
+               count(*) OVER w_all AS duplicates
+        FROM core_grocery
+        WINDOW w AS (PARTITION BY household_id, lower(name) ORDER BY id),
+               w_all AS (PARTITION BY household_id, lower(name))
+    ) AS groups
+    WHERE duplicates > 1
+    ''',
+    '''
+    UPDATE core_grocery
+    SET quantity = grocery_merge.total_quantity
+    FROM grocery_merge
+    WHERE core_grocery.id = grocery_merge.id
+      AND grocery_merge.id = grocery_merge.keeper_id
+    ''',
+    '''
+    INSERT INTO core_household_grocery_list (household_id, grocery_id)
+    SELECT DISTINCT list.household_id, grocery_merge.keeper_id
+    FROM core_household_grocery_list AS list
+    JOIN grocery_merge ON list.grocery_id = grocery_merge.id
+    WHERE grocery_merge.id <> grocery_merge.keeper_id
+    ON CONFLICT DO NOTHING
+    ''',
+    '''
+    INSERT INTO core_household_shopping_list (household_id, grocery_id)
+    SELECT DISTINCT list.household_id, grocery_merge.keeper_id
+    FROM core_household_shopping_list AS list
+    JOIN grocery_merge ON list.grocery_id = grocery_merge.id
+    WHERE grocery_merge.id <> grocery_merge.keeper_id
+    ON CONFLICT DO NOTHING
+    ''',
+    '''
+    DELETE FROM core_household_grocery_list AS list
+    USING grocery_merge
+    WHERE list.grocery_id = grocery_merge.id
+      AND grocery_merge.id <> grocery_merge.keeper_id
+    ''',
+    '''
+    DELETE FROM core_household_shopping_list AS list
+    USING grocery_merge
+    WHERE list.grocery_id = grocery_merge.id
+      AND grocery_merge.id <> grocery_merge.keeper_id
+    ''',
+    '''
+    DELETE FROM core_grocery
+    USING grocery_merge
+    WHERE core_grocery.id = grocery_merge.id
+      AND grocery_merge.id <> grocery_merge.keeper_id
+    ''',
+    # Run the deferred foreign key checks before the index is created.
+    'SET CONSTRAINTS ALL IMMEDIATE',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_household_version'),
+    ]
+
+    operations = [
+        migrations.RunSQL(MERGE_DUPLICATES_SQL, migrations.RunSQL.noop),
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX grocery_household_name_uniq '
+            'ON core_grocery (household_id, lower(name))',
+            'DROP INDEX grocery_household_name_uniq',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_grocery_household_name_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='grocery',
+            name='state',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'None'), (1, 'Grocery list'), (2, 'Shopping list')], default=0),
+        ),
+    ]
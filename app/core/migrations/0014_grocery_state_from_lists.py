@@ -0,0 +1,79 @@
+from django.db import migrations, transaction
+
+
+BATCH_SIZE = 10000
+GROCERY_LIST = 1
+SHOPPING_LIST = 2
+
+# Copy list membership of one grocery id range onto the state column.
+# Rows of another household's list are ignored and a grocery on both
+# lists ends up on the shopping list.
+FORWARD_SQL = '''
+    UPDATE core_grocery AS grocery SET state = lists.state
+    FROM (
+        SELECT household_id, grocery_id, max(state) AS state FROM (
+            SELECT household_id, grocery_id, %s AS state FROM {grocery_list}
+            UNION ALL
+            SELECT household_id, grocery_id, %s AS state FROM {shopping_list}
+        ) AS memberships
+        WHERE grocery_id >= %s AND grocery_id < %s
+        GROUP BY household_id, grocery_id
+    ) AS lists
+    WHERE grocery.id = lists.grocery_id
+      AND grocery.household_id = lists.household_id
+'''
+
+BACKWARD_SQL = '''
+    INSERT INTO {list_table} (household_id, grocery_id)
+    SELECT household_id, id FROM core_grocery
+    WHERE state = %s AND id >= %s AND id < %s
+'''
+
+
+def get_list_tables(apps):
+    Household = apps.get_model('core', 'Household')
+    return (Household.grocery_list.through._meta.db_table,
+            Household.shopping_list.through._meta.db_table)
+
+
+def run_in_batches(schema_editor, statements):
+    """Run the statements once per grocery id range, one transaction each."""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT min(id), max(id) FROM core_grocery')
+        min_id, max_id = cursor.fetchone()
+    if min_id is None:
+        return
+
+    for start in range(min_id, max_id + 1, BATCH_SIZE):
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                for sql, params in statements:
+                    cursor.execute(sql, params + [start, start + BATCH_SIZE])
+
+
+def lists_to_state(apps, schema_editor):
+    grocery_list, shopping_list = get_list_tables(apps)
+    sql = FORWARD_SQL.format(grocery_list=grocery_list,
+                             shopping_list=shopping_list)
+    run_in_batches(schema_editor, [(sql, [GROCERY_LIST, SHOPPING_LIST])])
+
+
+def state_to_lists(apps, schema_editor):
+    grocery_list, shopping_list = get_list_tables(apps)
+    run_in_batches(schema_editor, [
+        (BACKWARD_SQL.format(list_table=grocery_list), [GROCERY_LIST]),
+        (BACKWARD_SQL.format(list_table=shopping_list), [SHOPPING_LIST]),
+    ])
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0013_grocery_state'),
+    ]
+
+    operations = [
+        migrations.RunPython(lists_to_state, state_to_lists),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.1.14 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_grocery_state_from_lists'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='household',
+            name='grocery_list',
+        ),
+        migrations.RemoveField(
+            model_name='household',
+            name='shopping_list',
+        ),
+        migrations.AddIndex(
+            model_name='grocery',
+            index=models.Index(fields=['household', 'state', 'id'], name='grocery_household_state_idx'),
+        ),
+    ]
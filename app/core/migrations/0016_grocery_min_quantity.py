@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_remove_household_lists'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='grocery',
+            name='min_quantity',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
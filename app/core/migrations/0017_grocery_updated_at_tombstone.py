@@ -0,0 +1,38 @@
+# Generated by Django 3.1.14 on 2026-10-18 15:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_grocery_min_quantity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='grocery',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='grocery',
+            index=models.Index(fields=['household', 'updated_at'], name='grocery_household_updated_idx'),
+        ),
+        migrations.CreateModel(
+            name='GroceryTombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grocery_id', models.IntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+                ('household', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.household')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='grocerytombstone',
+            index=models.Index(fields=['household', 'deleted_at'], name='tombstone_household_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_grocery_updated_at_tombstone'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            CREATE SEQUENCE core_household_version_seq;
+            SELECT setval('core_household_version_seq',
+                          COALESCE(MAX(version), 0) + 1, false)
+            FROM core_household;
+            """,
+            'DROP SEQUENCE core_household_version_seq;'
+        ),
+    ]
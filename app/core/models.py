@@ -1,14 +1,157 @@
-from django.db import models
+from collections import defaultdict
+
+from django.db import connection, models
+from django.db.models import Prefetch
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Lower
+from django.dispatch import Signal
+from django.utils import timezone
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import AbstractBaseUser, \
                                        BaseUserManager, \
                                        PermissionsMixin
 
+# Sent with the household id, the new list state and a dict mapping every
+# moved grocery id to its previous state whenever list membership changes.
+list_changed = Signal()
+
+# Largest quantity the integer column stores; quantities added up in SQL
+# are computed as bigint and capped at it.
+MAX_QUANTITY = 2147483647
+
+
+class ListState(models.IntegerChoices):
+    """The household list a grocery is on, named after the list field."""
+    NONE = 0, 'None'
+    GROCERY_LIST = 1, 'Grocery list'
+    SHOPPING_LIST = 2, 'Shopping list'
+
+
+class HouseholdList:
+    """Manager-like access to the groceries on one household list.
+
+    A grocery is on at most one list, so adding it to a list moves it
+    off the other one. Each change runs a single UPDATE of the state
+    column; other queryset methods are delegated to `get_queryset()`.
+    """
+
+    def __init__(self, household, state):
+        self.household = household
+        self.state = state
+
+    @staticmethod
+    def prefetch(queryset=None):
+        """Return a Prefetch of both lists for a household queryset.
+
+        The groceries of both lists are fetched with one query and split
+        by state; `queryset` must load the state.
+        """
+        if queryset is None:
+            queryset = Grocery.objects.all()
+        return Prefetch(
+            'grocery_set',
+            queryset=queryset.filter(state__in=(ListState.GROCERY_LIST,
+                                                ListState.SHOPPING_LIST)),
+            to_attr='prefetched_lists'
+        )
+
+    def get_queryset(self):
+        return Grocery.objects.filter(household=self.household,
+                                      state=self.state).order_by('id')
+
+    def all(self):
+        """Return the prefetched groceries, or a queryset of the list."""
+        prefetched = getattr(self.household, 'prefetched_lists', None)
+        if prefetched is not None:
+            return [grocery for grocery in prefetched
+                    if grocery.state == self.state]
+        return self.get_queryset()
+
+    def __getattr__(self, name):
+        return getattr(self.get_queryset(), name)
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def add(self, *objs):
+        """Move groceries of the household onto the list."""
+        self._move(self.state, [obj.pk for obj in objs])
+
+    def remove(self, *objs):
+        """Take groceries off the list."""
+        self._move(ListState.NONE, [obj.pk for obj in objs],
+                   from_state=self.state)
+
+    def clear(self):
+        self._move(ListState.NONE, from_state=self.state)
+
+    def add_low_stock(self):
+        """Move every grocery at or below its minimum quantity onto the list.
+
+        Returns the ids of the moved groceries.
+        """
+        return self._move(self.state, low_stock=True)
+
+    def set(self, objs):
+        """Replace the groceries on the list."""
+        ids = {obj.pk for obj in objs}
+        if hasattr(self.household, 'prefetched_lists'):
+            current = {grocery.pk for grocery in self.all()}
+        else:
+            current = set(self.get_queryset().values_list('id', flat=True))
+        if current - ids:
+            self._move(ListState.NONE, list(current - ids),
+                       from_state=self.state)
+        if ids - current:
+            self._move(self.state, list(ids - current))
+
+    def _move(self, state, ids=None, from_state=None, low_stock=False):
+        if ids is not None and not ids:
+            return []
+        moved = Grocery.objects.move(self.household.pk, state, ids,
+                                     from_state, low_stock)
+        # Prefetched lists are stale once groceries move between them.
+        self.household.__dict__.pop('prefetched_lists', None)
+        if moved:
+            list_changed.send(sender=Household,
+                              household_id=self.household.pk,
+                              state=state, moved=moved)
+
+        return list(moved)
+
 
 class Household(models.Model):
 
     name = models.CharField(max_length=255, unique=True)
-    grocery_list = models.ManyToManyField('Grocery', related_name='grocery')
-    shopping_list = models.ManyToManyField('Grocery', related_name='shopping')
+    # Set with an UPDATE on every change to the household's groceries,
+    # lists or users, never written by save(). Versions are drawn from a
+    # sequence, so a rolled back change never hands its version out
+    # again.
+    version = models.PositiveBigIntegerField(default=0)
+
+    version_sequence = 'core_household_version_seq'
+
+    @classmethod
+    def next_version(cls):
+        """Return an expression drawing a new version."""
+        return RawSQL(f"nextval('{cls.version_sequence}')", ())
+
+    def save(self, *args, **kwargs):
+        """Save the household without overwriting its version."""
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'version'
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def grocery_list(self):
+        return HouseholdList(self, ListState.GROCERY_LIST)
+
+    @property
+    def shopping_list(self):
+        return HouseholdList(self, ListState.SHOPPING_LIST)
 
 
 class UserManager(BaseUserManager):
@@ -21,7 +164,9 @@ class UserManager(BaseUserManager):
         if not password:
             password = self.make_random_password()
         user.set_password(password)
-        if household:
+        if isinstance(household, Household):
+            user.household = household
+        elif household:
             hh = Household.objects.get_or_create(name=household)[0]
             user.household = hh
             hh.save(using=self._db)
@@ -29,6 +174,18 @@ class UserManager(BaseUserManager):
 
         return user
 
+    def bulk_create_users(self, users, password, batch_size=None):
+        """Creates users sharing a password with batched INSERTs.
+
+        The password is hashed once for all users.
+        """
+        encoded = make_password(password)
+        for user in users:
+            user.email = self.normalize_email(user.email)
+            user.password = encoded
+
+        return self.bulk_create(users, batch_size=batch_size)
+
     def create_superuser(self, email, password, household=''):
         """Creates and saves a new superuser."""
         user = self.create_user(email, password, household)
@@ -58,12 +215,237 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+class GroceryManager(models.Manager):
+    """Custom Grocery Manager with helper functions."""
+    def adjust_quantity(self, pk, household_id, delta):
+        """Adds delta to the quantity in a single UPDATE.
+
+        The quantity stays between zero and `MAX_QUANTITY`. Returns the
+        new quantity, or None if the grocery does not exist in the
+        household.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {self.model._meta.db_table} '
+                'SET quantity = LEAST(GREATEST(quantity::bigint + %s, 0), '
+                '                     %s), '
+                '    updated_at = %s '
+                'WHERE id = %s AND household_id = %s '
+                'RETURNING quantity',
+                [delta, MAX_QUANTITY, timezone.now(), pk, household_id]
+            )
+            row = cursor.fetchone()
+
+        return row[0] if row else None
+
+    def checkout(self, household_id, bought):
+        """Moves bought groceries from the shopping to the grocery list.
+
+        `bought` maps grocery ids to bought quantities, which are added to
+        the grocery quantities, capped at `MAX_QUANTITY`. Only groceries
+        on the household shopping list are moved, all in a single UPDATE
+        whatever the number of groceries. Returns the moved groceries.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {self.model._meta.db_table} AS grocery '
+                'SET state = %s, updated_at = %s, '
+                '    quantity = LEAST(grocery.quantity::bigint '
+                '                     + bought.quantity, %s) '
+                'FROM unnest(%s::bigint[], %s::integer[]) '
+                '    AS bought (id, quantity) '
+                'WHERE grocery.id = bought.id '
+                '  AND grocery.household_id = %s '
+                '  AND grocery.state = %s '
+                'RETURNING grocery.id, grocery.name, grocery.quantity',
+                [ListState.GROCERY_LIST, timezone.now(), MAX_QUANTITY,
+                 list(bought), list(bought.values()), household_id,
+                 ListState.SHOPPING_LIST]
+            )
+            rows = cursor.fetchall()
+
+        return [self.model(id=pk, name=name, quantity=quantity,
+                           household_id=household_id,
+                           state=ListState.GROCERY_LIST)
+                for pk, name, quantity in rows]
+
+    def move(self, household_id, state, ids=None, from_state=None,
+             low_stock=False):
+        """Moves household groceries to a list in a single UPDATE.
+
+        Only the groceries in `ids` and on the `from_state` list are
+        moved, if given, and with `low_stock` only those at or below
+        their minimum quantity. Returns a dict mapping the moved grocery
+        ids to their previous state.
+        """
+        table = self.model._meta.db_table
+        conditions = ''
+        params = [state, timezone.now(), household_id, state]
+        if ids is not None:
+            conditions += ' AND grocery.id = ANY(%s)'
+            params.append(list(ids))
+        if from_state is not None:
+            conditions += ' AND grocery.state = %s'
+            params.append(from_state)
+        if low_stock:
+            conditions += ' AND grocery.quantity <= grocery.min_quantity'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} AS grocery '
+                'SET state = %s, updated_at = %s '
+                f'FROM {table} AS old '
+                'WHERE old.id = grocery.id '
+                '  AND grocery.household_id = %s '
+                f'  AND grocery.state <> %s{conditions} '
+                'RETURNING grocery.id, old.state',
+                params
+            )
+            return dict(cursor.fetchall())
+
+    def delete_recorded(self, household_id, ids):
+        """Deletes household groceries and records their tombstones.
+
+        The DELETE and the tombstone INSERT run as a single statement.
+        Returns the ids of the deleted groceries.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'WITH deleted AS ('
+                f'    DELETE FROM {self.model._meta.db_table}'
+                '    WHERE household_id = %s AND id = ANY(%s)'
+                '    RETURNING id, household_id'
+                ') '
+                f'INSERT INTO {GroceryTombstone._meta.db_table} '
+                '(grocery_id, household_id, deleted_at) '
+                'SELECT id, household_id, %s FROM deleted '
+                'RETURNING grocery_id',
+                [household_id, list(ids), timezone.now()]
+            )
+            return [pk for pk, in cursor.fetchall()]
+
+    def filter_names(self, household_id, names):
+        """Returns household groceries matching names case-insensitively."""
+        return self.annotate(name_lower=Lower('name')).filter(
+            household_id=household_id,
+            name_lower__in=[name.lower() for name in names]
+        )
+
+    def upsert(self, groceries):
+        """Inserts groceries, adding to the quantity of existing ones.
+
+        Groceries are matched on household and case-insensitive name by
+        the unique index, all in a single INSERT ... ON CONFLICT. Existing
+        groceries are moved to the given list state unless it is
+        `ListState.NONE`, sending `list_changed` for the groceries put on
+        a list. Summed quantities are capped at `MAX_QUANTITY`. Returns
+        the saved groceries in the order of the given attribute dicts.
+        """
+        if not groceries:
+            return []
+
+        merged = {}
+        for attrs in groceries:
+            key = (attrs['household_id'], attrs['name'].lower())
+            if key in merged:
+                merged[key]['quantity'] = min(
+                    merged[key]['quantity'] + attrs['quantity'],
+                    MAX_QUANTITY)
+            else:
+                merged[key] = dict(attrs)
+
+        table = self.model._meta.db_table
+        now = timezone.now()
+        values = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(merged))
+        params = [value for attrs in merged.values()
+                  for value in (attrs['name'], attrs['quantity'],
+                                attrs.get('min_quantity'),
+                                attrs['household_id'],
+                                attrs.get('state', ListState.NONE), now)]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} '
+                '(name, quantity, min_quantity, household_id, state, '
+                ' updated_at) '
+                f'VALUES {values} '
+                'ON CONFLICT (household_id, lower(name)) DO UPDATE '
+                f'SET quantity = LEAST({table}.quantity::bigint '
+                '                      + EXCLUDED.quantity, %s), '
+                '    min_quantity = COALESCE(EXCLUDED.min_quantity, '
+                f'                            {table}.min_quantity), '
+                '    updated_at = EXCLUDED.updated_at, '
+                '    state = CASE WHEN EXCLUDED.state = %s '
+                f'                 THEN {table}.state '
+                '                 ELSE EXCLUDED.state END '
+                'RETURNING id, name, quantity, min_quantity, household_id, '
+                '          state, updated_at, '
+                # Subqueries see the table as before the statement.
+                f'          (SELECT old.state FROM {table} AS old '
+                f'           WHERE old.id = {table}.id)',
+                params + [MAX_QUANTITY, ListState.NONE]
+            )
+            rows = cursor.fetchall()
+
+        saved = {}
+        moved = defaultdict(dict)
+        for (pk, name, quantity, min_quantity, household_id, state,
+             updated_at, previous) in rows:
+            saved[(household_id, name.lower())] = self.model(
+                id=pk, name=name, quantity=quantity,
+                min_quantity=min_quantity, household_id=household_id,
+                state=state, updated_at=updated_at)
+            if state != ListState.NONE and state != previous:
+                moved[(household_id, state)][pk] = \
+                    ListState.NONE if previous is None else previous
+        for (household_id, state), household_moved in moved.items():
+            list_changed.send(sender=Household, household_id=household_id,
+                              state=state, moved=household_moved)
+
+        return [saved[(attrs['household_id'], attrs['name'].lower())]
+                for attrs in groceries]
+
+
 class Grocery(models.Model):
     """Custom grocery item."""
     name = models.CharField(max_length=100)
     quantity = models.PositiveIntegerField()
+    # Restocking puts the grocery on the shopping list at or below this.
+    min_quantity = models.PositiveIntegerField(null=True, blank=True)
     household = models.ForeignKey(to=Household,
                                   on_delete=models.CASCADE)
+    state = models.PositiveSmallIntegerField(choices=ListState.choices,
+                                             default=ListState.NONE)
+    # Also set by every raw UPDATE of GroceryManager, always from the
+    # application clock that sync cursors are taken from.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = GroceryManager()
+
+    # Unique index on the household and lowercased name.
+    name_index = 'grocery_household_name_uniq'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['household', 'id'],
+                         name='grocery_household_id_idx'),
+            models.Index(fields=['household', 'state', 'id'],
+                         name='grocery_household_state_idx'),
+            models.Index(fields=['household', 'updated_at'],
+                         name='grocery_household_updated_idx'),
+        ]
 
     def __str__(self):
         return f'{self.name}: {self.quantity}'
+
+
+class GroceryTombstone(models.Model):
+    """Record of a deleted grocery, kept for delta syncs."""
+    grocery_id = models.IntegerField()
+    household = models.ForeignKey(to=Household,
+                                  on_delete=models.CASCADE)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['household', 'deleted_at'],
+                         name='tombstone_household_idx'),
+        ]
@@ -0,0 +1,92 @@
+import os
+import pstats
+import re
+import shutil
+import threading
+import time
+
+
+PROFILE_SUFFIX = '.prof'
+
+
+class ProfileStore:
+    """Aggregates profiles per endpoint into a rotating directory.
+
+    Each window of `interval` seconds gets a directory named after its
+    start, holding one pstats file per endpoint and process, rewritten
+    after every profile added to it. Only the newest `keep` windows are
+    kept.
+    """
+
+    def __init__(self, directory, interval=3600, keep=24):
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        self.window = None
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def add(self, endpoint, profiler):
+        """Add a finished profile to the stats of `endpoint`."""
+        window = int(time.time() // self.interval * self.interval)
+        with self.lock:
+            if window != self.window:
+                self.window = window
+                self.stats = {}
+                os.makedirs(self.window_path(window), exist_ok=True)
+                self.rotate()
+
+            stats = self.stats.get(endpoint)
+            if stats is None:
+                stats = self.stats[endpoint] = pstats.Stats(profiler)
+            else:
+                stats.add(profiler)
+            stats.dump_stats(os.path.join(
+                self.window_path(window),
+                f'{endpoint}.{os.getpid()}{PROFILE_SUFFIX}'
+            ))
+
+    def window_path(self, window):
+        return os.path.join(self.directory, str(window))
+
+    def rotate(self):
+        """Remove all but the newest `keep` windows."""
+        for window in list_windows(self.directory)[:-self.keep]:
+            shutil.rmtree(self.window_path(window), ignore_errors=True)
+
+
+def get_endpoint(request):
+    """Return the file name safe endpoint of a request."""
+    match = request.resolver_match
+    name = match.view_name if match else 'unresolved'
+    return re.sub(r'[^\w.-]', '.', f'{name}.{request.method}')
+
+
+def list_windows(directory):
+    """Return the window start times in `directory`, oldest first."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(int(name) for name in names if name.isdigit())
+
+
+def list_profiles(directory, since=None):
+    """Return the pstats files in `directory` by endpoint.
+
+    Only windows starting at or after the timestamp `since` are read.
+    """
+    profiles = {}
+    for window in list_windows(directory):
+        if since is not None and window < since:
+            continue
+        path = os.path.join(directory, str(window))
+        for name in sorted(os.listdir(path)):
+            if not name.endswith(PROFILE_SUFFIX):
+                continue
+            endpoint = name[:-len(PROFILE_SUFFIX)].rpartition('.')[0]
+            profiles.setdefault(endpoint, []).append(
+                os.path.join(path, name)
+            )
+
+    return profiles
@@ -0,0 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from core.authentication import token_cache
+from core.models import Household
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    """Drop a deleted token from the authentication cache."""
+    token_cache.evict(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def evict_changed_user(sender, instance, **kwargs):
+    """Drop cached tokens of a changed, deactivated or deleted user."""
+    token_cache.evict_matching(lambda user: user.pk == instance.pk)
+
+
+@receiver(post_save, sender=Household)
+@receiver(post_delete, sender=Household)
+def evict_household_users(sender, instance, **kwargs):
+    """Drop cached tokens of users whose household changed."""
+    token_cache.evict_matching(
+        lambda user: user.household_id == instance.pk)
@@ -0,0 +1,136 @@
+"""Query budgets of the API routes, enforced by `QueryBudgetClient`.
+
+Every route and method has a maximum number of queries, optionally
+growing with the number of items a request sends or receives. Routes
+serving lists should have no per-item budget, so an N+1 query pattern
+fails the tests that use the client.
+"""
+import json
+from collections import namedtuple
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import Resolver404, resolve
+
+from rest_framework.test import APIClient
+
+
+QueryBudget = namedtuple('QueryBudget', ('queries', 'per_item'),
+                         defaults=(0,))
+
+# Budgets by (URL name, method), counted with cold caches. Cached token
+# authentication adds no queries once the token is cached.
+QUERY_BUDGETS = {
+    # Joining a household bumps its version.
+    ('user:create', 'POST'): QueryBudget(4),
+    ('user:token', 'POST'): QueryBudget(5),
+    ('user:me', 'GET'): QueryBudget(1),
+    ('user:me', 'POST'): QueryBudget(0),
+    # Changing the name or email bumps the household version.
+    ('user:me', 'PATCH'): QueryBudget(2),
+    # Version, household and both lists; expanding users adds one.
+    ('household:household-list', 'GET'): QueryBudget(3),
+    ('household:household-list', 'POST'): QueryBudget(5),
+    ('household:household-detail', 'GET'): QueryBudget(4),
+    ('household:household-detail', 'PUT'): QueryBudget(9),
+    ('household:household-detail', 'PATCH'): QueryBudget(5),
+    ('household:household-restock', 'POST'): QueryBudget(4),
+    ('household:grocery-list', 'GET'): QueryBudget(3),
+    # Grocery writes run in a savepoint to report name conflicts.
+    ('household:grocery-list', 'POST'): QueryBudget(7),
+    ('household:grocery-list', 'PATCH'): QueryBudget(8),
+    ('household:grocery-list', 'DELETE'): QueryBudget(4),
+    ('household:grocery-detail', 'GET'): QueryBudget(2),
+    ('household:grocery-detail', 'PUT'): QueryBudget(6),
+    ('household:grocery-detail', 'PATCH'): QueryBudget(6),
+    ('household:grocery-detail', 'DELETE'): QueryBudget(5),
+    ('household:grocery-adjust', 'POST'): QueryBudget(2),
+    ('household:grocery-export', 'GET'): QueryBudget(2),
+    ('household:grocerylist-list', 'GET'): QueryBudget(2),
+    ('household:grocerylist-list', 'POST'): QueryBudget(7),
+    ('household:shoppinglist-list', 'GET'): QueryBudget(2),
+    ('household:shoppinglist-list', 'POST'): QueryBudget(7),
+    ('household:shoppinglist-checkout', 'POST'): QueryBudget(4),
+    ('household:sync', 'GET'): QueryBudget(2),
+    ('household:events-ticket', 'POST'): QueryBudget(0),
+    ('household:cache-stats', 'GET'): QueryBudget(0),
+    # Grows with the number of sub-requests, each of which may bump the
+    # household version.
+    ('batch:batch', 'POST'): QueryBudget(3, per_item=3),
+    ('metrics', 'GET'): QueryBudget(0),
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a request runs more queries than its budget."""
+
+
+class QueryBudgetClient(APIClient):
+    """API client failing every request that exceeds its query budget.
+
+    The queries of streaming responses are counted by consuming the
+    content, which stays readable from `streaming_content`.
+    """
+    budgets = QUERY_BUDGETS
+
+    def generic(self, method, path, data='',
+                content_type='application/octet-stream', secure=False,
+                **extra):
+        self.sent_items = count_sent_items(data, content_type)
+        return super().generic(method, path, data, content_type, secure,
+                               **extra)
+
+    def request(self, **request):
+        with CaptureQueriesContext(connection) as queries:
+            response = super().request(**request)
+            if response.streaming:
+                content = b''.join(response.streaming_content)
+                response.streaming_content = [content]
+        items = max(getattr(self, 'sent_items', 0),
+                    count_received_items(response))
+        check_query_budget(request, queries.captured_queries, items,
+                           self.budgets)
+        return response
+
+
+def count_sent_items(data, content_type):
+    """Return the number of items in a JSON list payload."""
+    if not data or not content_type.startswith('application/json'):
+        return 0
+    try:
+        data = json.loads(data)
+    except ValueError:
+        return 0
+    return len(data) if isinstance(data, list) else 0
+
+
+def count_received_items(response):
+    """Return the number of items in a list or page response."""
+    data = getattr(response, 'data', None)
+    if isinstance(data, dict):
+        data = data.get('results')
+    return len(data) if isinstance(data, list) else 0
+
+
+def check_query_budget(request, queries, items, budgets=QUERY_BUDGETS):
+    """Fail with the executed SQL if a request exceeded its budget."""
+    method = request['REQUEST_METHOD']
+    path = request['PATH_INFO']
+    try:
+        view_name = resolve(path).view_name
+    except Resolver404:
+        return
+
+    budget = budgets.get((view_name, method))
+    if budget is None:
+        raise QueryBudgetExceeded(
+            f'No query budget for {method} {view_name}, add one to '
+            f'QUERY_BUDGETS.')
+
+    limit = budget.queries + budget.per_item * items
+    if len(queries) > limit:
+        sql = '\n'.join(f'{number}. {query["sql"]}'
+                        for number, query in enumerate(queries, start=1))
+        raise QueryBudgetExceeded(
+            f'{method} {path} ({view_name}) ran {len(queries)} queries, '
+            f'the budget is {limit} for {items} items:\n{sql}')
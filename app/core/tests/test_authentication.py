@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from core.authentication import token_cache
+from core.models import Household
+from core.tests.query_budgets import QueryBudgetClient
+
+
+ME_URL = reverse('user:me')
+GROCERY_URL = reverse('household:grocery-list')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Tests the cached token authentication."""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='TestPass123',
+            name='Test User',
+            household='Test Household'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = QueryBudgetClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_authentication_cached(self):
+        """Tests that only the first request queries the token."""
+        with self.assertNumQueries(3):
+            res = self.client.get(GROCERY_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        # The household version and the groceries.
+        with self.assertNumQueries(2):
+            res = self.client.get(GROCERY_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_invalid_token_fails(self):
+        """Tests that an unknown token is rejected."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_evicted(self):
+        """Tests that a deleted token is no longer accepted."""
+        self.client.get(ME_URL)
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_evicted(self):
+        """Tests that a deactivated user is no longer authenticated."""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_household_change_evicted(self):
+        """Tests that a changed household is picked up."""
+        self.client.get(ME_URL)
+        household = Household.objects.create(name='Other Household')
+        self.user.household = household
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['household'], household.id)
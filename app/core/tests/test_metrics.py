@@ -0,0 +1,175 @@
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from core.authentication import token_cache
+from core.metrics import HEADER, MetricsFile, collect, get_key, \
+                         iter_entries, render, store
+from core.tests.query_budgets import QueryBudgetClient
+
+
+METRICS_URL = reverse('metrics')
+GROCERY_URL = reverse('household:grocery-list')
+LIST_URL = reverse('household:grocerylist-list')
+
+# A process id above the kernel limit, so never alive.
+DEAD_PID = 2 ** 22 + 1
+
+
+def get_samples(text):
+    """Return the samples of an exposition by name and labels."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, _, value = line.rpartition(' ')
+            samples[name] = float(value)
+
+    return samples
+
+
+def read_values(path):
+    """Return the values of a metrics file by key."""
+    with open(path, 'rb') as file:
+        data = file.read()
+    return {key: value for key, value, _
+            in iter_entries(data, HEADER.unpack_from(data)[0])}
+
+
+class MetricsStoreTests(SimpleTestCase):
+    """Tests the file backed metrics store."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_file_values(self):
+        """Tests reopening and growing a metrics file."""
+        path = os.path.join(self.directory, 'metrics.1.db')
+        file = MetricsFile(path, size=64)
+        for number in range(10):
+            file.inc(f'key-{number}', number)
+        file.inc('key-9', 0.5)
+        file.close()
+
+        file = MetricsFile(path)
+        file.inc('key-9')
+        file.close()
+        values = read_values(path)
+
+        self.assertEqual(values['key-0'], 0)
+        self.assertEqual(values['key-9'], 10.5)
+
+    def test_collect_processes(self):
+        """Tests summing counters of all and gauges of live processes."""
+        with override_settings(METRICS_DIR=self.directory):
+            store.inc('http_requests_in_flight')
+            store.inc('cache_requests_total', cache='token', result='hit')
+        dead = MetricsFile(os.path.join(self.directory,
+                                        f'metrics.{DEAD_PID}.db'))
+        dead.inc(get_key('http_requests_in_flight', {}), 5)
+        dead.inc(get_key('cache_requests_total',
+                         {'cache': 'token', 'result': 'miss'}), 3)
+        dead.close()
+
+        samples = get_samples(render(collect(self.directory)))
+
+        self.assertEqual(samples['http_requests_in_flight'], 1)
+        self.assertEqual(samples['cache_requests_total{cache="token",'
+                                 'result="miss"}'], 3)
+        self.assertEqual(samples['cache_hit_ratio{cache="token"}'], 0.25)
+
+    def test_histogram(self):
+        """Tests rendering cumulative histogram buckets."""
+        with override_settings(METRICS_DIR=self.directory):
+            for seconds in (0.001, 0.02, 0.02, 20):
+                store.observe('http_request_duration_seconds', seconds,
+                              view='a"b', method='GET')
+
+        text = render(collect(self.directory))
+        samples = get_samples(text)
+        labels = 'method="GET",view="a\\"b"'
+
+        self.assertEqual(samples[f'http_request_duration_seconds_bucket'
+                                 f'{{le="0.005",{labels}}}'], 1)
+        self.assertEqual(samples[f'http_request_duration_seconds_bucket'
+                                 f'{{le="0.025",{labels}}}'], 3)
+        self.assertEqual(samples[f'http_request_duration_seconds_bucket'
+                                 f'{{le="+Inf",{labels}}}'], 4)
+        self.assertEqual(samples[f'http_request_duration_seconds_count'
+                                 f'{{{labels}}}'], 4)
+        self.assertLess(text.index('le="0.005"'), text.index('le="+Inf"'))
+
+
+class MetricsEndpointTests(TestCase):
+    """Tests recording and serving the metrics."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.settings = override_settings(METRICS=True,
+                                          METRICS_DIR=directory.name)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        token_cache.clear()
+        cache.clear()
+
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='TestPass123',
+            household='Test Household'
+        )
+        token = Token.objects.create(user=self.user)
+        token_cache.set(token.key, (self.user, token))
+        self.client = QueryBudgetClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_metrics(self):
+        """Tests serving the request, query and cache metrics."""
+        self.client.get(LIST_URL)
+        self.client.get(LIST_URL)
+        self.client.get(GROCERY_URL)
+
+        res = self.client.get(METRICS_URL)
+        samples = get_samples(res.content.decode())
+        labels = 'method="GET",view="household:grocerylist-list"'
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        self.assertEqual(samples['http_requests_total{method="GET",'
+                                 'status="200",'
+                                 'view="household:grocerylist-list"}'], 2)
+        self.assertEqual(samples[f'http_request_duration_seconds_count'
+                                 f'{{{labels}}}'], 2)
+        self.assertGreater(samples[f'db_queries_total{{{labels}}}'], 0)
+        self.assertEqual(samples['http_requests_in_flight'], 1)
+        self.assertEqual(samples['cache_hit_ratio{cache="token"}'], 1)
+        self.assertEqual(samples['cache_requests_total{cache="household_list",'
+                                 'result="hit"}'], 1)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        """Tests that scraping requires the configured token."""
+        res = self.client.get(METRICS_URL)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer secret')
+        res_authorized = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res_authorized.status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS=False)
+    def test_metrics_disabled(self):
+        """Tests that the endpoint is missing when disabled."""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
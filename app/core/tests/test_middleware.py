@@ -0,0 +1,159 @@
+import cProfile
+import json
+import os
+import pstats
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from core.authentication import token_cache
+from core.profiling import ProfileStore, list_profiles, list_windows
+from core.tests.query_budgets import QueryBudgetClient
+
+
+GROCERY_URL = reverse('household:grocery-list')
+EXPORT_URL = reverse('household:grocery-export')
+
+
+@override_settings(SERVER_TIMING=True)
+class ServerTimingMiddlewareTests(TestCase):
+    """Tests the Server-Timing middleware."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='TestPass123',
+            household='Test Household'
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = QueryBudgetClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_server_timing(self):
+        """Tests timing the phases of a request and logging them."""
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            res = self.client.get(GROCERY_URL)
+
+        metrics = [metric.split(';')[0]
+                   for metric in res['Server-Timing'].split(', ')]
+        fields = json.loads(logs.records[0].getMessage())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(metrics, ['db', 'auth', 'view', 'render', 'total'])
+        self.assertEqual(fields['route'], 'household:grocery-list')
+        self.assertEqual(fields['status'], 200)
+        self.assertEqual(fields['queries'], 3)
+        self.assertGreaterEqual(fields['total_ms'], fields['view_ms'])
+
+    def test_server_timing_streaming(self):
+        """Tests timing a streaming response without rendering."""
+        self.client.force_authenticate(self.user)
+        with self.assertLogs('core.middleware', 'INFO'):
+            res = self.client.get(EXPORT_URL)
+
+        self.assertIn('view;dur=', res['Server-Timing'])
+        self.assertNotIn('render', res['Server-Timing'])
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        """Tests that no timing is sent when disabled."""
+        res = self.client.get(GROCERY_URL)
+
+        self.assertNotIn('Server-Timing', res)
+
+
+class ProfilingMiddlewareTests(TestCase):
+    """Tests the profiling middleware and the profile_stats command."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.settings = override_settings(PROFILE_DIR=self.directory,
+                                          PROFILE_KEY='secret')
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='TestPass123',
+            household='Test Household'
+        )
+        self.client = QueryBudgetClient()
+        self.client.force_authenticate(self.user)
+
+    def test_profile_requested(self):
+        """Tests aggregating the requests profiled by header per endpoint."""
+        self.client.get(GROCERY_URL, HTTP_X_PROFILE='secret')
+        self.client.get(GROCERY_URL, HTTP_X_PROFILE='secret')
+        self.client.get(EXPORT_URL, HTTP_X_PROFILE='secret')
+
+        profiles = list_profiles(self.directory)
+        stats = pstats.Stats(*profiles['household.grocery-list.GET'])
+
+        self.assertEqual(set(profiles), {'household.grocery-list.GET',
+                                         'household.grocery-export.GET'})
+        self.assertEqual(len(profiles['household.grocery-list.GET']), 1)
+        self.assertIn(2, [calls for _, calls, *_ in stats.stats.values()])
+
+    def test_profile_not_requested(self):
+        """Tests that requests with a wrong or no key are not profiled."""
+        self.client.get(GROCERY_URL, HTTP_X_PROFILE='wrong')
+        self.client.get(GROCERY_URL, HTTP_X_PROFILE='s\xe9cret')
+        self.client.get(GROCERY_URL)
+
+        self.assertEqual(list_profiles(self.directory), {})
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_profile_sampled(self):
+        """Tests profiling sampled requests."""
+        self.client = QueryBudgetClient()
+        self.client.force_authenticate(self.user)
+        self.client.get(GROCERY_URL)
+
+        self.assertIn('household.grocery-list.GET',
+                      list_profiles(self.directory))
+
+    def test_profile_rotation(self):
+        """Tests that only the newest windows are kept."""
+        for window in ('100', '200', '300'):
+            os.makedirs(os.path.join(self.directory, window))
+        store = ProfileStore(self.directory, keep=2)
+        profiler = cProfile.Profile()
+        profiler.runcall(sum, [1, 2])
+        store.add('test', profiler)
+
+        self.assertEqual(len(list_windows(self.directory)), 2)
+        self.assertEqual(list_windows(self.directory)[0], 300)
+
+    def test_profile_stats(self):
+        """Tests summarizing and merging the profiles."""
+        self.client.get(GROCERY_URL, HTTP_X_PROFILE='secret')
+        self.client.get(EXPORT_URL, HTTP_X_PROFILE='secret')
+        output = os.path.join(self.directory, 'merged.prof')
+        out = StringIO()
+
+        call_command('profile_stats', '-k', 'grocery-list', '--limit=5',
+                     f'--output={output}', stdout=out)
+
+        self.assertIn('household.grocery-list.GET', out.getvalue())
+        self.assertNotIn('household.grocery-export.GET', out.getvalue())
+        self.assertIn('function calls', out.getvalue())
+        self.assertGreater(pstats.Stats(output).total_tt, 0)
+
+    def test_profile_stats_no_profiles(self):
+        """Tests that summarizing fails without profiles."""
+        with self.assertRaises(CommandError):
+            call_command('profile_stats', stdout=StringIO())
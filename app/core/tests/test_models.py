@@ -1,7 +1,7 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
-from ..models import Household, Grocery
+from ..models import Household, Grocery, ListState
 
 
 def create_sample_user(email='test@test.com',
@@ -188,3 +188,22 @@ class ModelTests(TestCase):
         household.shopping_list.add(grocery3, grocery4)
 
         self.assertEqual(len(household.shopping_list.all()), 4)
+
+    def test_grocery_on_one_list_only(self):
+        """Tests that adding a grocery to a list moves it off the other."""
+        household = create_sample_household()
+        grocery = Grocery.objects.create(
+            name='Olive Oil',
+            quantity=2,
+            household=household
+        )
+        household.shopping_list.add(grocery)
+        household.grocery_list.add(grocery)
+
+        self.assertEqual(list(household.grocery_list.all()), [grocery])
+        self.assertFalse(household.shopping_list.exists())
+
+        household.grocery_list.remove(grocery)
+        grocery.refresh_from_db()
+
+        self.assertEqual(grocery.state, ListState.NONE)
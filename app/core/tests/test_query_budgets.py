@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import Grocery
+from core.tests.query_budgets import QueryBudget, QueryBudgetClient, \
+                                     QueryBudgetExceeded
+
+
+GROCERY_URL = reverse('household:grocery-list')
+
+
+class QueryBudgetClientTests(TestCase):
+    """Tests the query budget test client."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='TestPass123',
+            household='Test Household'
+        )
+        Grocery.objects.bulk_create([
+            Grocery(name=f'Test Grocery {i}', quantity=1,
+                    household=self.user.household) for i in range(3)
+        ])
+        self.client = QueryBudgetClient()
+        self.client.force_authenticate(self.user)
+
+    def test_budget_exceeded_fails_with_sql(self):
+        """Tests that exceeding the budget reports the queries."""
+        self.client.budgets = {('household:grocery-list', 'GET'):
+                               QueryBudget(1)}
+
+        with self.assertRaisesMessage(QueryBudgetExceeded,
+                                      'SELECT "core_grocery"."id"'):
+            self.client.get(GROCERY_URL)
+
+    def test_budget_per_item(self):
+        """Tests that the budget grows with the number of items."""
+        self.client.budgets = {('household:grocery-list', 'GET'):
+                               QueryBudget(0, per_item=1)}
+
+        res = self.client.get(GROCERY_URL)
+
+        self.assertEqual(len(res.data), 3)
+
+    def test_route_without_budget_fails(self):
+        """Tests that every route needs a budget."""
+        self.client.budgets = {}
+
+        with self.assertRaisesMessage(QueryBudgetExceeded,
+                                      'No query budget'):
+            self.client.get(GROCERY_URL)
@@ -0,0 +1,64 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+
+_current = contextvars.ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """Durations of the phases of one request and the SQL it ran.
+
+    Installed as a database execute wrapper, it counts and times every
+    query of the request.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.queries = 0
+        self.sql = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - started
+            self.queries += 1
+
+    def add(self, name, seconds):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+
+def get_request_timing():
+    """Return the timing of the current request, if it is measured."""
+    return _current.get()
+
+
+@contextmanager
+def timing_request(timing):
+    """Measure the phases run in this block into `timing`."""
+    token = _current.set(timing)
+    try:
+        yield timing
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def measure(name):
+    """Add the duration of the block to the phase `name`.
+
+    Costs one context variable lookup when the request is not measured.
+    """
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - started)
@@ -0,0 +1,26 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import require_GET
+
+from core.metrics import collect, render
+
+
+@require_GET
+def metrics(request):
+    """Serve the metrics of all processes in the Prometheus text format."""
+    if not settings.METRICS:
+        raise Http404()
+    if settings.METRICS_TOKEN:
+        scheme, _, token = request.headers.get('Authorization', '') \
+            .partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(
+                token.encode(), settings.METRICS_TOKEN.encode()):
+            response = HttpResponse(status=401)
+            response['WWW-Authenticate'] = 'Bearer'
+            return response
+
+    return HttpResponse(render(collect(settings.METRICS_DIR)),
+                        content_type='text/plain; version=0.0.4; '
+                                     'charset=utf-8')
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class HouseholdConfig(AppConfig):
     name = 'household'
+
+    def ready(self):
+        from household import signals  # noqa: F401
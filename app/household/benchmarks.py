@@ -0,0 +1,297 @@
+import statistics
+import time
+import tracemalloc
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from core.models import Grocery, Household, HouseholdList, ListState
+from household import serializers
+from household.views import HouseholdSyncView
+
+
+PASSWORD = 'benchmark password'
+# Number of groceries sent or touched by the bulk actions.
+BATCH_SIZE = 50
+
+
+class Benchmark:
+    """A named operation measured by `run_benchmark`.
+
+    `setup` builds the arguments of each call outside the measurement.
+    Operations that write run in a savepoint that is rolled back, so
+    every call starts from the same data.
+    """
+
+    def __init__(self, name, func, setup=None, writes=False):
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.writes = writes
+
+    def call(self, queries=False, trace=False):
+        """Run the operation once.
+
+        Return the elapsed seconds, the executed queries when `queries`
+        is set and the peak traced memory in bytes when `trace` is set.
+        """
+        args = self.setup() if self.setup else ()
+        # The query log is bounded, so a full one would stop counting.
+        reset_queries()
+        captured = CaptureQueriesContext(connection) if queries \
+            else nullcontext()
+        peak = None
+        with transaction.atomic(), captured:
+            if trace:
+                tracemalloc.start()
+            started = time.perf_counter()
+            self.func(*args)
+            elapsed = time.perf_counter() - started
+            if trace:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            if self.writes:
+                transaction.set_rollback(True)
+
+        return elapsed, len(captured) if queries else None, peak
+
+
+def run_benchmark(benchmark, min_time=0.5, min_calls=10, trace_calls=3):
+    """Call a benchmark repeatedly and return its statistics."""
+    benchmark.call()
+    queries = benchmark.call(queries=True)[1]
+
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < min_calls or \
+            time.perf_counter() - started < min_time:
+        timings.append(benchmark.call()[0])
+    peaks = [benchmark.call(trace=True)[2] for _ in range(trace_calls)]
+
+    median = statistics.median(timings)
+    return {
+        'calls': len(timings),
+        'mean_us': round(statistics.mean(timings) * 1e6, 1),
+        'median_us': round(median * 1e6, 1),
+        'min_us': round(min(timings) * 1e6, 1),
+        'ops_per_sec': round(1 / median, 1) if median else None,
+        'queries': queries,
+        'peak_alloc_kib': round(min(peaks) / 1024, 1) if peaks else None,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Compare results with a baseline of the same format.
+
+    Return `(name, change, regressed)` for every benchmark in both, where
+    `change` is the relative change of the median time. A benchmark
+    regressed if it got slower by more than `threshold` or runs more
+    queries.
+    """
+    compared = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if not old or not old.get('median_us'):
+            continue
+        change = result['median_us'] / old['median_us'] - 1
+        regressed = change > threshold or \
+            (result['queries'] or 0) > (old.get('queries') or 0)
+        compared.append((name, change, regressed))
+
+    return compared
+
+
+class BenchmarkData:
+    """Households, users and groceries the benchmarks run against.
+
+    The large household holds `groceries` groceries spread over both
+    lists, some of them at or below their minimum quantity.
+    """
+
+    def __init__(self, groceries):
+        User = get_user_model()
+        self.small = Household.objects.create(name='Benchmark small')
+        self.large = Household.objects.create(name='Benchmark large')
+        for household, count in ((self.small, 10), (self.large, groceries)):
+            Grocery.objects.bulk_create([
+                Grocery(name=f'Grocery {i}', quantity=i % 7,
+                        min_quantity=2 if i % 4 == 0 else None,
+                        state=i % len(ListState), household=household)
+                for i in range(count)
+            ])
+        self.user = User.objects.create_user('benchmark@example.com',
+                                             PASSWORD)
+        self.user.household = self.large
+        self.user.save()
+        self.token = Token.objects.create(user=self.user)
+        self.groceries = list(self.large.grocery_set.order_by('id'))
+        self.grocery = self.groceries[0]
+
+    def get_household(self, household, expand=()):
+        """Return the household prefetched like `HouseholdViewset`."""
+        groceries = Grocery.objects.order_by('id')
+        if not expand:
+            groceries = groceries.only('id', 'household_id', 'state')
+        queryset = Household.objects.prefetch_related(
+            HouseholdList.prefetch(groceries))
+        if 'users' in expand:
+            queryset = queryset.prefetch_related('user_set')
+        return queryset.get(pk=household.pk)
+
+    def ids(self, state=None, count=BATCH_SIZE):
+        return [grocery.pk for grocery in self.groceries
+                if state is None or grocery.state == state][:count]
+
+
+def get_host():
+    """Return a host name the requests can be built for."""
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*' and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+def get_serializer_benchmarks(data):
+    """Benchmarks of the grocery and household serializers."""
+    request = APIRequestFactory().get('/')
+    request.user = data.user
+    expand = set(serializers.HouseholdSerializer.expandable_fields)
+    small = data.get_household(data.small)
+    large = data.get_household(data.large)
+    expanded = data.get_household(data.large, expand)
+
+    def serialize(serializer_class, instance, **kwargs):
+        return lambda: serializer_class(instance, **kwargs).data
+
+    def validate_grocery():
+        serializer = serializers.GrocerySerializer(
+            data={'name': 'New grocery', 'quantity': 1},
+            context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+
+    return [
+        Benchmark('serializer.grocery',
+                  serialize(serializers.GrocerySerializer, data.grocery)),
+        Benchmark('serializer.grocery.many',
+                  serialize(serializers.GrocerySerializer, data.groceries,
+                            many=True)),
+        Benchmark('serializer.grocery.validate', validate_grocery),
+        Benchmark('serializer.household.small',
+                  serialize(serializers.HouseholdSerializer, small)),
+        Benchmark('serializer.household.large',
+                  serialize(serializers.HouseholdSerializer, large)),
+        Benchmark('serializer.household.expanded',
+                  serialize(serializers.HouseholdSerializer, expanded,
+                            context={'expand': expand})),
+    ]
+
+
+def get_view_benchmarks(data):
+    """Benchmarks of every household API action and the token view."""
+    factory = APIRequestFactory(SERVER_NAME=get_host())
+    auth = {'HTTP_AUTHORIZATION': f'Token {data.token.key}'}
+
+    def view(name, method, path, body=None, writes=False):
+        """Benchmark the view routed at `path` with fresh requests."""
+        match = resolve(urlsplit(path).path)
+        make_request = getattr(factory, method)
+
+        def setup():
+            return (make_request(path, body, format='json', **auth),)
+
+        def func(request):
+            response = match.func(request, *match.args, **match.kwargs)
+            if response.status_code >= 400:
+                raise AssertionError(f'{name} returned '
+                                     f'{response.status_code}: '
+                                     f'{response.data}')
+            if response.streaming:
+                b''.join(response.streaming_content)
+            else:
+                response.render()
+
+        return Benchmark(name, func, setup, writes)
+
+    households = reverse('household:household-list')
+    household = reverse('household:household-detail', args=[data.large.pk])
+    groceries = reverse('household:grocery-list')
+    grocery = reverse('household:grocery-detail', args=[data.grocery.pk])
+    sync = reverse('household:sync')
+    new_groceries = [{'name': f'New grocery {i}', 'quantity': 1}
+                     for i in range(BATCH_SIZE)]
+    # A client that is up to date, as no grocery changes after now.
+    cursor = HouseholdSyncView().format_cursor(timezone.now())
+
+    benchmarks = [
+        view('household.list', 'get', households),
+        view('household.retrieve', 'get', household),
+        view('household.retrieve.expanded', 'get',
+             household + '?expand=grocery_list,shopping_list,users'),
+        view('household.create', 'post', households,
+             {'name': 'Benchmark new', 'grocery_list': [],
+              'shopping_list': []}, writes=True),
+        view('household.update', 'put', household,
+             {'name': data.large.name,
+              'grocery_list': data.ids()[:BATCH_SIZE // 2],
+              'shopping_list': data.ids()[BATCH_SIZE // 2:]}, writes=True),
+        view('household.partial_update', 'patch', household,
+             {'name': 'Benchmark renamed'}, writes=True),
+        view('household.destroy', 'delete', household, writes=True),
+        view('household.restock', 'post', household + 'restock/',
+             writes=True),
+        view('grocery.list', 'get', groceries),
+        view('grocery.list.page', 'get', groceries + '?page_size=100'),
+        view('grocery.retrieve', 'get', grocery),
+        view('grocery.create', 'post', groceries, new_groceries[0],
+             writes=True),
+        view('grocery.create.bulk', 'post', groceries, new_groceries,
+             writes=True),
+        view('grocery.create.upsert', 'post', groceries + '?upsert=1',
+             [{'name': item.name, 'quantity': 1}
+              for item in data.groceries[:BATCH_SIZE]], writes=True),
+        view('grocery.update', 'put', grocery,
+             {'name': data.grocery.name, 'quantity': 3}, writes=True),
+        view('grocery.partial_update', 'patch', grocery, {'quantity': 3},
+             writes=True),
+        view('grocery.bulk_partial_update', 'patch', groceries,
+             [{'id': pk, 'quantity': 3} for pk in data.ids()], writes=True),
+        view('grocery.adjust', 'post', grocery + 'adjust/', {'delta': 1},
+             writes=True),
+        view('grocery.destroy', 'delete', grocery, writes=True),
+        view('grocery.bulk_destroy', 'delete', groceries, data.ids(),
+             writes=True),
+        view('grocery.export', 'get', groceries + 'export/'),
+    ]
+    for list_field in ('grocerylist', 'shoppinglist'):
+        path = reverse(f'household:{list_field}-list')
+        benchmarks += [
+            view(f'{list_field}.list', 'get', path),
+            view(f'{list_field}.create', 'post', path, new_groceries,
+                 writes=True),
+        ]
+    benchmarks += [
+        view('shoppinglist.checkout', 'post',
+             reverse('household:shoppinglist-checkout'),
+             [{'id': pk, 'quantity': 1}
+              for pk in data.ids(ListState.SHOPPING_LIST)], writes=True),
+        view('sync.full', 'get', sync),
+        view('sync.delta', 'get', f'{sync}?since={cursor}'),
+        view('auth.token', 'post', reverse('user:token'),
+             {'email': data.user.email, 'password': PASSWORD}),
+    ]
+
+    return benchmarks
+
+
+def get_benchmarks(data):
+    return get_serializer_benchmarks(data) + get_view_benchmarks(data)
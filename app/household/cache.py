@@ -0,0 +1,61 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.metrics import record_cache
+
+
+class HouseholdListCache:
+    """Per-household cache of serialized grocery and shopping lists.
+
+    Entries live in Django's default cache, keyed by the household
+    version the request read before loading the list. Every change draws
+    a new version, so writes never have to delete entries and a read
+    racing a write can only cache rows at least as new as its version.
+    Entries of old versions expire with the cache timeout. Hit and miss
+    counters are kept per process, and across processes by the metrics.
+    """
+    key_prefix = 'household-list'
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_key(self, household_id, version, list_field):
+        return f'{self.key_prefix}:{household_id}:{version}:{list_field}'
+
+    def get(self, household_id, version, list_field):
+        """Return the cached payload, or None on a miss."""
+        data = cache.get(self.get_key(household_id, version, list_field))
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        record_cache('household_list', data is not None)
+
+        return data
+
+    def set(self, household_id, version, list_field, data):
+        cache.set(self.get_key(household_id, version, list_field), data,
+                  settings.HOUSEHOLD_LIST_CACHE_TIMEOUT)
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / total if total else 0.0,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+list_cache = HouseholdListCache()
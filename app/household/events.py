@@ -0,0 +1,166 @@
+import asyncio
+import itertools
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import transaction
+
+
+class HouseholdEvent:
+    """A change to a household's groceries or lists."""
+
+    def __init__(self, event_id, household_id, event, action, ids):
+        self.id = event_id
+        self.household_id = household_id
+        self.event = event
+        self.action = action
+        self.ids = ids
+
+    def to_dict(self):
+        return {'action': self.action, 'ids': self.ids}
+
+
+class Subscription:
+    """Queue of events delivered to one connected client."""
+
+    def __init__(self, household_id, loop):
+        self.household_id = household_id
+        self.loop = loop
+        self.queue = asyncio.Queue(
+            maxsize=settings.HOUSEHOLD_EVENTS_BUFFER_SIZE)
+        self.overflowed = False
+
+    def deliver(self, event):
+        """Queue an event; runs on the subscriber's event loop."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class EventBuffer:
+    """Recent events of one household, numbered from 1.
+
+    Every buffer gets a new generation, so event ids stay unique when
+    the buffer of a household is dropped and created again.
+    """
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.sequence = 0
+        self.events = deque(maxlen=settings.HOUSEHOLD_EVENTS_BUFFER_SIZE)
+        self.published = time.monotonic()
+
+
+class HouseholdEventBroker:
+    """In-process publish/subscribe broker for household events.
+
+    Every household keeps a bounded buffer of recent events used to
+    resume a stream from `Last-Event-ID`. Buffers of households without
+    subscribers are dropped once their last event is older than
+    `HOUSEHOLD_EVENTS_REPLAY_WINDOW`. Event ids carry the broker epoch
+    and the buffer generation, so ids issued by another process, before
+    a restart or before the buffer was dropped are answered with a
+    reset.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._generations = itertools.count(1)
+        self._buffers = {}
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+        self._next_prune = 0.0
+
+    def publish(self, household_id, event, action, ids=()):
+        """Record an event and deliver it to every subscriber."""
+        with self._lock:
+            buffer = self._buffers.get(household_id)
+            if buffer is None:
+                buffer = self._buffers[household_id] = EventBuffer(
+                    next(self._generations))
+            buffer.sequence += 1
+            household_event = HouseholdEvent(
+                f'{self.epoch}-{buffer.generation}-{buffer.sequence}',
+                household_id, event, action, sorted(ids)
+            )
+            buffer.events.append((buffer.sequence, household_event))
+            buffer.published = time.monotonic()
+            subscriptions = list(self._subscriptions.get(household_id, ()))
+            self._prune()
+
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.deliver,
+                                                   household_event)
+
+        return household_event
+
+    def subscribe(self, household_id, last_event_id=None):
+        """Subscribe the running event loop to a household.
+
+        Returns the subscription and the events missed since
+        `last_event_id`, or None if they can no longer be replayed.
+        """
+        subscription = Subscription(household_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions[household_id].add(subscription)
+            missed = self._get_missed(household_id, last_event_id)
+
+        return subscription, missed
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions[subscription.household_id]
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.household_id]
+            self._prune()
+
+    def _prune(self):
+        """Drop expired buffers, scanning at most once per window."""
+        now = time.monotonic()
+        if now < self._next_prune:
+            return
+
+        window = settings.HOUSEHOLD_EVENTS_REPLAY_WINDOW
+        self._next_prune = now + window
+        expired = [household_id
+                   for household_id, buffer in self._buffers.items()
+                   if household_id not in self._subscriptions and
+                   buffer.published < now - window]
+        for household_id in expired:
+            del self._buffers[household_id]
+
+    def _get_missed(self, household_id, last_event_id):
+        if not last_event_id:
+            return []
+
+        parts = last_event_id.split('-')
+        if len(parts) != 3 or parts[0] != self.epoch or \
+                not (parts[1].isdigit() and parts[2].isdigit()):
+            return None
+
+        buffer = self._buffers.get(household_id)
+        if buffer is None or buffer.generation != int(parts[1]):
+            return None
+
+        sequence = int(parts[2])
+        if buffer.events[0][0] > sequence + 1:
+            return None
+
+        return [event for seq, event in buffer.events if seq > sequence]
+
+
+broker = HouseholdEventBroker()
+
+
+def publish_event(household_id, event, action, ids=()):
+    """Publish an event once the current transaction commits."""
+    if household_id is None:
+        return
+    ids = list(ids)
+    transaction.on_commit(
+        lambda: broker.publish(household_id, event, action, ids))
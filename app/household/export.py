@@ -0,0 +1,37 @@
+import json
+
+from rest_framework.utils import encoders
+
+
+def dumps(data):
+    """Encode data as compact JSON bytes."""
+    return json.dumps(data, cls=encoders.JSONEncoder, ensure_ascii=False,
+                      separators=(',', ':')).encode()
+
+
+def iter_json(rows):
+    """Yield the rows as the pieces of one JSON array."""
+    yield b'['
+    separator = b''
+    for row in rows:
+        yield separator + dumps(row)
+        separator = b','
+    yield b']'
+
+
+def iter_json_lines(rows):
+    """Yield the rows as JSON Lines."""
+    for row in rows:
+        yield dumps(row) + b'\n'
+
+
+def iter_chunks(pieces, size):
+    """Join pieces into chunks of `size` pieces for fewer writes."""
+    buffer = []
+    for piece in pieces:
+        buffer.append(piece)
+        if len(buffer) >= size:
+            yield b''.join(buffer)
+            buffer.clear()
+    if buffer:
+        yield b''.join(buffer)
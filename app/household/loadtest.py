@@ -0,0 +1,418 @@
+import http.client
+import json
+import math
+import queue
+import random
+import socket
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+
+PASSWORD = 'loadtest password'
+
+
+class LatencyHistogram:
+    """Latencies counted in logarithmic buckets.
+
+    Buckets start at 0.1ms with 20 per decade, so percentiles read from
+    the bucket bounds are at most 12% above the exact value while the
+    memory used does not grow with the number of requests.
+    """
+    MIN_SECONDS = 1e-4
+    BUCKETS_PER_DECADE = 20
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        index = 0
+        if seconds > self.MIN_SECONDS:
+            index = math.ceil(math.log10(seconds / self.MIN_SECONDS) *
+                              self.BUCKETS_PER_DECADE)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def upper_bound(self, index):
+        return self.MIN_SECONDS * 10 ** (index / self.BUCKETS_PER_DECADE)
+
+    def percentile(self, percent):
+        """Return the latency `percent` of the values are at or below."""
+        if not self.count:
+            return None
+
+        rank = math.ceil(self.count * percent / 100)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.upper_bound(index), self.max)
+
+    def to_dict(self):
+        """Return the summary and buckets in milliseconds."""
+        def ms(seconds):
+            return None if seconds is None else round(seconds * 1000, 2)
+
+        return {
+            'count': self.count,
+            'mean_ms': ms(self.total / self.count) if self.count else None,
+            'p50_ms': ms(self.percentile(50)),
+            'p95_ms': ms(self.percentile(95)),
+            'p99_ms': ms(self.percentile(99)),
+            'max_ms': ms(self.max),
+            'buckets': {str(ms(self.upper_bound(index))): count
+                        for index, count in sorted(self.buckets.items())},
+        }
+
+
+class EndpointStats:
+    """Latencies and errors of the requests to one endpoint."""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = {}
+
+    def add(self, seconds, error=None):
+        self.latency.add(seconds)
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        for error, count in other.errors.items():
+            self.errors[error] = self.errors.get(error, 0) + count
+
+    def to_dict(self):
+        errors = sum(self.errors.values())
+        return {
+            'requests': self.latency.count,
+            'errors': errors,
+            'error_rate': round(errors / self.latency.count, 4)
+            if self.latency.count else 0,
+            'error_types': {str(error): count
+                            for error, count in self.errors.items()},
+            **self.latency.to_dict(),
+        }
+
+
+class RequestFailed(Exception):
+    """Raised when a request of a flow fails, which ends the flow."""
+
+
+class Client:
+    """One simulated user of the API.
+
+    Every request opens a new connection unless `keep_alive` is set.
+    Requests are recorded per endpoint name in `stats` unless
+    `recording` is unset, as while the account is being set up.
+    """
+
+    def __init__(self, url, prefix, timeout=30, keep_alive=False):
+        parts = urlsplit(url)
+        connection_class = http.client.HTTPSConnection \
+            if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.netloc, timeout=timeout)
+        self.path_prefix = parts.path.rstrip('/')
+        self.prefix = prefix
+        self.keep_alive = keep_alive
+        self.stats = {}
+        self.recording = False
+        self.token = None
+        self.household_id = None
+        self.counter = 0
+
+    def unique(self, text):
+        self.counter += 1
+        return f'{self.prefix}-{text}{self.counter}'
+
+    def request(self, name, method, path, body=None, auth=True):
+        """Send a JSON request and return the decoded response body."""
+        headers = {'Accept': 'application/json'}
+        if not self.keep_alive:
+            headers['Connection'] = 'close'
+        if body is not None:
+            body = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        if auth and self.token:
+            headers['Authorization'] = f'Token {self.token}'
+
+        started = time.perf_counter()
+        try:
+            if self.connection.sock is None:
+                self.connect()
+            self.connection.request(method, self.path_prefix + path, body,
+                                    headers)
+            response = self.connection.getresponse()
+            content = response.read()
+            if not self.keep_alive:
+                self.connection.close()
+        except (OSError, http.client.HTTPException) as exc:
+            self.connection.close()
+            self.record(name, time.perf_counter() - started,
+                        type(exc).__name__)
+            raise RequestFailed(f'{name}: {exc!r}')
+
+        error = response.status if response.status >= 400 else None
+        self.record(name, time.perf_counter() - started, error)
+        if error is not None:
+            raise RequestFailed(f'{name}: HTTP {response.status}')
+
+        try:
+            return json.loads(content) if content else None
+        except ValueError:
+            raise RequestFailed(f'{name}: invalid JSON response')
+
+    def connect(self):
+        self.connection.connect()
+        # Headers and body are sent separately, which Nagle's algorithm
+        # would delay until the server acknowledges the headers.
+        self.connection.sock.setsockopt(socket.IPPROTO_TCP,
+                                        socket.TCP_NODELAY, 1)
+
+    def record(self, name, seconds, error):
+        if self.recording:
+            self.stats.setdefault(name, EndpointStats()).add(seconds, error)
+
+    def sign_up(self, household_id=None):
+        """Create a user, returning its email."""
+        email = self.unique('user') + '@example.com'
+        self.request('POST /api/users/create/', 'POST', '/api/users/create/',
+                     {'email': email, 'password': PASSWORD,
+                      'name': 'Load Test', 'household': household_id},
+                     auth=False)
+        return email
+
+    def log_in(self, email):
+        data = self.request('POST /api/users/token/', 'POST',
+                            '/api/users/token/',
+                            {'email': email, 'password': PASSWORD},
+                            auth=False)
+        return data['token']
+
+    def set_up(self):
+        """Create the user and household the flows run as."""
+        self.email = self.sign_up()
+        self.token = self.log_in(self.email)
+        household = self.request(
+            'POST /api/household/household/', 'POST',
+            '/api/household/household/',
+            {'name': self.unique('household'), 'grocery_list': [],
+             'shopping_list': []}
+        )
+        self.household_id = household['id']
+        self.request('PATCH /api/users/me/', 'PATCH', '/api/users/me/',
+                     {'household': self.household_id})
+
+
+def signup_flow(client, rng):
+    """A new member joins the household and logs in."""
+    email = client.sign_up(client.household_id)
+    client.log_in(email)
+
+
+def token_flow(client, rng):
+    client.log_in(client.email)
+
+
+def read_lists_flow(client, rng):
+    """Open the app: the household and both lists."""
+    client.request('GET /api/household/household/{id}/', 'GET',
+                   f'/api/household/household/{client.household_id}/')
+    client.request('GET /api/household/grocerylist/', 'GET',
+                   '/api/household/grocerylist/')
+    client.request('GET /api/household/shoppinglist/', 'GET',
+                   '/api/household/shoppinglist/')
+
+
+def write_groceries_flow(client, rng):
+    """Add a grocery, correct it and use some of it."""
+    grocery = client.request('POST /api/household/grocery/', 'POST',
+                             '/api/household/grocery/',
+                             {'name': client.unique('grocery'),
+                              'quantity': rng.randint(1, 5)})
+    path = f'/api/household/grocery/{grocery["id"]}/'
+    client.request('PATCH /api/household/grocery/{id}/', 'PATCH', path,
+                   {'quantity': rng.randint(2, 10)})
+    client.request('POST /api/household/grocery/{id}/adjust/', 'POST',
+                   path + 'adjust/', {'delta': -1})
+
+
+def checkout_flow(client, rng):
+    """Fill the shopping list and check out what was bought."""
+    items = client.request(
+        'POST /api/household/shoppinglist/', 'POST',
+        '/api/household/shoppinglist/',
+        [{'name': client.unique('item'), 'quantity': 1}
+         for _ in range(rng.randint(1, 5))]
+    )
+    client.request('POST /api/household/shoppinglist/checkout/', 'POST',
+                   '/api/household/shoppinglist/checkout/',
+                   [{'id': item['id'], 'quantity': rng.randint(1, 3)}
+                    for item in items])
+
+
+FLOWS = {
+    'signup': signup_flow,
+    'token': token_flow,
+    'read_lists': read_lists_flow,
+    'write_groceries': write_groceries_flow,
+    'checkout': checkout_flow,
+}
+DEFAULT_WEIGHTS = {
+    'signup': 2,
+    'token': 8,
+    'read_lists': 55,
+    'write_groceries': 25,
+    'checkout': 10,
+}
+
+
+class LoadTest:
+    """Runs weighted flows at a target rate with concurrent clients.
+
+    Flow start times are scheduled independently of the responses, with
+    exponential gaps averaging `rate` flows per second, and handed to
+    the next free client. A slow server therefore shows up as latency
+    and as the lag between a flow's scheduled and actual start, rather
+    than as a lower request rate. Flows still queued at the end are
+    dropped.
+    """
+
+    def __init__(self, url, weights=None, rate=10, clients=10, duration=30,
+                 seed=None, timeout=30, keep_alive=False):
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.rate = rate
+        self.duration = duration
+        self.rng = random.Random(seed)
+        # Unique per run, as the users and households are kept.
+        prefix = f'loadtest-{uuid.uuid4().hex[:12]}'
+        self.clients = [Client(url, f'{prefix}-{i}', timeout, keep_alive)
+                        for i in range(clients)]
+        self.rngs = [random.Random(self.rng.getrandbits(64))
+                     for _ in self.clients]
+        self.ready = threading.Barrier(clients + 1)
+        self.queue = queue.Queue()
+        self.lag = [LatencyHistogram() for _ in self.clients]
+        self.completed = [{} for _ in self.clients]
+        self.failed = [{} for _ in self.clients]
+        self.dropped = [0] * clients
+        self.setup_errors = []
+        # Last error of each flow.
+        self.errors = {}
+
+    def run(self, progress=None):
+        """Set up the clients, run the flows and return the results."""
+        workers = [threading.Thread(target=self.work, args=(i,), daemon=True)
+                   for i in range(len(self.clients))]
+        for worker in workers:
+            worker.start()
+        self.ready.wait()
+        if self.setup_errors:
+            self.stop(workers)
+            raise RequestFailed(self.setup_errors[0])
+
+        started = time.monotonic()
+        self.deadline = started + self.duration
+        scheduled = started
+        names = list(self.weights)
+        weights = list(self.weights.values())
+        next_progress = started + 5
+        while True:
+            scheduled += self.rng.expovariate(self.rate)
+            if scheduled >= self.deadline:
+                break
+            self.queue.put((scheduled, self.rng.choices(names, weights)[0]))
+            now = time.monotonic()
+            if progress and now >= next_progress:
+                progress(now - started, self.queue.qsize())
+                next_progress += 5
+            if scheduled > now:
+                time.sleep(scheduled - now)
+        self.stop(workers)
+
+        return self.results(time.monotonic() - started)
+
+    def work(self, index):
+        client = self.clients[index]
+        rng = self.rngs[index]
+        try:
+            client.set_up()
+        except Exception as exc:
+            # Every worker must reach the barrier, or the run never starts.
+            self.setup_errors.append(format_error(exc))
+        self.ready.wait()
+        client.recording = True
+
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            scheduled, name = item
+            now = time.monotonic()
+            if now >= self.deadline:
+                self.dropped[index] += 1
+                continue
+            self.lag[index].add(max(0.0, now - scheduled))
+            try:
+                FLOWS[name](client, rng)
+            except Exception as exc:
+                self.errors[name] = format_error(exc)
+                counts = self.failed[index]
+            else:
+                counts = self.completed[index]
+            counts[name] = counts.get(name, 0) + 1
+
+    def stop(self, workers):
+        for _ in workers:
+            self.queue.put(None)
+        for worker in workers:
+            worker.join()
+
+    def results(self, elapsed):
+        endpoints = {}
+        for client in self.clients:
+            for name, stats in client.stats.items():
+                endpoints.setdefault(name, EndpointStats()).merge(stats)
+        lag = LatencyHistogram()
+        for histogram in self.lag:
+            lag.merge(histogram)
+        flows = {}
+        for name in self.weights:
+            completed = sum(counts.get(name, 0) for counts in self.completed)
+            failed = sum(counts.get(name, 0) for counts in self.failed)
+            flows[name] = {'completed': completed, 'failed': failed,
+                           'last_error': self.errors.get(name)}
+        finished = sum(flow['completed'] + flow['failed']
+                       for flow in flows.values())
+
+        return {
+            'duration': round(elapsed, 2),
+            'clients': len(self.clients),
+            'target_rate': self.rate,
+            'achieved_rate': round(finished / elapsed, 2) if elapsed else 0,
+            'dropped': sum(self.dropped),
+            'flows': flows,
+            'start_lag': lag.to_dict(),
+            'endpoints': {name: endpoints[name].to_dict()
+                          for name in sorted(endpoints)},
+        }
+
+
+def format_error(exc):
+    """Describe a failed request, or an unexpected error in a flow."""
+    if isinstance(exc, RequestFailed):
+        return str(exc)
+    return f'{type(exc).__name__}: {exc}'
@@ -0,0 +1,85 @@
+import os
+import time
+
+from django.core.management.base import CommandError
+
+
+class CopyProgress:
+    """File wrapper counting the rows streamed through a COPY.
+
+    Wraps the file read or written by psycopg2 `copy_expert` and reports
+    the row count and rate at most once per `interval` seconds.
+    """
+
+    def __init__(self, file, stream, label, interval=1.0, header=False):
+        self.file = file
+        self.stream = stream
+        self.label = label
+        self.interval = interval
+        self.lines = -1 if header else 0
+        self.started = self.reported = time.monotonic()
+
+    @property
+    def rows(self):
+        return max(self.lines, 0)
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.count(data)
+        return data
+
+    def write(self, data):
+        self.count(data)
+        return self.file.write(data)
+
+    def count(self, data):
+        newline = '\n' if isinstance(data, str) else b'\n'
+        self.lines += data.count(newline)
+        if time.monotonic() - self.reported >= self.interval:
+            self.report()
+
+    def report(self):
+        self.reported = time.monotonic()
+        self.stream.write(f'{self.label} {self.rows} rows '
+                          f'({rate(self.rows, self.elapsed)} rows/s)')
+
+
+class IteratorFile:
+    """Read-only file over an iterator of text, for COPY FROM STDIN.
+
+    Only the pieces needed for the requested size are pulled from the
+    iterator, so generated data never has to fit in memory.
+    """
+
+    def __init__(self, iterator):
+        self.iterator = iterator
+        self.buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            try:
+                self.buffer += next(self.iterator)
+            except StopIteration:
+                break
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def rate(rows, seconds):
+    return round(rows / seconds) if seconds > 0 else rows
+
+
+def get_format(path):
+    """Guess the file format from the extension of `path`."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if extension == '.csv':
+        return 'csv'
+    raise CommandError('Cannot guess the file format, use --format.')
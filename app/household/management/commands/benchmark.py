@@ -0,0 +1,104 @@
+import json
+import platform
+import sys
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from household.benchmarks import BenchmarkData, compare, get_benchmarks, \
+                                 run_benchmark
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the serializers and API views.
+
+    Every benchmark is called in-process against generated data, which
+    is rolled back afterwards. Results are written as JSON and can be
+    compared against a baseline saved by an earlier run.
+    """
+    help = 'Measure the time, queries and memory of serializers and views.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-k', '--filter', action='append', default=[],
+                            help='Only run benchmarks whose name contains '
+                                 'this text; can be repeated.')
+        parser.add_argument('--groceries', type=int, default=1000,
+                            help='Groceries of the benchmarked household.')
+        parser.add_argument('--min-time', type=float, default=0.5,
+                            help='Minimum seconds to run each benchmark.')
+        parser.add_argument('--min-calls', type=int, default=10)
+        parser.add_argument('--trace-calls', type=int, default=3,
+                            help='Calls traced to measure allocations.')
+        parser.add_argument('--output',
+                            help="Write the JSON results to this file, or "
+                                 "'-' for stdout.")
+        parser.add_argument('--baseline',
+                            help='Compare with the JSON results of an '
+                                 'earlier run.')
+        parser.add_argument('--threshold', type=float, default=0.1,
+                            help='Relative slowdown reported as a '
+                                 'regression.')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        baseline = {}
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)['results']
+        output = options['output']
+        # Keep stdout clean for the JSON results.
+        stream = self.stderr if output == '-' else self.stdout
+
+        results = {}
+        with transaction.atomic():
+            data = BenchmarkData(options['groceries'])
+            for benchmark in get_benchmarks(data):
+                if options['filter'] and not any(
+                        text in benchmark.name for text in options['filter']):
+                    continue
+                results[benchmark.name] = run_benchmark(
+                    benchmark, options['min_time'], options['min_calls'],
+                    options['trace_calls'])
+                stream.write(format_result(benchmark.name,
+                                           results[benchmark.name]))
+            transaction.set_rollback(True)
+
+        report = {
+            'meta': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'groceries': options['groceries'],
+            },
+            'results': results,
+        }
+        if output == '-':
+            json.dump(report, sys.stdout, indent=2)
+            sys.stdout.write('\n')
+        elif output:
+            with open(output, 'w') as file:
+                json.dump(report, file, indent=2)
+
+        if baseline:
+            self.report_changes(stream, results, baseline, options)
+
+    def report_changes(self, stream, results, baseline, options):
+        regressions = []
+        for name, change, regressed in compare(results, baseline,
+                                               options['threshold']):
+            style = self.style.ERROR if regressed else self.style.SUCCESS
+            stream.write(style(f'{name:<36} {change:+8.1%} '
+                               f'({baseline[name]["queries"]} -> '
+                               f'{results[name]["queries"]} queries)'))
+            if regressed:
+                regressions.append(name)
+
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f'Regressed: {", ".join(regressions)}.')
+
+
+def format_result(name, result):
+    return (f'{name:<36} {result["median_us"]:>10.1f} us '
+            f'{result["ops_per_sec"] or 0:>10.1f} ops/s '
+            f'{result["queries"]:>3} queries '
+            f'{result["peak_alloc_kib"] or 0:>9.1f} KiB')
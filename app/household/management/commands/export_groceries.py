@@ -0,0 +1,85 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.models import Grocery, Household, ListState
+from household.management.bulk import CopyProgress, get_format, rate
+
+
+EXPORT_SQL = '''
+    SELECT household.name AS household, grocery.name, grocery.quantity,
+           grocery.min_quantity,
+           CASE grocery.state
+                WHEN %(grocery_list)s THEN 'grocery_list'
+                WHEN %(shopping_list)s THEN 'shopping_list'
+           END AS list
+    FROM {grocery} AS grocery
+    JOIN {household} AS household ON household.id = grocery.household_id
+    {where}
+    ORDER BY grocery.household_id, grocery.id
+'''
+
+COPY_SQL = {
+    'csv': 'COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)',
+    # JSON never contains the quote and delimiter characters, so every
+    # row is written as is.
+    'jsonl': ('COPY (SELECT row_to_json(rows) FROM ({query}) AS rows) '
+              "TO STDOUT WITH (FORMAT csv, QUOTE E'\\x01', "
+              "DELIMITER E'\\x02')"),
+}
+
+
+class Command(BaseCommand):
+    """Django command to bulk export groceries as CSV or JSON Lines.
+
+    The rows are streamed from the database with COPY straight into the
+    output file and can be loaded again with `import_groceries`.
+    """
+    help = 'Export groceries to a CSV or JSON Lines file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to write, or '-' for stdout.")
+        parser.add_argument('--format', choices=('csv', 'jsonl'),
+                            help='Output format, by default guessed from '
+                                 'the file extension.')
+        parser.add_argument('--household', action='append', default=[],
+                            help='Only export the household with this '
+                                 'name; can be repeated.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or get_format(path)
+        # Keep stdout clean for the exported data.
+        stream = self.stderr if path == '-' else self.stdout
+
+        params = {'grocery_list': ListState.GROCERY_LIST,
+                  'shopping_list': ListState.SHOPPING_LIST}
+        where = ''
+        if options['household']:
+            where = 'WHERE household.name = ANY(%(households)s)'
+            params['households'] = options['household']
+        query = EXPORT_SQL.format(grocery=Grocery._meta.db_table,
+                                  household=Household._meta.db_table,
+                                  where=where)
+
+        file = sys.stdout.buffer if path == '-' else open(path, 'wb')
+        try:
+            with connection.cursor() as cursor:
+                # COPY takes no parameters, so they are bound client-side.
+                query = cursor.mogrify(query, params).decode()
+                progress = CopyProgress(file, stream, 'Exported',
+                                        header=file_format == 'csv')
+                cursor.copy_expert(
+                    COPY_SQL[file_format].format(query=query), progress)
+        finally:
+            if file is sys.stdout.buffer:
+                file.flush()
+            else:
+                file.close()
+
+        rows, seconds = progress.rows, progress.elapsed
+        stream.write(self.style.SUCCESS(
+            f'Exported {rows} rows in {seconds:.1f}s '
+            f'({rate(rows, seconds)} rows/s).'
+        ))
@@ -0,0 +1,294 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import MAX_QUANTITY, Grocery, Household, ListState
+from household.management.bulk import CopyProgress, get_format, rate
+
+
+COLUMNS = ('household', 'name', 'quantity', 'min_quantity', 'list')
+REQUIRED_COLUMNS = ('household', 'name', 'quantity')
+
+STAGING_SQL = '''
+    CREATE TEMPORARY TABLE grocery_import (
+        row bigserial, household text, name text, quantity text,
+        min_quantity text, list text, error text
+    )
+'''
+
+# JSON Lines are copied one line per row, with quote and delimiter
+# characters that cannot appear in JSON, and parsed in the database.
+JSON_LINES_SQL = [
+    '''
+    CREATE TEMPORARY TABLE grocery_import_lines (row bigserial, line text)
+    ''',
+    '''
+    CREATE OR REPLACE FUNCTION pg_temp.try_jsonb(value text) RETURNS jsonb
+    AS $$
+    BEGIN
+        RETURN value::jsonb;
+    EXCEPTION WHEN others THEN
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql IMMUTABLE
+    ''',
+]
+COPY_JSON_LINES_SQL = '''
+    COPY grocery_import_lines (line) FROM STDIN
+    WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')
+'''
+PARSE_JSON_LINES_SQL = '''
+    INSERT INTO grocery_import
+        (row, household, name, quantity, min_quantity, list, error)
+    SELECT row, doc->>'household', doc->>'name', doc->>'quantity',
+           doc->>'min_quantity', doc->>'list',
+           CASE WHEN jsonb_typeof(doc) IS DISTINCT FROM 'object'
+                THEN 'invalid JSON object' END
+    FROM (
+        SELECT row, pg_temp.try_jsonb(line) AS doc
+        FROM grocery_import_lines
+        WHERE trim(line) <> ''
+    ) AS lines
+'''
+
+CREATE_HOUSEHOLDS_SQL = '''
+    INSERT INTO {household} (name, version)
+    SELECT DISTINCT household, 0 FROM grocery_import
+    WHERE error IS NULL AND trim(household) <> ''
+      AND length(household) <= 255
+    ON CONFLICT (name) DO NOTHING
+'''
+
+# Resolve household names to ids and validate every row in one pass.
+CHECK_SQL = r'''
+    CREATE TEMPORARY TABLE grocery_import_checked AS
+    SELECT staged.row, household.id AS household_id, staged.name,
+           CASE WHEN staged.quantity ~ '^\s*[0-9]{{1,9}}\s*$'
+                THEN staged.quantity::integer END AS quantity,
+           CASE WHEN staged.min_quantity ~ '^\s*[0-9]{{1,9}}\s*$'
+                THEN staged.min_quantity::integer END AS min_quantity,
+           CASE coalesce(staged.list, '')
+                WHEN '' THEN %(none)s
+                WHEN 'grocery_list' THEN %(grocery_list)s
+                WHEN 'shopping_list' THEN %(shopping_list)s
+           END AS state,
+           CASE
+                WHEN staged.error IS NOT NULL THEN staged.error
+                WHEN household.id IS NULL THEN 'unknown household'
+                WHEN coalesce(trim(staged.name), '') = ''
+                  OR length(staged.name) > 100 THEN 'invalid name'
+                WHEN staged.quantity IS NULL
+                  OR staged.quantity !~ '^\s*[0-9]{{1,9}}\s*$'
+                    THEN 'invalid quantity'
+                WHEN coalesce(staged.min_quantity, '') <> ''
+                 AND staged.min_quantity !~ '^\s*[0-9]{{1,9}}\s*$'
+                    THEN 'invalid min_quantity'
+                WHEN coalesce(staged.list, '') NOT IN
+                     ('', 'grocery_list', 'shopping_list')
+                    THEN 'invalid list'
+           END AS error
+    FROM grocery_import AS staged
+    LEFT JOIN {household} AS household ON household.name = staged.household
+'''
+
+ERRORS_SQL = '''
+    SELECT error, count(*), min(row) FROM grocery_import_checked
+    WHERE error IS NOT NULL
+    GROUP BY error
+    ORDER BY min(row)
+'''
+
+# Rows repeating a name within the file are merged like API upserts:
+# quantities are summed up to the column maximum and the last given
+# minimum and list win.
+UPSERT_SQL = '''
+    WITH merged AS (
+        SELECT household_id,
+               (array_agg(name ORDER BY row))[1] AS name,
+               LEAST(sum(quantity::bigint), %(max_quantity)s) AS quantity,
+               (array_agg(min_quantity ORDER BY row DESC)
+                    FILTER (WHERE min_quantity IS NOT NULL))[1]
+                    AS min_quantity,
+               coalesce((array_agg(state ORDER BY row DESC)
+                    FILTER (WHERE state <> %(none)s))[1], %(none)s) AS state
+        FROM grocery_import_checked
+        WHERE error IS NULL
+        GROUP BY household_id, lower(name)
+    ), upserted AS (
+        INSERT INTO {grocery}
+            (name, quantity, min_quantity, household_id, state, updated_at)
+        SELECT name, quantity, min_quantity, household_id, state, %(now)s
+        FROM merged
+        ON CONFLICT (household_id, lower(name)) {on_conflict}
+        RETURNING household_id, xmax = 0 AS inserted
+    )
+    SELECT count(*) FILTER (WHERE inserted),
+           count(*) FILTER (WHERE NOT inserted),
+           (SELECT count(*) FROM merged) - count(*),
+           coalesce(array_agg(DISTINCT household_id), '{{}}')
+    FROM upserted
+'''
+
+ON_CONFLICT_SQL = {
+    'add': ('LEAST({grocery}.quantity::bigint + EXCLUDED.quantity, '
+            '%(max_quantity)s)'),
+    'replace': 'EXCLUDED.quantity',
+}
+UPDATE_SQL = '''
+    DO UPDATE SET
+        quantity = {quantity},
+        min_quantity = coalesce(EXCLUDED.min_quantity,
+                                {grocery}.min_quantity),
+        state = CASE WHEN EXCLUDED.state = %(none)s
+                     THEN {grocery}.state ELSE EXCLUDED.state END,
+        updated_at = EXCLUDED.updated_at
+'''
+
+BUMP_VERSIONS_SQL = '''
+    UPDATE {household} SET version = nextval(%s) WHERE id = ANY(%s)
+'''
+
+DROP_SQL = '''
+    DROP TABLE IF EXISTS grocery_import, grocery_import_lines,
+                         grocery_import_checked
+'''
+
+
+class Command(BaseCommand):
+    """Django command to bulk import groceries from CSV or JSON Lines.
+
+    Rows are streamed into a staging table with COPY, validated and
+    matched to households by name in SQL, and upserted into the grocery
+    table with one INSERT ... ON CONFLICT, all in one transaction.
+    """
+    help = ('Import groceries from a CSV or JSON Lines file with the '
+            'columns ' + ', '.join(COLUMNS) + '.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for stdin.")
+        parser.add_argument('--format', choices=('csv', 'jsonl'),
+                            help='Input format, by default guessed from '
+                                 'the file extension.')
+        parser.add_argument('--on-conflict', default='add',
+                            choices=('add', 'replace', 'skip'),
+                            help='What to do with the quantity of groceries '
+                                 'that already exist.')
+        parser.add_argument('--create-households', action='store_true',
+                            help='Create the households that do not exist.')
+        parser.add_argument('--strict', action='store_true',
+                            help='Import nothing if any row is invalid.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate the rows without importing.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or get_format(path)
+        started = time.monotonic()
+
+        file = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                rows = self.copy(cursor, file, file_format)
+                counts = self.load(cursor, options)
+                cursor.execute(DROP_SQL)
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+        finally:
+            if file is not sys.stdin.buffer:
+                file.close()
+
+        created, updated, unchanged, invalid = counts
+        verb = 'Would import' if options['dry_run'] else 'Imported'
+        seconds = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {rows - invalid} of {rows} rows in {seconds:.1f}s '
+            f'({rate(rows, seconds)} rows/s): {created} created, '
+            f'{updated} updated, {unchanged} left unchanged, '
+            f'{invalid} invalid rows skipped.'
+        ))
+
+    def copy(self, cursor, file, file_format):
+        """Stream the file into the staging table."""
+        cursor.execute(STAGING_SQL)
+        if file_format == 'csv':
+            columns = read_header(file)
+            sql = (f'COPY grocery_import ({", ".join(columns)}) '
+                   'FROM STDIN WITH (FORMAT csv)')
+        else:
+            for sql in JSON_LINES_SQL:
+                cursor.execute(sql)
+            sql = COPY_JSON_LINES_SQL
+
+        progress = CopyProgress(file, self.stdout, 'Copied')
+        cursor.copy_expert(sql, progress)
+        if file_format == 'jsonl':
+            cursor.execute(PARSE_JSON_LINES_SQL)
+        cursor.execute('SELECT count(*) FROM grocery_import')
+        rows = cursor.fetchone()[0]
+        self.stdout.write(f'Copied {rows} rows in {progress.elapsed:.1f}s '
+                          f'({rate(rows, progress.elapsed)} rows/s).')
+
+        return rows
+
+    def load(self, cursor, options):
+        """Validate the staged rows and upsert the valid ones.
+
+        Returns the number of groceries created, updated and left
+        unchanged, and the number of invalid rows.
+        """
+        household = Household._meta.db_table
+        grocery = Grocery._meta.db_table
+        states = {'none': ListState.NONE,
+                  'grocery_list': ListState.GROCERY_LIST,
+                  'shopping_list': ListState.SHOPPING_LIST}
+
+        if options['create_households']:
+            cursor.execute(CREATE_HOUSEHOLDS_SQL.format(household=household))
+            self.stdout.write(f'Created {cursor.rowcount} households.')
+        cursor.execute(CHECK_SQL.format(household=household), states)
+        cursor.execute(ERRORS_SQL)
+        errors = cursor.fetchall()
+        for error, count, first_row in errors:
+            self.stdout.write(self.style.WARNING(
+                f'Skipped {count} rows with {error}, first at row '
+                f'{first_row}.'
+            ))
+        if errors and options['strict']:
+            raise CommandError('Invalid rows found, nothing was imported.')
+
+        if options['on_conflict'] == 'skip':
+            on_conflict = 'DO NOTHING'
+        else:
+            quantity = ON_CONFLICT_SQL[options['on_conflict']]
+            on_conflict = UPDATE_SQL.format(
+                quantity=quantity.format(grocery=grocery), grocery=grocery)
+        cursor.execute(
+            UPSERT_SQL.format(on_conflict=on_conflict, grocery=grocery),
+            {**states, 'now': timezone.now(), 'max_quantity': MAX_QUANTITY}
+        )
+        created, updated, unchanged, household_ids = cursor.fetchone()
+        if household_ids:
+            cursor.execute(BUMP_VERSIONS_SQL.format(household=household),
+                           [Household.version_sequence, household_ids])
+
+        invalid = sum(count for _, count, _ in errors)
+        return created, updated, unchanged, invalid
+
+
+def read_header(file):
+    """Read the CSV header and return the staging columns it maps to."""
+    header = file.readline().decode('utf-8-sig').strip()
+    columns = [column.strip().lower() for column in header.split(',')]
+    unknown = set(columns).difference(COLUMNS)
+    if unknown:
+        raise CommandError(f'Unknown columns: {", ".join(sorted(unknown))}.')
+    missing = set(REQUIRED_COLUMNS).difference(columns)
+    if missing:
+        raise CommandError(f'Missing columns: {", ".join(sorted(missing))}.')
+    if len(set(columns)) != len(columns):
+        raise CommandError('Duplicate columns.')
+
+    return columns
@@ -0,0 +1,118 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from household.loadtest import DEFAULT_WEIGHTS, FLOWS, LoadTest, \
+                               RequestFailed
+
+
+class Command(BaseCommand):
+    """Django command to load test a running server.
+
+    Concurrent clients replay a weighted mix of signups, logins, list
+    reads, grocery writes and checkouts over HTTP at a target rate, and
+    the latency percentiles and error rates are reported per endpoint.
+    Works against any server running `app.wsgi` or `app.asgi`.
+    """
+    help = 'Load test the API of a running server.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='Base URL of the server.')
+        parser.add_argument('--rate', type=float, default=10,
+                            help='Target flows started per second.')
+        parser.add_argument('--clients', type=int, default=10,
+                            help='Concurrent clients, each with its own '
+                                 'user and household.')
+        parser.add_argument('--duration', type=float, default=30,
+                            help='Seconds to generate load for.')
+        parser.add_argument('--flow', action='append', default=[],
+                            metavar='NAME=WEIGHT',
+                            help='Weight of a flow, replacing the default '
+                                 'mix; can be repeated. Flows: ' +
+                                 ', '.join(FLOWS) + '.')
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--timeout', type=float, default=30,
+                            help='Seconds to wait for a response.')
+        parser.add_argument('--keep-alive', action='store_true',
+                            help='Reuse connections. The development '
+                                 'server then delays most responses by '
+                                 'the ~40 ms of a delayed TCP ACK.')
+        parser.add_argument('--output', help='Write the JSON results to '
+                                             'this file.')
+
+    def handle(self, *args, **options):
+        if options['rate'] <= 0 or options['clients'] < 1:
+            raise CommandError('The rate and clients must be positive.')
+        load_test = LoadTest(
+            options['url'], get_weights(options['flow']),
+            rate=options['rate'], clients=options['clients'],
+            duration=options['duration'], seed=options['seed'],
+            timeout=options['timeout'], keep_alive=options['keep_alive']
+        )
+
+        self.stdout.write(f'Setting up {options["clients"]} clients...')
+        try:
+            results = load_test.run(progress=self.write_progress)
+        except RequestFailed as exc:
+            raise CommandError(f'Setting up a client failed: {exc}')
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+        self.write_results(results)
+
+    def write_progress(self, elapsed, backlog):
+        self.stdout.write(f'{elapsed:.0f}s: {backlog} flows waiting for a '
+                          'free client.')
+
+    def write_results(self, results):
+        self.stdout.write(
+            f'\n{results["achieved_rate"]} flows/s with '
+            f'{results["clients"]} clients for {results["duration"]}s '
+            f'(target {results["target_rate"]}/s, '
+            f'{results["dropped"]} dropped).'
+        )
+        lag = results['start_lag']
+        self.stdout.write(f'Start lag: p50 {lag["p50_ms"]} ms, '
+                          f'p99 {lag["p99_ms"]} ms.\n')
+        for name, flow in results['flows'].items():
+            line = (f'{name:<16} {flow["completed"]:>7} completed '
+                    f'{flow["failed"]:>5} failed')
+            if flow['last_error']:
+                line += f' (last: {flow["last_error"]})'
+            self.stdout.write(line)
+
+        self.stdout.write(f'\n{"Endpoint":<46} {"Requests":>8} '
+                          f'{"Errors":>7} {"p50":>8} {"p95":>8} {"p99":>8} '
+                          f'{"max":>8}  (ms)')
+        for name, endpoint in results['endpoints'].items():
+            line = (f'{name:<46} {endpoint["requests"]:>8} '
+                    f'{endpoint["error_rate"]:>7.1%} '
+                    f'{endpoint["p50_ms"]:>8} {endpoint["p95_ms"]:>8} '
+                    f'{endpoint["p99_ms"]:>8} {endpoint["max_ms"]:>8}')
+            style = self.style.ERROR if endpoint['errors'] else \
+                self.style.SUCCESS
+            self.stdout.write(style(line))
+
+
+def get_weights(flows):
+    """Parse `NAME=WEIGHT` flow options into weights."""
+    if not flows:
+        return DEFAULT_WEIGHTS
+
+    weights = {}
+    for flow in flows:
+        name, _, weight = flow.partition('=')
+        if name not in FLOWS:
+            raise CommandError(f'Unknown flow "{name}".')
+        try:
+            weights[name] = float(weight)
+        except ValueError:
+            raise CommandError(f'Invalid weight of flow "{name}".')
+        if weights[name] < 0:
+            raise CommandError(f'Invalid weight of flow "{name}".')
+    if not any(weights.values()):
+        raise CommandError('At least one flow needs a positive weight.')
+
+    return weights
@@ -0,0 +1,163 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from core.models import Grocery, Household, ListState
+from household.management.bulk import CopyProgress, IteratorFile, rate
+
+
+PRODUCTS = (
+    'Apples', 'Bananas', 'Beans', 'Bread', 'Butter', 'Cheese', 'Chicken',
+    'Coffee', 'Eggs', 'Flour', 'Honey', 'Lentils', 'Milk', 'Oats',
+    'Olive Oil', 'Onions', 'Pasta', 'Pepper', 'Potatoes', 'Rice', 'Salt',
+    'Sugar', 'Tea', 'Tomatoes', 'Yogurt',
+)
+# Share of groceries on each list; the rest are on neither.
+LIST_WEIGHTS = {
+    ListState.NONE: 5,
+    ListState.GROCERY_LIST: 3,
+    ListState.SHOPPING_LIST: 2,
+}
+USER_BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    """Django command to generate a large, skewed synthetic dataset.
+
+    Household sizes follow a Zipf distribution, so a few households are
+    huge and most are small. Households and users are created with
+    batched INSERTs and groceries are generated while streamed through
+    COPY. The same seed always produces the same data.
+    """
+    help = 'Generate households, users and groceries for load testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--households', type=int, default=1000)
+        parser.add_argument('--users', type=int,
+                            help='Number of users, by default two per '
+                                 'household; every household gets one.')
+        parser.add_argument('--groceries', type=int, default=100000)
+        parser.add_argument('--skew', type=float, default=1.0,
+                            help='Zipf exponent of the household sizes.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='seed',
+                            help='Prefix of the household names and user '
+                                 'emails.')
+        parser.add_argument('--password', default='password',
+                            help='Password of every generated user.')
+
+    def handle(self, *args, **options):
+        households = options['households']
+        users = options['users']
+        if users is None:
+            users = households * 2
+        if households < 1:
+            raise CommandError('At least one household is needed.')
+        if users < households:
+            raise CommandError('Every household needs at least one user.')
+        if options['groceries'] < 0:
+            raise CommandError('The number of groceries cannot be '
+                               'negative.')
+
+        rng = random.Random(options['seed'])
+        weights = get_weights(households, options['skew'], rng)
+        started = time.monotonic()
+        try:
+            with transaction.atomic():
+                household_ids = self.create_households(options['prefix'],
+                                                       households)
+                self.create_users(options['prefix'], household_ids,
+                                  distribute(users - households, weights),
+                                  options['password'])
+                self.create_groceries(
+                    household_ids,
+                    distribute(options['groceries'], weights),
+                    rng
+                )
+        except IntegrityError:
+            raise CommandError(f'Data with the prefix "{options["prefix"]}" '
+                               'already exists, use another prefix.')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded the database in {time.monotonic() - started:.1f}s.'))
+
+    def create_households(self, prefix, count):
+        started = time.monotonic()
+        created = Household.objects.bulk_create([
+            Household(name=f'{prefix} household {i}') for i in range(count)
+        ])
+        self.report('households', count, started)
+
+        return [household.pk for household in created]
+
+    def create_users(self, prefix, household_ids, extra_users, password):
+        """Create one user per household plus the skewed extra users."""
+        started = time.monotonic()
+        User = get_user_model()
+        users = []
+        for household_id, extra in zip(household_ids, extra_users):
+            for _ in range(1 + extra):
+                users.append(User(
+                    email=f'{prefix}-user{len(users)}@example.com',
+                    name=f'User {len(users)}',
+                    household_id=household_id
+                ))
+        User.objects.bulk_create_users(users, password,
+                                       batch_size=USER_BATCH_SIZE)
+        self.report('users', len(users), started)
+
+    def create_groceries(self, household_ids, counts, rng):
+        started = time.monotonic()
+        rows = iter_grocery_rows(household_ids, counts, rng,
+                                 timezone.now().isoformat())
+        progress = CopyProgress(IteratorFile(rows), self.stdout,
+                                'Generated groceries:', interval=5.0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {Grocery._meta.db_table} '
+                '(household_id, name, quantity, min_quantity, state, '
+                'updated_at) FROM STDIN WITH (FORMAT csv)',
+                progress
+            )
+        self.report('groceries', progress.rows, started)
+
+    def report(self, label, count, started):
+        seconds = time.monotonic() - started
+        self.stdout.write(f'Created {count} {label} in {seconds:.1f}s '
+                          f'({rate(count, seconds)} rows/s).')
+
+
+def get_weights(count, skew, rng):
+    """Return Zipf weights for `count` households in a random order."""
+    weights = [1 / rank ** skew for rank in range(1, count + 1)]
+    rng.shuffle(weights)
+    return weights
+
+
+def distribute(total, weights):
+    """Split `total` into integer parts proportional to the weights."""
+    scale = total / sum(weights)
+    parts = [int(weight * scale) for weight in weights]
+    remainders = sorted(range(len(weights)),
+                        key=lambda i: parts[i] - weights[i] * scale)
+    for i in remainders[:total - sum(parts)]:
+        parts[i] += 1
+    return parts
+
+
+def iter_grocery_rows(household_ids, counts, rng, updated_at):
+    """Generate CSV grocery rows with unique names per household."""
+    states = list(LIST_WEIGHTS)
+    state_weights = list(LIST_WEIGHTS.values())
+    for household_id, count in zip(household_ids, counts):
+        for i in range(count):
+            name = f'{PRODUCTS[i % len(PRODUCTS)]} {i // len(PRODUCTS)}'
+            quantity = rng.randint(0, 12)
+            min_quantity = rng.randint(1, 4) if rng.random() < 0.3 else ''
+            state = rng.choices(states, state_weights)[0]
+            yield (f'{household_id},{name},{quantity},{min_quantity},'
+                   f'{state},{updated_at}\n')
@@ -0,0 +1,99 @@
+from django.db import transaction
+from django.utils.http import parse_etags, quote_etag
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from household.events import publish_event
+from household.versions import batch_household_changes, \
+                               get_household_version, household_changed
+
+
+class NotModified(Exception):
+    """Raised when the client already holds the current representation."""
+
+
+class HouseholdETagMixin:
+    """Conditional GET support based on the household version.
+
+    The ETag is derived from the caller's household and its version, so
+    a matching `If-None-Match` is answered with 304 before the view runs
+    any list query or serializer.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = None
+        self.household_version = None
+        if request.method not in ('GET', 'HEAD'):
+            return
+
+        household_id = request.user.household_id
+        version = get_household_version(household_id)
+        if version is None:
+            return
+
+        self.household_version = version
+        self.etag = quote_etag(f'{household_id}-{version}-'
+                               f'{request.accepted_media_type}')
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = [etag[2:] if etag.startswith('W/') else etag
+                     for etag in parse_etags(if_none_match)]
+            if '*' in etags or self.etag in etags:
+                raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response,
+                                             *args, **kwargs)
+        etag = getattr(self, 'etag', None)
+        if etag and response.status_code in (status.HTTP_200_OK,
+                                             status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+        return response
+
+
+class GroceryCreateMixin:
+    """Creation of one grocery or a list of groceries per request.
+
+    Lists are validated and inserted in bulk inside one transaction. With
+    `?upsert=1` groceries whose name already exists in the household add
+    to the existing quantity instead of failing validation.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        """Use the bulk list serializer for list payloads."""
+        if isinstance(kwargs.get('data'), list):
+            kwargs['many'] = True
+        return super().get_serializer(*args, **kwargs)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['upsert'] = self.request.method == 'POST' and \
+            self.request.query_params.get('upsert') in ('1', 'true')
+        return context
+
+    @transaction.atomic
+    def create(self, request, *args, **kwargs):
+        with batch_household_changes():
+            return super().create(request, *args, **kwargs)
+
+    def save_groceries(self, serializer, **kwargs):
+        """Save the groceries in the user household and return them."""
+        household_id = self.request.user.household_id
+        saved = serializer.save(household_id=household_id, **kwargs)
+        groceries = saved if isinstance(saved, list) else [saved]
+        upsert = serializer.context['upsert']
+        if upsert or isinstance(saved, list):
+            # Bulk inserts and upserts send no model signals.
+            household_changed(household_id)
+            publish_event(household_id, 'grocery',
+                          'upserted' if upsert else 'created',
+                          [grocery.id for grocery in groceries])
+
+        return groceries
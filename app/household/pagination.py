@@ -0,0 +1,27 @@
+from rest_framework.pagination import CursorPagination
+
+
+class HouseholdCursorPagination(CursorPagination):
+    """Opt-in keyset pagination for household scoped lists.
+
+    Pages are only returned when the client sends a `cursor` or
+    `page_size` query parameter, so existing clients keep receiving
+    plain lists. Every page is a single indexed range scan on
+    `(household_id, id)` and no `COUNT(*)` is issued.
+    """
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def page_requested(self, request):
+        """Return whether the client asked for a page."""
+        return self.cursor_query_param in request.query_params or \
+            self.page_size_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Paginate only if the client asked for a page."""
+        if not self.page_requested(request):
+            return None
+
+        return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,16 @@
+from rest_framework.renderers import BaseRenderer
+
+from household.export import iter_json_lines
+
+
+class JSONLinesRenderer(BaseRenderer):
+    """Renderer which serializes a list to JSON Lines."""
+    media_type = 'application/jsonl'
+    format = 'jsonl'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return b''.join(iter_json_lines(items))
@@ -0,0 +1,12 @@
+import copy
+
+from rest_framework.routers import DefaultRouter
+
+
+class BulkRouter(DefaultRouter):
+    """Router that also routes bulk PATCH and DELETE to the list URL."""
+    routes = copy.deepcopy(DefaultRouter.routes)
+    routes[0].mapping.update({
+        'patch': 'bulk_partial_update',
+        'delete': 'bulk_destroy',
+    })
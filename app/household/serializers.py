@@ -1,18 +1,89 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
 from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.settings import api_settings
+
 from core.models import Household, Grocery
 
 
+class HouseholdUserSerializer(serializers.ModelSerializer):
+    """Serializer to a member of a household."""
+
+    class Meta:
+        model = get_user_model()
+        fields = ('id', 'email', 'name')
+        read_only_fields = fields
+
+
+class HouseholdGroceriesField(serializers.ManyRelatedField):
+    """Grocery ids of a household list, validated with a single query.
+
+    Only groceries of the serialized household are accepted and every
+    unknown or foreign id is reported in one error.
+    """
+    default_error_messages = {
+        'does_not_exist': _('Invalid pk(s) {pk_values} - objects do not '
+                            'exist in this household.'),
+    }
+
+    def __init__(self, **kwargs):
+        kwargs['child_relation'] = serializers.PrimaryKeyRelatedField(
+            queryset=Grocery.objects.none())
+        super().__init__(**kwargs)
+
+    def get_queryset(self):
+        """Return the groceries of the serialized household."""
+        instance = self.parent.instance
+        if not isinstance(instance, Household):
+            return Grocery.objects.none()
+        return Grocery.objects.filter(household=instance)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        id_field = serializers.IntegerField()
+        ids = {}
+        for pk in data:
+            try:
+                ids[id_field.to_internal_value(pk)] = None
+            except serializers.ValidationError:
+                self.child_relation.fail('incorrect_type',
+                                         data_type=type(pk).__name__)
+
+        groceries = self.get_queryset().in_bulk(ids)
+        missing = [pk for pk in ids if pk not in groceries]
+        if missing:
+            self.fail('does_not_exist',
+                      pk_values=', '.join(map(str, missing)))
+
+        return [groceries[pk] for pk in ids]
+
+
 class HouseholdSerializer(serializers.ModelSerializer):
-    """Serializer to household object."""
-    grocery_list = serializers.PrimaryKeyRelatedField(
-        many=True,
-        queryset=Grocery.objects.all(),
+    """Serializer to household object.
+
+    Relations named in the `expand` context are rendered nested instead
+    of as primary keys.
+    """
+    expandable_fields = ('grocery_list', 'shopping_list', 'users')
+    default_error_messages = {
+        'both_lists': _('Groceries {pk_values} cannot be on both the '
+                        'grocery and the shopping list.'),
+    }
+
+    grocery_list = HouseholdGroceriesField(
         allow_null=True,
         allow_empty=True
     )
-    shopping_list = serializers.PrimaryKeyRelatedField(
-        many=True,
-        queryset=Grocery.objects.all(),
+    shopping_list = HouseholdGroceriesField(
         allow_null=True,
         allow_empty=True
     )
@@ -22,29 +93,294 @@ class HouseholdSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'grocery_list', 'shopping_list')
         read_only_fields = ('id',)
 
+    def get_fields(self):
+        """Replace expanded relations with nested serializers."""
+        fields = super().get_fields()
+        expand = self.context.get('expand', ())
+        for field_name in ('grocery_list', 'shopping_list'):
+            if field_name in expand:
+                fields[field_name] = GrocerySerializer(many=True,
+                                                       read_only=True)
+        if 'users' in expand:
+            fields['users'] = HouseholdUserSerializer(source='user_set',
+                                                      many=True,
+                                                      read_only=True)
+
+        return fields
+
+    def validate(self, attrs):
+        """Reject groceries given for both lists."""
+        grocery_ids = {grocery.pk
+                       for grocery in attrs.get('grocery_list') or ()}
+        both = [grocery.pk for grocery in attrs.get('shopping_list') or ()
+                if grocery.pk in grocery_ids]
+        if both:
+            self.fail('both_lists', pk_values=', '.join(map(str, both)))
+
+        return attrs
+
+    def create(self, validated_data):
+        lists = self.pop_lists(validated_data)
+        household = super().create(validated_data)
+        self.set_lists(household, lists)
+        return household
+
+    def update(self, instance, validated_data):
+        lists = self.pop_lists(validated_data)
+        household = super().update(instance, validated_data)
+        self.set_lists(household, lists)
+        return household
+
+    def pop_lists(self, validated_data):
+        return {field_name: validated_data.pop(field_name)
+                for field_name in ('grocery_list', 'shopping_list')
+                if field_name in validated_data}
+
+    def set_lists(self, household, lists):
+        """Move the given groceries onto the household lists."""
+        for field_name, groceries in lists.items():
+            getattr(household, field_name).set(groceries or ())
+
+
+DUPLICATE_NAME_MESSAGE = _('A grocery with this name already exists in '
+                           'the household.')
+NAME_CONFLICT_MESSAGE = _('The name "{name}" conflicts with another grocery '
+                          'of the household.')
+
+
+def get_taken_names(context, names, exclude_ids=()):
+    """Return the lowercased `names` already used in the household.
+
+    Runs a single query served by the unique (household, lower(name))
+    index. Nothing is taken in upsert mode, where existing groceries are
+    merged instead.
+    """
+    request = context.get('request')
+    if request is None or context.get('upsert') or not names:
+        return set()
+
+    return set(
+        Grocery.objects.filter_names(request.user.household_id, names)
+        .exclude(id__in=exclude_ids)
+        .values_list('name_lower', flat=True)
+    )
+
+
+def save_unique_names(context, write, items, many=True):
+    """Run a write of groceries, failing with a 400 on a name conflict.
+
+    The name checks of validation cannot see names swapped within one
+    request, which the unique index checks row by row, nor groceries
+    created concurrently. `items` are the written attribute dicts, with
+    the `id` of updated groceries.
+    """
+    try:
+        with transaction.atomic():
+            return write()
+    except IntegrityError as exc:
+        diag = getattr(exc.__cause__, 'diag', None)
+        if getattr(diag, 'constraint_name', None) != Grocery.name_index:
+            raise
+
+    names = [item['name'].lower() for item in items if 'name' in item]
+    taken = {}
+    for pk, name in Grocery.objects.filter_names(
+            context['request'].user.household_id, names
+    ).values_list('id', 'name_lower'):
+        taken.setdefault(name, set()).add(pk)
+
+    errors = []
+    for item in items:
+        owners = taken.get(item.get('name', '').lower(), set())
+        if owners - {item.get('id')}:
+            errors.append({'name': [NAME_CONFLICT_MESSAGE.format(
+                name=item['name'])]})
+        else:
+            errors.append({})
+    if not any(errors):
+        errors = {api_settings.NON_FIELD_ERRORS_KEY: [
+            NAME_CONFLICT_MESSAGE.format(name='", "'.join(names))]}
+    elif not many:
+        errors = errors[0]
+    raise serializers.ValidationError(errors)
+
+
+class GroceryBulkSerializer(serializers.ListSerializer):
+    """List serializer that creates and updates groceries in bulk."""
+    default_error_messages = {
+        'max_batch_size': _('Ensure this list has no more than '
+                            '{max_batch_size} items.'),
+        'does_not_exist': _('Invalid pk "{pk_value}" - object does not '
+                            'exist.'),
+        'duplicate': _('Duplicate pk "{pk_value}".'),
+    }
+
+    def validate_names(self, attrs):
+        """Reject names used twice or already used in the household."""
+        if self.context.get('upsert'):
+            return attrs
+
+        names = [item['name'].lower() if 'name' in item else None
+                 for item in attrs]
+        taken = get_taken_names(
+            self.context,
+            [name for name in names if name is not None],
+            [item['id'] for item in attrs if 'id' in item]
+        )
+        errors = []
+        seen = set()
+        for name in names:
+            if name is not None and (name in taken or name in seen):
+                errors.append({'name': [DUPLICATE_NAME_MESSAGE]})
+            else:
+                errors.append({})
+            seen.add(name)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return attrs
+
+    def to_internal_value(self, data):
+        """Validate the batch size and resolve the updated groceries."""
+        max_batch_size = settings.GROCERY_BULK_MAX_BATCH_SIZE
+        if isinstance(data, list) and len(data) > max_batch_size:
+            message = self.error_messages['max_batch_size'].format(
+                max_batch_size=max_batch_size)
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [message]
+            }, code='max_batch_size')
+
+        ret = super().to_internal_value(data)
+        if self.instance is not None:
+            self._groceries = self.get_groceries(data, ret)
+
+        return self.validate_names(ret)
+
+    def get_groceries(self, data, validated_data):
+        """Fetch every grocery referenced by an update with one query."""
+        id_field = serializers.IntegerField(min_value=1)
+        ids = []
+        errors = []
+        for item in data:
+            try:
+                ids.append(id_field.run_validation(item.get('id', empty)))
+            except serializers.ValidationError as exc:
+                ids.append(None)
+                errors.append({'id': exc.detail})
+            else:
+                errors.append({})
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        groceries = self.instance.in_bulk(ids)
+        seen = set()
+        for pk, attrs, error in zip(ids, validated_data, errors):
+            if pk not in groceries:
+                error['id'] = [self.error_messages['does_not_exist'].format(
+                    pk_value=pk)]
+            elif pk in seen:
+                error['id'] = [self.error_messages['duplicate'].format(
+                    pk_value=pk)]
+            seen.add(pk)
+            attrs['id'] = pk
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return groceries
+
+    def create(self, validated_data):
+        """Create all groceries with a single INSERT."""
+        if self.context.get('upsert'):
+            return Grocery.objects.upsert(validated_data)
+
+        return save_unique_names(
+            self.context,
+            lambda: Grocery.objects.bulk_create(
+                [Grocery(**attrs) for attrs in validated_data]),
+            validated_data
+        )
+
+    def update(self, instance, validated_data):
+        """Apply partial updates to all groceries with a single UPDATE."""
+        groceries = []
+        fields = set()
+        for attrs in validated_data:
+            grocery = self._groceries[attrs['id']]
+            for attr, value in attrs.items():
+                if attr != 'id':
+                    setattr(grocery, attr, value)
+            fields.update(attrs)
+            groceries.append(grocery)
+        fields.discard('id')
+        if fields:
+            now = timezone.now()
+            for grocery in groceries:
+                grocery.updated_at = now
+            save_unique_names(
+                self.context,
+                lambda: Grocery.objects.bulk_update(
+                    groceries, fields | {'updated_at'}),
+                validated_data
+            )
+
+        return groceries
+
 
 class GrocerySerializer(serializers.ModelSerializer):
-    """Serializer to grocery object."""
+    """Serializer to grocery object.
+
+    With `upsert` in the context, creating a grocery whose name already
+    exists in the household adds to the existing quantity instead.
+    """
 
     class Meta:
         model = Grocery
-        fields = ('id', 'name', 'quantity')
+        fields = ('id', 'name', 'quantity', 'min_quantity')
         read_only_fields = ('id',)
+        list_serializer_class = GroceryBulkSerializer
 
+    def validate_name(self, value):
+        """Reject names already used in the household."""
+        if isinstance(self.parent, serializers.ListSerializer):
+            return value
 
-class ShoppingListSerializer(HouseholdSerializer):
-    shopping_list = GrocerySerializer(many=True, read_only=False)
+        exclude_ids = [self.instance.pk] if self.instance else []
+        if get_taken_names(self.context, [value], exclude_ids):
+            raise serializers.ValidationError(DUPLICATE_NAME_MESSAGE)
 
-    class Meta:
-        model = Grocery
-        fields = ('id', 'name', 'quantity')
-        read_only_fields = ('id',)
+        return value
 
+    def create(self, validated_data):
+        if self.context.get('upsert'):
+            return Grocery.objects.upsert([validated_data])[0]
 
-class GroceryListSerializer(HouseholdSerializer):
-    grocery_list = GrocerySerializer(many=True, read_only=False)
+        return save_unique_names(
+            self.context, lambda: super(GrocerySerializer, self).create(
+                validated_data), [validated_data], many=False)
 
-    class Meta:
-        model = Grocery
-        fields = ('id', 'name', 'quantity')
-        read_only_fields = ('id',)
+    def update(self, instance, validated_data):
+        return save_unique_names(
+            self.context, lambda: super(GrocerySerializer, self).update(
+                instance, validated_data),
+            [dict(validated_data, id=instance.pk)], many=False)
+
+
+class GroceryAdjustSerializer(serializers.Serializer):
+    """Serializer to a signed grocery quantity change."""
+    delta = serializers.IntegerField(min_value=-1000000, max_value=1000000)
+
+
+class CheckoutItemSerializer(serializers.Serializer):
+    """Serializer to a bought item of the shopping list."""
+    # Checkout compares the ids as bigint, ids that cannot exist are
+    # reported as not moved.
+    id = serializers.IntegerField(min_value=1, max_value=2 ** 63 - 1)
+    quantity = serializers.IntegerField(min_value=0, max_value=1000000)
+
+
+class ShoppingListSerializer(GrocerySerializer):
+    """Serializer to an item of the shopping list."""
+
+
+class GroceryListSerializer(GrocerySerializer):
+    """Serializer to an item of the grocery list."""
@@ -0,0 +1,84 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from core.models import Grocery, Household, ListState, list_changed
+from household.events import publish_event
+from household.versions import household_changed
+
+
+@receiver(post_save, sender=Household)
+def household_saved(sender, instance, created, **kwargs):
+    """Record a change of the household itself."""
+    if not created:
+        household_changed(instance.pk)
+
+
+# User fields a household depends on, by attribute name. Households
+# expanded with their users embed the name and email.
+USER_FIELDS = {'household': 'household_id', 'name': 'name', 'email': 'email'}
+
+
+def get_user_fields(instance, fields=USER_FIELDS):
+    # Deferred fields are not loaded, as that would run a query.
+    return {name: instance.__dict__.get(attname)
+            for name, attname in USER_FIELDS.items()
+            if name in fields or attname in fields}
+
+
+@receiver(post_init, sender=get_user_model())
+def user_loaded(sender, instance, **kwargs):
+    """Remember the household fields of a user to detect them changing."""
+    instance._loaded_fields = get_user_fields(instance)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    """Record a user joining, leaving or changing in a household."""
+    saved = get_user_fields(instance, update_fields or USER_FIELDS)
+    loaded = instance._loaded_fields
+    previous = loaded['household']
+    if created or saved.get('household', previous) != previous:
+        household_changed(previous, instance.household_id)
+    elif any(loaded[name] != value for name, value in saved.items()):
+        household_changed(instance.household_id)
+    loaded.update(saved)
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_deleted(sender, instance, **kwargs):
+    """Record a user leaving their household by being deleted."""
+    household_changed(instance.household_id)
+
+
+@receiver(post_save, sender=Grocery)
+def grocery_saved(sender, instance, created, **kwargs):
+    """Record a created or updated grocery."""
+    household_changed(instance.household_id)
+    publish_event(instance.household_id, 'grocery',
+                  'created' if created else 'updated', [instance.pk])
+
+
+@receiver(post_delete, sender=Grocery)
+def grocery_deleted(sender, instance, **kwargs):
+    """Record a deleted grocery."""
+    household_changed(instance.household_id)
+    publish_event(instance.household_id, 'grocery', 'deleted',
+                  [instance.pk])
+
+
+@receiver(list_changed, sender=Household)
+def list_membership_changed(sender, household_id, state, moved, **kwargs):
+    """Record groceries moved onto or off a list."""
+    household_changed(household_id)
+    removed = defaultdict(list)
+    for pk, previous in moved.items():
+        if previous != ListState.NONE:
+            removed[ListState(previous)].append(pk)
+    for previous, ids in removed.items():
+        publish_event(household_id, previous.name.lower(), 'remove', ids)
+    if state != ListState.NONE:
+        publish_event(household_id, ListState(state).name.lower(), 'add',
+                      list(moved))
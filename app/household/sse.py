@@ -0,0 +1,170 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import close_old_connections
+
+from rest_framework import exceptions
+
+from core.authentication import CachedTokenAuthentication
+from household.events import broker
+
+
+EVENTS_PATH = '/api/household/events/'
+RESET_EVENT = b'event: reset\ndata: {}\n\n'
+KEEPALIVE = b': keepalive\n\n'
+TICKET_SALT = 'household.sse.ticket'
+
+
+def create_ticket(user):
+    """Return a signed ticket opening the event stream of `user`.
+
+    Browsers cannot send headers with `EventSource`, so the stream also
+    takes a ticket in the URL. Unlike tokens, tickets expire after
+    `HOUSEHOLD_EVENTS_TICKET_MAX_AGE` seconds.
+    """
+    return signing.TimestampSigner(salt=TICKET_SALT).sign(str(user.pk))
+
+
+def authenticate(token_key, ticket):
+    """Return the user of a token key or ticket, or None."""
+    close_old_connections()
+    try:
+        if token_key is not None:
+            return CachedTokenAuthentication().authenticate_credentials(
+                token_key)[0]
+        user_id = signing.TimestampSigner(salt=TICKET_SALT).unsign(
+            ticket, max_age=settings.HOUSEHOLD_EVENTS_TICKET_MAX_AGE)
+        return get_user_model().objects.filter(
+            pk=user_id, is_active=True).first()
+    except (exceptions.AuthenticationFailed, signing.BadSignature):
+        return None
+    finally:
+        close_old_connections()
+
+
+def get_credentials(scope):
+    """Read the Authorization header token or the `ticket` param."""
+    headers = dict(scope.get('headers', ()))
+    auth = headers.get(b'authorization', b'').decode('latin1').split()
+    if len(auth) == 2 and auth[0].lower() == 'token':
+        return auth[1], None
+
+    query = parse_qs(scope.get('query_string', b'').decode('latin1'))
+    return None, query.get('ticket', [None])[0]
+
+
+def format_event(event):
+    data = json.dumps(event.to_dict(), separators=(',', ':'))
+    return (f'id: {event.id}\nevent: {event.event}\n'
+            f'data: {data}\n\n').encode()
+
+
+async def send_error(send, status, message):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': json.dumps({'detail': message}).encode(),
+    })
+
+
+async def send_body(send, body):
+    await send({
+        'type': 'http.response.body',
+        'body': body,
+        'more_body': True,
+    })
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def household_events(scope, receive, send):
+    """Server-sent events stream of the caller's household changes.
+
+    Missed events are replayed from `Last-Event-ID`; when that is not
+    possible a `reset` event tells the client to refetch its lists.
+    """
+    if scope['method'] != 'GET':
+        await send_error(send, 405, 'Method not allowed.')
+        return
+
+    token_key, ticket = get_credentials(scope)
+    user = None
+    if token_key or ticket:
+        user = await sync_to_async(authenticate)(token_key, ticket)
+    if user is None:
+        await send_error(send, 401, 'Invalid token.')
+        return
+    if user.household_id is None:
+        await send_error(send, 404, 'User has no household.')
+        return
+
+    headers = dict(scope.get('headers', ()))
+    last_event_id = headers.get(b'last-event-id', b'').decode('latin1')
+    subscription, missed = broker.subscribe(user.household_id,
+                                            last_event_id)
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        if missed is None:
+            await send_body(send, RESET_EVENT)
+        else:
+            for event in missed:
+                await send_body(send, format_event(event))
+
+        while not disconnected.done():
+            next_event = asyncio.ensure_future(subscription.queue.get())
+            await asyncio.wait(
+                (next_event, disconnected),
+                timeout=settings.HOUSEHOLD_EVENTS_KEEPALIVE,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not next_event.done():
+                next_event.cancel()
+                if not disconnected.done():
+                    await send_body(send, KEEPALIVE)
+                continue
+            if subscription.overflowed:
+                await send_body(send, RESET_EVENT)
+                break
+            await send_body(send, format_event(next_event.result()))
+
+        if not disconnected.done():
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        disconnected.cancel()
+        broker.unsubscribe(subscription)
+
+
+class HouseholdEventsRouter:
+    """ASGI application serving household events next to Django."""
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == EVENTS_PATH:
+            await household_events(scope, receive, send)
+        else:
+            await self.application(scope, receive, send)
@@ -0,0 +1,256 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.models import MAX_QUANTITY, Grocery, Household, ListState
+
+
+class GroceryCommandTests(TestCase):
+    """Tests the grocery import and export commands."""
+
+    def setUp(self):
+        self.household = Household.objects.create(name='Test Household')
+        self.grocery = Grocery.objects.create(name='Milk', quantity=2,
+                                              household=self.household)
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_file(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as file:
+            file.write(content)
+        return path
+
+    def call(self, *args, **kwargs):
+        out = StringIO()
+        call_command(*args, stdout=out, stderr=StringIO(), **kwargs)
+        return out.getvalue()
+
+    def test_import_csv(self):
+        """Tests importing, merging and validating CSV rows."""
+        path = self.write_file('groceries.csv', (
+            'household,name,quantity,list\n'
+            'Test Household,milk,3,shopping_list\n'
+            'Test Household,Eggs,6,\n'
+            'Test Household,eggs,1,grocery_list\n'
+            'Test Household,Flour,-1,\n'
+            'Other Household,Bread,1,\n'
+        ))
+        out = self.call('import_groceries', path)
+        self.grocery.refresh_from_db()
+        eggs = Grocery.objects.get(household=self.household, name='Eggs')
+
+        self.assertEqual(self.grocery.quantity, 5)
+        self.assertEqual(self.grocery.state, ListState.SHOPPING_LIST)
+        self.assertEqual(eggs.quantity, 7)
+        self.assertEqual(eggs.state, ListState.GROCERY_LIST)
+        self.assertEqual(Grocery.objects.count(), 2)
+        self.assertIn('Imported 3 of 5 rows', out)
+        self.assertIn('1 created, 1 updated, 0 left unchanged, '
+                      '2 invalid rows skipped', out)
+        self.assertIn('invalid quantity, first at row 4', out)
+        self.assertIn('unknown household, first at row 5', out)
+
+    def test_import_json_lines(self):
+        """Tests importing JSON Lines and creating households."""
+        path = self.write_file('groceries.jsonl', (
+            '{"household": "New Household", "name": "Tea", "quantity": 4}\n'
+            'not json\n'
+            '{"household": "Test Household", "name": "Milk", '
+            '"quantity": 1, "min_quantity": 2}\n'
+        ))
+        out = self.call('import_groceries', path, '--on-conflict=replace',
+                        '--create-households')
+        self.grocery.refresh_from_db()
+
+        self.assertEqual(self.grocery.quantity, 1)
+        self.assertEqual(self.grocery.min_quantity, 2)
+        self.assertTrue(Grocery.objects.filter(
+            household__name='New Household', name='Tea').exists())
+        self.assertIn('invalid JSON object, first at row 2', out)
+
+    def test_import_quantity_ceiling(self):
+        """Tests that summed quantities stop at the column maximum."""
+        self.grocery.quantity = MAX_QUANTITY - 1
+        self.grocery.save()
+        path = self.write_file('groceries.csv', (
+            'household,name,quantity\n'
+            'Test Household,Milk,2\n'
+            'Test Household,Eggs,999999999\n'
+            'Test Household,Eggs,999999999\n'
+            'Test Household,Eggs,999999999\n'
+        ))
+        self.call('import_groceries', path)
+        self.grocery.refresh_from_db()
+        eggs = Grocery.objects.get(household=self.household, name='Eggs')
+
+        self.assertEqual(self.grocery.quantity, MAX_QUANTITY)
+        self.assertEqual(eggs.quantity, MAX_QUANTITY)
+
+    def test_import_dry_run(self):
+        """Tests that dry runs report the counts without importing."""
+        path = self.write_file('groceries.csv', (
+            'household,name,quantity\n'
+            'Test Household,Milk,1\n'
+            'Test Household,Eggs,6\n'
+            'Test Household,Flour,x\n'
+        ))
+        out = self.call('import_groceries', path, '--dry-run',
+                        '--on-conflict=skip')
+        self.grocery.refresh_from_db()
+
+        self.assertEqual(self.grocery.quantity, 2)
+        self.assertFalse(Grocery.objects.filter(name='Eggs').exists())
+        self.assertIn('Would import 2 of 3 rows', out)
+        self.assertIn('1 created, 0 updated, 1 left unchanged, '
+                      '1 invalid rows skipped', out)
+
+    def test_import_strict_rolls_back(self):
+        """Tests that strict imports fail on any invalid row."""
+        path = self.write_file('groceries.csv', (
+            'household,name,quantity\n'
+            'Test Household,Eggs,6\n'
+            'Test Household,,1\n'
+        ))
+        with self.assertRaises(CommandError):
+            self.call('import_groceries', path, '--strict')
+
+        self.assertFalse(Grocery.objects.filter(name='Eggs').exists())
+
+    def test_import_invalid_header_fails(self):
+        """Tests that unknown or missing CSV columns are rejected."""
+        for header in ('household,name,quantity,price', 'household,name'):
+            path = self.write_file('groceries.csv', f'{header}\n')
+            with self.assertRaises(CommandError):
+                self.call('import_groceries', path)
+
+    def test_export_round_trip(self):
+        """Tests exporting groceries in a format the import accepts."""
+        other = Household.objects.create(name='Other Household')
+        Grocery.objects.create(name='Bread', quantity=1, household=other)
+        self.household.shopping_list.add(self.grocery)
+        csv_path = os.path.join(self.directory.name, 'out.csv')
+        jsonl_path = os.path.join(self.directory.name, 'out.jsonl')
+        self.call('export_groceries', csv_path,
+                  '--household=Test Household')
+        out = self.call('export_groceries', jsonl_path)
+
+        with open(csv_path) as file:
+            self.assertEqual(file.read().splitlines(), [
+                'household,name,quantity,min_quantity,list',
+                'Test Household,Milk,2,,shopping_list',
+            ])
+        with open(jsonl_path) as file:
+            rows = [json.loads(line) for line in file]
+        self.assertEqual(rows[0], {
+            'household': 'Test Household', 'name': 'Milk', 'quantity': 2,
+            'min_quantity': None, 'list': 'shopping_list',
+        })
+        self.assertIn('Exported 2 rows', out)
+
+        self.call('import_groceries', jsonl_path, '--on-conflict=replace')
+        self.assertEqual(Grocery.objects.count(), 2)
+
+
+class SeedDataCommandTests(TestCase):
+    """Tests the seed_data command."""
+
+    def seed(self, *args):
+        call_command('seed_data', '--households=20', '--users=30',
+                     '--groceries=1000', *args, stdout=StringIO())
+
+    def test_seed_data(self):
+        """Tests seeding skewed households, users and groceries."""
+        self.seed()
+        households = Household.objects.filter(name__startswith='seed ')
+        sizes = sorted(household.grocery_set.count()
+                       for household in households)
+        user = get_user_model().objects.get(email='seed-user0@example.com')
+
+        self.assertEqual(households.count(), 20)
+        self.assertEqual(get_user_model().objects.count(), 30)
+        self.assertEqual(sum(sizes), 1000)
+        self.assertGreater(sizes[-1], 5 * sizes[len(sizes) // 2])
+        self.assertFalse(households.filter(user__isnull=True).exists())
+        self.assertTrue(user.check_password('password'))
+
+    def test_seed_data_is_deterministic(self):
+        """Tests the same seed generating the same groceries."""
+        self.seed('--prefix=first')
+        self.seed('--prefix=second')
+        first = Grocery.objects.filter(household__name__startswith='first')
+        second = Grocery.objects.filter(household__name__startswith='second')
+        fields = ('name', 'quantity', 'min_quantity', 'state')
+
+        self.assertEqual(list(first.order_by('id').values_list(*fields)),
+                         list(second.order_by('id').values_list(*fields)))
+
+    def test_seed_data_existing_prefix_fails(self):
+        """Tests seeding twice with the same prefix fails cleanly."""
+        self.seed()
+
+        with self.assertRaises(CommandError):
+            self.seed()
+
+    def test_seed_data_invalid_counts_fail(self):
+        """Tests that every invalid count gets its own error."""
+        cases = (
+            ('--households=0', 'household is needed'),
+            ('--users=10', 'at least one user'),
+            ('--groceries=-1', 'cannot be negative'),
+        )
+        for argument, message in cases:
+            with self.subTest(argument=argument):
+                with self.assertRaisesMessage(CommandError, message):
+                    self.seed(argument)
+
+
+class BenchmarkCommandTests(TestCase):
+    """Tests the benchmark command."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.directory.name, 'results.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def benchmark(self, *args):
+        call_command('benchmark', '-k', 'serializer.grocery',
+                     '-k', 'grocery.adjust', '--groceries=20',
+                     '--min-time=0', '--min-calls=1', '--trace-calls=1',
+                     f'--output={self.output}', *args, stdout=StringIO())
+        with open(self.output) as file:
+            return json.load(file)
+
+    def test_benchmark(self):
+        """Tests benchmarking the selected cases and rolling back."""
+        results = self.benchmark()['results']
+
+        self.assertEqual(set(results), {
+            'serializer.grocery', 'serializer.grocery.many',
+            'serializer.grocery.validate', 'grocery.adjust',
+        })
+        self.assertEqual(results['grocery.adjust']['queries'], 2)
+        self.assertGreater(results['serializer.grocery']['median_us'], 0)
+        self.assertFalse(Household.objects.exists())
+
+    def test_benchmark_regression_fails(self):
+        """Tests failing when slower than the baseline."""
+        report = self.benchmark()
+        for result in report['results'].values():
+            result['median_us'] /= 100
+        baseline = os.path.join(self.directory.name, 'baseline.json')
+        with open(baseline, 'w') as file:
+            json.dump(report, file)
+
+        with self.assertRaises(CommandError):
+            self.benchmark(f'--baseline={baseline}', '--fail-on-regression')
@@ -0,0 +1,149 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.test import TestCase
+from django.utils import timezone
+
+from rest_framework import status
+
+from core.models import Household, Grocery
+from core.tests.query_budgets import QueryBudgetClient
+
+
+HOUSEHOLD_URL = reverse('household:household-list')
+GROCERY_URL = reverse('household:grocery-list')
+GROCERY_LIST_URL = reverse('household:grocerylist-list')
+SHOPPING_LIST_URL = reverse('household:shoppinglist-list')
+
+
+class HouseholdETagApiTests(TestCase):
+    """Tests conditional requests on the household endpoints."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='TestPass123',
+            name='Test User',
+            household='Test Household'
+        )
+        self.client = QueryBudgetClient()
+        self.client.force_authenticate(self.user)
+        self.household = Household.objects.get(name='Test Household')
+
+    def test_etag_emitted(self):
+        """Tests that every household endpoint emits an ETag."""
+        for url in (HOUSEHOLD_URL, GROCERY_URL, GROCERY_LIST_URL,
+                    SHOPPING_LIST_URL):
+            res = self.client.get(url)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertIn('ETag', res)
+
+    def test_matching_etag_not_modified(self):
+        """Tests that a matching If-None-Match skips the view."""
+        res = self.client.get(GROCERY_URL)
+        # Only the household version is read.
+        with self.assertNumQueries(1):
+            res = self.client.get(GROCERY_URL,
+                                  HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_etag_changes_on_write(self):
+        """Tests that writes to the household bump its version."""
+        res = self.client.get(SHOPPING_LIST_URL)
+        etag = res['ETag']
+        grocery = Grocery.objects.create(name='Test Grocery', quantity=1,
+                                         household=self.household)
+
+        self.assertNotEqual(
+            self.client.get(SHOPPING_LIST_URL)['ETag'], etag)
+
+        etag = self.client.get(SHOPPING_LIST_URL)['ETag']
+        self.household.shopping_list.add(grocery)
+        res = self.client.get(SHOPPING_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+
+    def test_etag_changes_on_bulk_delete(self):
+        """Tests that a bulk delete bumps the version once."""
+        groceries = Grocery.objects.bulk_create([
+            Grocery(name=f'Test Grocery {i}', quantity=1,
+                    household=self.household) for i in range(3)
+        ])
+        version = Household.objects.get(id=self.household.id).version
+        self.client.delete(GROCERY_URL, [grocery.id for grocery in groceries],
+                           format='json')
+
+        self.assertEqual(
+            Household.objects.get(id=self.household.id).version,
+            version + 1
+        )
+
+    def test_household_save_keeps_version(self):
+        """Tests that saving a stale household keeps the version."""
+        stale = Household.objects.get(id=self.household.id)
+        Grocery.objects.create(name='Test Grocery', quantity=1,
+                               household=self.household)
+        stale.name = 'Test Household Changed'
+        stale.save()
+
+        self.assertEqual(
+            Household.objects.get(id=self.household.id).version,
+            stale.version + 2
+        )
+
+    def test_etag_changes_on_membership(self):
+        """Tests that users joining or leaving bump the version."""
+        url = reverse('household:household-detail', args=[self.household.id])
+        etag = self.client.get(url, {'expand': 'users'})['ETag']
+        other = get_user_model().objects.create_user(
+            email='other@test.com',
+            password='TestPass123',
+            household=self.household
+        )
+        res = self.client.get(url, {'expand': 'users'},
+                              HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['users']), 2)
+
+        etag = res['ETag']
+        other.household = None
+        other.save()
+
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+        etag = self.client.get(url)['ETag']
+        other.household = self.household
+        other.save()
+        other.delete()
+
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+    def test_etag_changes_on_user_profile(self):
+        """Tests that members changing their name or email bump the version."""
+        url = reverse('household:household-detail', args=[self.household.id])
+        etag = self.client.get(url, {'expand': 'users'})['ETag']
+        res = self.client.patch(reverse('user:me'), {'name': 'Bob'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(url, {'expand': 'users'},
+                              HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['users'][0]['name'], 'Bob')
+
+    def test_user_save_keeps_version(self):
+        """Tests that saving other user fields keeps the version."""
+        version = Household.objects.get(id=self.household.id).version
+        self.user.set_password('OtherPass123')
+        self.user.save()
+        self.user.last_login = timezone.now()
+        self.user.save(update_fields=['last_login'])
+
+        self.assertEqual(
+            Household.objects.get(id=self.household.id).version, version)
@@ -0,0 +1,202 @@
+import asyncio
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core.tests.query_budgets import QueryBudgetClient
+from household.events import HouseholdEventBroker, broker
+from household.sse import EVENTS_PATH, HouseholdEventsRouter, \
+                          create_ticket
+
+
+EVENTS_TICKET_URL = reverse('household:events-ticket')
+
+
+async def not_found(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 404,
+                'headers': []})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+def request_events(headers=(), query_string=b''):
+    """Open the event stream and disconnect once it is idle."""
+    messages = []
+
+    async def receive():
+        await asyncio.sleep(0.1)
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': EVENTS_PATH,
+        'query_string': query_string,
+        'headers': list(headers),
+    }
+    with patch('household.sse.close_old_connections'):
+        async_to_sync(HouseholdEventsRouter(not_found))(scope, receive, send)
+
+    status = messages[0]['status']
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    return status, body.decode()
+
+
+class HouseholdEventBrokerTests(TestCase):
+    """Tests the in-process household event broker."""
+
+    def setUp(self):
+        self.broker = HouseholdEventBroker()
+
+    def test_subscriber_receives_events(self):
+        """Tests that published events reach the household's subscribers."""
+        async def subscribe_and_publish():
+            subscription, missed = self.broker.subscribe(1)
+            other, _ = self.broker.subscribe(2)
+            self.broker.publish(1, 'grocery', 'created', [3])
+            event = await asyncio.wait_for(subscription.queue.get(), 1)
+            return missed, event, other.queue.empty()
+
+        missed, event, other_empty = asyncio.run(subscribe_and_publish())
+
+        self.assertEqual(missed, [])
+        self.assertEqual(event.to_dict(), {'action': 'created', 'ids': [3]})
+        self.assertTrue(other_empty)
+
+    def test_resume_from_last_event_id(self):
+        """Tests replaying the events missed since the last event id."""
+        first = self.broker.publish(1, 'grocery', 'created', [1])
+        second = self.broker.publish(1, 'grocery_list', 'add', [1])
+
+        async def subscribe(last_event_id):
+            return self.broker.subscribe(1, last_event_id)[1]
+
+        self.assertEqual(asyncio.run(subscribe(first.id)), [second])
+        self.assertEqual(asyncio.run(subscribe(second.id)), [])
+        self.assertIsNone(asyncio.run(subscribe('other-1')))
+
+    def test_resume_after_buffer_overflow(self):
+        """Tests that events dropped from the buffer cannot be resumed."""
+        with self.settings(HOUSEHOLD_EVENTS_BUFFER_SIZE=2):
+            first = self.broker.publish(1, 'grocery', 'created', [1])
+            for pk in range(2, 5):
+                self.broker.publish(1, 'grocery', 'created', [pk])
+
+        async def subscribe():
+            return self.broker.subscribe(1, first.id)[1]
+
+        self.assertIsNone(asyncio.run(subscribe()))
+
+    def test_expired_buffers_dropped(self):
+        """Tests dropping old events of households without subscribers."""
+        first = self.broker.publish(1, 'grocery', 'created', [1])
+
+        async def subscribe_and_publish():
+            subscription, _ = self.broker.subscribe(2)
+            self.expire_buffers()
+            self.broker.publish(2, 'grocery', 'created', [2])
+            dropped = set(self.broker._buffers)
+            second = self.broker.publish(1, 'grocery', 'created', [3])
+            missed = self.broker.subscribe(1, first.id)[1]
+            return subscription, dropped, second, missed
+
+        subscription, buffers, second, missed = asyncio.run(
+            subscribe_and_publish())
+
+        self.assertEqual(buffers, {2})
+        self.assertIsNone(missed)
+        self.assertNotEqual(second.id.rpartition('-')[0],
+                            first.id.rpartition('-')[0])
+
+        self.expire_buffers()
+        self.broker.unsubscribe(subscription)
+
+        self.assertEqual(set(self.broker._buffers), {1})
+
+    def expire_buffers(self):
+        """Age every buffer past the replay window."""
+        for buffer in self.broker._buffers.values():
+            buffer.published -= settings.HOUSEHOLD_EVENTS_REPLAY_WINDOW + 1
+        self.broker._next_prune = 0.0
+
+
+class HouseholdEventStreamTests(TestCase):
+    """Tests the household server-sent events endpoint."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='TestPass123',
+            name='Test User',
+            household='Test Household'
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    def test_login_required(self):
+        """Tests that the stream requires a valid token."""
+        status, _ = request_events(
+            headers=[(b'authorization', b'Token invalid')])
+
+        self.assertEqual(status, 401)
+
+    def test_token_in_url_rejected(self):
+        """Tests that long-lived tokens are not accepted in the URL."""
+        status, _ = request_events(
+            query_string=f'token={self.token.key}'.encode())
+
+        self.assertEqual(status, 401)
+
+    def test_expired_ticket_rejected(self):
+        """Tests that tickets only open the stream for a short time."""
+        ticket = create_ticket(self.user)
+        with self.settings(HOUSEHOLD_EVENTS_TICKET_MAX_AGE=-1):
+            status, _ = request_events(
+                query_string=f'ticket={ticket}'.encode())
+
+        self.assertEqual(status, 401)
+
+    def test_create_ticket(self):
+        """Tests getting a ticket for the stream with the token."""
+        client = QueryBudgetClient()
+        client.force_authenticate(self.user)
+        res = client.post(EVENTS_TICKET_URL)
+        status, _ = request_events(
+            query_string=f'ticket={res.data["ticket"]}'.encode())
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(status, 200)
+
+    def test_stream_replays_missed_events(self):
+        """Tests that the stream resumes after Last-Event-ID."""
+        household_id = self.user.household_id
+        first = broker.publish(household_id, 'grocery', 'created', [1])
+        second = broker.publish(household_id, 'shopping_list', 'add', [1])
+        status, body = request_events(
+            headers=[(b'last-event-id', first.id.encode())],
+            query_string=f'ticket={create_ticket(self.user)}'.encode()
+        )
+
+        self.assertEqual(status, 200)
+        self.assertNotIn(f'id: {first.id}\n', body)
+        self.assertIn(f'id: {second.id}\nevent: shopping_list\n'
+                      f'data: {{"action":"add","ids":[1]}}\n\n', body)
+
+    def test_stream_reset_on_unknown_event_id(self):
+        """Tests that an unresumable stream starts with a reset event."""
+        status, body = request_events(
+            headers=[
+                (b'authorization', f'Token {self.token.key}'.encode()),
+                (b'last-event-id', b'unknown-1'),
+            ]
+        )
+
+        self.assertEqual(status, 200)
+        self.assertTrue(body.startswith('event: reset\n'))
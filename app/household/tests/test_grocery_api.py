@@ -1,32 +1,47 @@
+import json
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Household, Grocery
+from core.models import MAX_QUANTITY, Household, Grocery
+from core.tests.query_budgets import QueryBudgetClient
 
+from household.cache import list_cache
+from household.pagination import HouseholdCursorPagination
 from household.serializers import GrocerySerializer
 
 
 GROCERY_URL = reverse('household:grocery-list')
 GROCERY_LIST_URL = reverse('household:grocerylist-list')
 SHOPPING_LIST_URL = reverse('household:shoppinglist-list')
+CACHE_STATS_URL = reverse('household:cache-stats')
+CHECKOUT_URL = reverse('household:shoppinglist-checkout')
+EXPORT_URL = reverse('household:grocery-export')
 
 
 def get_grocery_detail_url(grocery_id):
     return reverse('household:grocery-detail', args=[grocery_id])
 
 
+def get_grocery_adjust_url(grocery_id):
+    return reverse('household:grocery-adjust', args=[grocery_id])
+
+
 def get_user_household(user):
     return Household.objects.filter(
         name=user.household.name).first()
 
 
-def create_test_grocery_for_user(user):
+def create_test_grocery_for_user(user, name='Test Grocery'):
     return Grocery.objects.create(
-            name='Test Grocery',
+            name=name,
             quantity=1,
             household=get_user_household(user)
         )
@@ -36,7 +51,7 @@ class PublicGroceryApiTests(TestCase):
     """Tests the publicly available grocery API."""
 
     def setUp(self):
-        self.client = APIClient()
+        self.client = QueryBudgetClient()
 
     def test_login_required_grocery(self):
         """Tests that login is required for retrieving groceries."""
@@ -67,7 +82,7 @@ class PrivateGroceryApiTests(TestCase):
             name='Test User',
             household='Test Household'
         )
-        self.client = APIClient()
+        self.client = QueryBudgetClient()
         self.client.force_authenticate(self.user)
 
     def test_get_grocery(self):
@@ -197,3 +212,711 @@ class PrivateGroceryApiTests(TestCase):
         res = self.client.post(GROCERY_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BulkGroceryApiTests(TestCase):
+    """Tests the bulk grocery API for authenticated users."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='TestPass123',
+            name='Test User',
+            household='Test Household'
+        )
+        self.client = QueryBudgetClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_groceries(self):
+        """Tests creating a list of groceries in one request."""
+        payload = [
+            {'name': 'Test Grocery 1', 'quantity': 1},
+            {'name': 'Test Grocery 2', 'quantity': 2},
+        ]
+        res = self.client.post(GROCERY_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['name'] for item in res.data],
+                         ['Test Grocery 1', 'Test Grocery 2'])
+        self.assertTrue(all(item['id'] for item in res.data))
+        self.assertEqual(Grocery.objects.filter(
+            household=self.user.household).count(), 2)
+
+    def test_bulk_create_invalid_item_creates_nothing(self):
+        """Tests that one invalid item rejects the whole batch."""
+        payload = [
+            {'name': 'Test Grocery 1', 'quantity': 1},
+            {'name': '', 'quantity': 2},
+        ]
+        res = self.client.post(GROCERY_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertFalse(Grocery.objects.exists())
+
+    @override_settings(GROCERY_BULK_MAX_BATCH_SIZE=1)
+    def test_bulk_create_max_batch_size(self):
+        """Tests that batches above the configured size are rejected."""
+        payload = [
+            {'name': 'Test Grocery 1', 'quantity': 1},
+            {'name': 'Test Grocery 2', 'quantity': 2},
+        ]
+        res = self.client.post(GROCERY_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Grocery.objects.exists())
+
+    def test_bulk_partial_update_groceries(self):
+        """Tests updating a list of groceries via PATCH."""
+        grocery1 = create_test_grocery_for_user(self.user)
+        grocery2 = create_test_grocery_for_user(self.user, 'Test Grocery 2')
+        payload = [
+            {'id': grocery2.id, 'quantity': 7},
+            {'id': grocery1.id, 'name': 'Test Grocery 1'},
+        ]
+        res = self.client.patch(GROCERY_URL, payload, format='json')
+        grocery1.refresh_from_db()
+        grocery2.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in res.data],
+                         [grocery2.id, grocery1.id])
+        self.assertEqual(grocery1.name, 'Test Grocery 1')
+        self.assertEqual(grocery2.quantity, 7)
+
+    def conflict_client(self):
+        """Return a client without query budgets.
+
+        Rolling back a conflicting write and looking up the conflicting
+        names runs more queries than the budget of a successful write.
+        """
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client
+
+    def test_bulk_swap_names_fails(self):
+        """Tests that swapping names fails with the conflicting names."""
+        grocery1 = create_test_grocery_for_user(self.user, 'Milk')
+        grocery2 = create_test_grocery_for_user(self.user, 'Eggs')
+        payload = [
+            {'id': grocery1.id, 'name': 'Eggs'},
+            {'id': grocery2.id, 'name': 'Milk'},
+        ]
+        res = self.conflict_client().patch(GROCERY_URL, payload,
+                                           format='json')
+        grocery1.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('"Eggs"', res.data[0]['name'][0])
+        self.assertIn('"Milk"', res.data[1]['name'][0])
+        self.assertEqual(grocery1.name, 'Milk')
+
+    @patch('household.serializers.get_taken_names', return_value=set())
+    def test_create_concurrent_name_fails(self, get_taken_names):
+        """Tests that a name taken after validation fails with a 400."""
+        create_test_grocery_for_user(self.user, 'Milk')
+        res = self.conflict_client().post(GROCERY_URL,
+                                          {'name': 'milk', 'quantity': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('"milk"', res.data['name'][0])
+
+    def test_bulk_partial_update_other_household_fails(self):
+        """Tests that groceries of other households cannot be updated."""
+        grocery = create_test_grocery_for_user(self.user)
+        other = Grocery.objects.create(
+            name='Other Grocery',
+            quantity=1,
+            household=Household.objects.create(name='Other Household')
+        )
+        payload = [
+            {'id': grocery.id, 'quantity': 7},
+            {'id': other.id, 'quantity': 7},
+        ]
+        res = self.client.patch(GROCERY_URL, payload, format='json')
+        grocery.refresh_from_db()
+        other.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('id', res.data[1])
+        self.assertEqual(grocery.quantity, 1)
+        self.assertEqual(other.quantity, 1)
+
+    def test_bulk_delete_groceries(self):
+        """Tests deleting a list of groceries with per-item results."""
+        grocery = create_test_grocery_for_user(self.user)
+        other = Grocery.objects.create(
+            name='Other Grocery',
+            quantity=1,
+            household=Household.objects.create(name='Other Household')
+        )
+        res = self.client.delete(GROCERY_URL, [grocery.id, other.id],
+                                 format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {'id': grocery.id, 'deleted': True},
+            {'id': other.id, 'deleted': False},
+        ])
+        self.assertFalse(Grocery.objects.filter(id=grocery.id).exists())
+        self.assertTrue(Grocery.objects.filter(id=other.id).exists())
+
+    def test_add_groceries_to_grocery_list_in_bulk(self):
+        """Tests adding a list of groceries to grocery list."""
+        payload = [
+            {'name': f'Test Grocery {i}', 'quantity': i} for i in range(1, 51)
+        ]
+        with self.assertNumQueries(7):
+            res = self.client.post(GROCERY_LIST_URL, payload, format='json')
+        household = get_user_household(self.user)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 50)
+        self.assertEqual(household.grocery_list.count(), 50)
+        self.assertEqual(Grocery.objects.filter(
+            household=household).count(), 50)
+
+    def test_add_groceries_to_shopping_list_in_bulk(self):
+        """Tests adding a list of groceries to shopping list."""
+        payload = [
+            {'name': 'Test Grocery 1', 'quantity': 1},
+            {'name': 'Test Grocery 2', 'quantity': 2},
+        ]
+        with self.assertNumQueries(7):
+            res = self.client.post(SHOPPING_LIST_URL, payload, format='json')
+        household = get_user_household(self.user)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(household.shopping_list.values_list('name', flat=True)),
+            ['Test Grocery 1', 'Test Grocery 2']
+        )
+        self.assertFalse(household.grocery_list.exists())
+        self.assertEqual(Grocery.objects.filter(
+            household=household).count(), 2)
+
+
+class PaginatedGroceryApiTests(TestCase):
+    """Tests the opt-in cursor pagination of the grocery API."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='TestPass123',
+            name='Test User',
+            household='Test Household'
+        )
+        self.client = QueryBudgetClient()
+        self.client.force_authenticate(self.user)
+        self.groceries = [
+            create_test_grocery_for_user(self.user, f'Test Grocery {i}')
+            for i in range(5)
+        ]
+
+    def test_grocery_not_paginated_by_default(self):
+        """Tests that a plain list is returned without page parameters."""
+        res = self.client.get(GROCERY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 5)
+
+    def test_grocery_cursor_pagination(self):
+        """Tests walking the grocery pages with next/previous cursors."""
+        res = self.client.get(GROCERY_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', res.data)
+        self.assertIsNone(res.data['previous'])
+        self.assertEqual([item['id'] for item in res.data['results']],
+                         [grocery.id for grocery in self.groceries[:2]])
+
+        res = self.client.get(res.data['next'])
+
+        self.assertIsNotNone(res.data['previous'])
+        self.assertEqual([item['id'] for item in res.data['results']],
+                         [grocery.id for grocery in self.groceries[2:4]])
+
+        res = self.client.get(res.data['next'])
+
+        self.assertIsNone(res.data['next'])
+        self.assertEqual([item['id'] for item in res.data['results']],
+                         [self.groceries[4].id])
+
+    def test_grocery_page_size_bounded(self):
+        """Tests that the requested page size is capped."""
+        with patch.object(HouseholdCursorPagination, 'max_page_size', 3):
+            res = self.client.get(GROCERY_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 3)
+
+    def test_grocery_list_cursor_pagination(self):
+        """Tests that the grocery list is paginated on request."""
+        household = get_user_household(self.user)
+        household.grocery_list.set(self.groceries[1:4])
+        res = self.client.get(GROCERY_LIST_URL, {'page_size': 2})
+
+        self.assertEqual([item['id'] for item in res.data['results']],
+                         [grocery.id for grocery in self.groceries[1:3]])
+        self.assertIsNotNone(res.data['next'])
+
+
+class HouseholdListCacheTests(TestCase):
+    """Tests caching of the grocery and shopping lists."""
+
+    def setUp(self):
+        cache.clear()
+        list_cache.reset_stats()
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='TestPass123',
+            name='Test User',
+            household='Test Household'
+        )
+        self.client = QueryBudgetClient()
+        self.client.force_authenticate(self.user)
+        self.household = get_user_household(self.user)
+        self.grocery = create_test_grocery_for_user(self.user)
+        self.household.grocery_list.add(self.grocery)
+
+    def test_repeat_read_served_from_cache(self):
+        """Tests that a repeated list read only reads the version."""
+        self.client.get(GROCERY_LIST_URL)
+        with self.assertNumQueries(1):
+            res = self.client.get(GROCERY_LIST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['id'], self.grocery.id)
+        self.assertEqual(list_cache.stats()['hits'], 1)
+        self.assertEqual(list_cache.stats()['misses'], 1)
+
+    def test_cache_invalidated_on_grocery_change(self):
+        """Tests that a changed grocery is not served stale."""
+        self.client.get(GROCERY_LIST_URL)
+        self.client.patch(get_grocery_detail_url(self.grocery.id),
+                          {'quantity': 9})
+        res = self.client.get(GROCERY_LIST_URL)
+
+        self.assertEqual(res.data[0]['quantity'], 9)
+
+    def test_cache_invalidated_on_bulk_update(self):
+        """Tests that a bulk grocery update invalidates the lists."""
+        self.client.get(GROCERY_LIST_URL)
+        self.client.patch(GROCERY_URL, [{'id': self.grocery.id,
+                                         'quantity': 9}], format='json')
+        res = self.client.get(GROCERY_LIST_URL)
+
+        self.assertEqual(res.data[0]['quantity'], 9)
+
+    def test_cache_invalidated_on_list_change(self):
+        """Tests that list membership changes invalidate the lists."""
+        self.client.get(SHOPPING_LIST_URL)
+        self.household.shopping_list.add(self.grocery)
+        res = self.client.get(SHOPPING_LIST_URL)
+
+        self.assertEqual(len(res.data), 1)
+
+        self.client.post(SHOPPING_LIST_URL, {'name': 'Milk', 'quantity': 1})
+        res = self.client.get(SHOPPING_LIST_URL)
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_late_cached_read_not_served(self):
+        """Tests that a slow read caching old rows cannot serve them."""
+        version = Household.objects.get(id=self.household.id).version
+        self.client.patch(get_grocery_detail_url(self.grocery.id),
+                          {'quantity': 9})
+        list_cache.set(self.household.id, version, 'grocery_list',
+                       [{'id': self.grocery.id, 'quantity': 1}])
+        res = self.client.get(GROCERY_LIST_URL)
+
+        self.assertEqual(res.data[0]['quantity'], 9)
+
+    def test_rolled_back_version_not_reused(self):
+        """Tests that a version of a rolled back change is never reused."""
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            self.household.grocery_list.remove(self.grocery)
+            rolled_back = Household.objects.get(id=self.household.id).version
+            raise DatabaseError()
+        self.household.grocery_list.remove(self.grocery)
+
+        self.assertGreater(
+            Household.objects.get(id=self.household.id).version, rolled_back)
+
+    def test_cache_stats_admin_only(self):
+        """Tests that cache statistics require an admin user."""
+        res = self.client.get(CACHE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        res = self.client.get(CACHE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('hit_ratio', res.data)
+
+
+class AdjustGroceryApiTests(TestCase):
+    """Tests the atomic grocery quantity adjustment."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='TestPass123',
+            name='Test User',
+            household='Test Household'
+        )
+        self.client = QueryBudgetClient()
+        self.client.force_authenticate(self.user)
+        self.grocery = Grocery.objects.create(
+            name='Test Grocery',
+            quantity=5,
+            household=self.user.household
+        )
+
+    def test_adjust_quantity(self):
+        """Tests incrementing and decrementing the quantity."""
+        res = self.client.post(get_grocery_adjust_url(self.grocery.id),
+                               {'delta': 3})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'id': self.grocery.id, 'quantity': 8})
+
+        res = self.client.post(get_grocery_adjust_url(self.grocery.id),
+                               {'delta': -2})
+        self.grocery.refresh_from_db()
+
+        self.assertEqual(res.data['quantity'], 6)
+        self.assertEqual(self.grocery.quantity, 6)
+
+    def test_adjust_quantity_floor(self):
+        """Tests that the quantity does not drop below zero."""
+        res = self.client.post(get_grocery_adjust_url(self.grocery.id),
+                               {'delta': -10})
+        self.grocery.refresh_from_db()
+
+        self.assertEqual(res.data['quantity'], 0)
+        self.assertEqual(self.grocery.quantity, 0)
+
+    def test_adjust_quantity_ceiling(self):
+        """Tests that the quantity does not overflow its column."""
+        Grocery.objects.filter(id=self.grocery.id).update(
+            quantity=MAX_QUANTITY)
+        res = self.client.post(get_grocery_adjust_url(self.grocery.id),
+                               {'delta': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['quantity'], MAX_QUANTITY)
+
+    def test_adjust_other_household_fails(self):
+        """Tests that groceries of other households cannot be adjusted."""
+        other = Grocery.objects.create(
+            name='Other Grocery',
+            quantity=1,
+            household=Household.objects.create(name='Other Household')
+        )
+        res = self.client.post(get_grocery_adjust_url(other.id),
+                               {'delta': 1})
+        other.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(other.quantity, 1)
+
+    def test_adjust_invalid_delta_fails(self):
+        """Tests that a delta is required."""
+        res = self.client.post(get_grocery_adjust_url(self.grocery.id), {})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class UpsertGroceryApiTests(TestCase):
+    """Tests unique grocery names and upserts by name."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='TestPass123',
+            name='Test User',
+            household='Test Household'
+        )
+        self.client = QueryBudgetClient()
+        self.client.force_authenticate(self.user)
+        self.grocery = Grocery.objects.create(
+            name='Milk',
+            quantity=2,
+            household=self.user.household
+        )
+
+    def test_duplicate_name_fails(self):
+        """Tests that grocery names are unique regardless of case."""
+        res = self.client.post(GROCERY_URL, {'name': 'MILK', 'quantity': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+
+    def test_duplicate_name_in_batch_fails(self):
+        """Tests that a batch cannot repeat a name."""
+        payload = [
+            {'name': 'Eggs', 'quantity': 1},
+            {'name': 'eggs', 'quantity': 1},
+        ]
+        res = self.client.post(GROCERY_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+
+    def test_same_name_in_other_household(self):
+        """Tests that other households may use the same name."""
+        Grocery.objects.create(
+            name='Eggs',
+            quantity=1,
+            household=Household.objects.create(name='Other Household')
+        )
+        res = self.client.post(GROCERY_URL, {'name': 'Eggs', 'quantity': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_upsert_existing_grocery(self):
+        """Tests that an upsert adds to the existing quantity."""
+        res = self.client.post(f'{GROCERY_URL}?upsert=1',
+                               {'name': 'milk', 'quantity': 3})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data, {'id': self.grocery.id, 'name': 'Milk',
+                                    'quantity': 5, 'min_quantity': None})
+
+    def test_upsert_quantity_ceiling(self):
+        """Tests that upserted quantities do not overflow."""
+        Grocery.objects.filter(id=self.grocery.id).update(
+            quantity=MAX_QUANTITY)
+        payload = [
+            {'name': 'milk', 'quantity': 1},
+            {'name': 'Eggs', 'quantity': MAX_QUANTITY},
+            {'name': 'eggs', 'quantity': 1},
+        ]
+        res = self.client.post(f'{GROCERY_URL}?upsert=1', payload,
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['quantity'] for item in res.data],
+                         [MAX_QUANTITY] * 3)
+
+    def test_upsert_empty_batch(self):
+        """Tests that an empty upsert batch saves nothing."""
+        for url in (GROCERY_URL, SHOPPING_LIST_URL):
+            res = self.client.post(f'{url}?upsert=1', [], format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(res.data, [])
+
+    def test_upsert_batch(self):
+        """Tests upserting a batch with new and repeated names."""
+        payload = [
+            {'name': 'Milk', 'quantity': 1},
+            {'name': 'Eggs', 'quantity': 6},
+            {'name': 'EGGS', 'quantity': 6},
+        ]
+        with self.assertNumQueries(4):
+            res = self.client.post(f'{GROCERY_URL}?upsert=true', payload,
+                                   format='json')
+        eggs = Grocery.objects.get(household=self.user.household,
+                                   name='Eggs')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['id'] for item in res.data],
+                         [self.grocery.id, eggs.id, eggs.id])
+        self.assertEqual(eggs.quantity, 12)
+        self.assertEqual(Grocery.objects.get(id=self.grocery.id).quantity, 3)
+
+    def test_upsert_to_shopping_list(self):
+        """Tests upserting groceries already on the shopping list."""
+        household = get_user_household(self.user)
+        household.shopping_list.add(self.grocery)
+        payload = [
+            {'name': 'Milk', 'quantity': 1},
+            {'name': 'Eggs', 'quantity': 6},
+        ]
+        res = self.client.post(f'{SHOPPING_LIST_URL}?upsert=1', payload,
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(household.shopping_list.values_list('name', 'quantity')),
+            [('Eggs', 6), ('Milk', 3)]
+        )
+
+    def test_upsert_moves_between_lists(self):
+        """Tests that upserts announce groceries moved between lists."""
+        household = get_user_household(self.user)
+        household.shopping_list.add(self.grocery)
+        payload = [
+            {'name': 'Milk', 'quantity': 1},
+            {'name': 'Eggs', 'quantity': 6},
+        ]
+        with patch('household.events.transaction.on_commit',
+                   lambda func: func()), \
+                patch('household.events.broker.publish') as publish:
+            res = self.client.post(f'{GROCERY_LIST_URL}?upsert=1', payload,
+                                   format='json')
+        eggs_id = res.data[1]['id']
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(household.shopping_list.exists())
+        self.assertEqual(
+            sorted(call.args[1:] for call in publish.call_args_list),
+            [('grocery', 'upserted', [self.grocery.id, eggs_id]),
+             ('grocery_list', 'add', [self.grocery.id, eggs_id]),
+             ('shopping_list', 'remove', [self.grocery.id])]
+        )
+
+
+class CheckoutApiTests(TestCase):
+    """Tests checking out bought items of the shopping list."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='TestPass123',
+            name='Test User',
+            household='Test Household'
+        )
+        self.client = QueryBudgetClient()
+        self.client.force_authenticate(self.user)
+        self.household = get_user_household(self.user)
+        self.groceries = [
+            create_test_grocery_for_user(self.user, f'Test Grocery {i}')
+            for i in range(3)
+        ]
+        self.household.shopping_list.set(self.groceries)
+
+    def test_checkout_moves_items(self):
+        """Tests moving bought items to the grocery list."""
+        payload = [
+            {'id': self.groceries[0].id, 'quantity': 2},
+            {'id': self.groceries[1].id, 'quantity': 3},
+        ]
+        res = self.client.post(CHECKOUT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {'id': self.groceries[0].id, 'moved': True, 'quantity': 3},
+            {'id': self.groceries[1].id, 'moved': True, 'quantity': 4},
+        ])
+        self.assertEqual(list(self.household.shopping_list.all()),
+                         [self.groceries[2]])
+        self.assertEqual(
+            sorted(self.household.grocery_list.values_list('id', flat=True)),
+            [self.groceries[0].id, self.groceries[1].id]
+        )
+
+    def test_checkout_quantity_ceiling(self):
+        """Tests that checked out quantities do not overflow."""
+        Grocery.objects.filter(id=self.groceries[0].id).update(
+            quantity=MAX_QUANTITY)
+        payload = [{'id': self.groceries[0].id, 'quantity': 5}]
+        res = self.client.post(CHECKOUT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['quantity'], MAX_QUANTITY)
+
+    def test_checkout_constant_queries(self):
+        """Tests that a checkout runs one statement for any basket."""
+        payload = [{'id': grocery.id, 'quantity': 1}
+                   for grocery in self.groceries]
+        # Savepoint, checkout, household version and release.
+        with self.assertNumQueries(4):
+            self.client.post(CHECKOUT_URL, payload, format='json')
+
+    def test_checkout_items_not_on_list(self):
+        """Tests that items off the list or household are not moved."""
+        other = Grocery.objects.create(
+            name='Other Grocery',
+            quantity=1,
+            household=Household.objects.create(name='Other Household')
+        )
+        self.household.shopping_list.remove(self.groceries[0])
+        payload = [
+            {'id': self.groceries[0].id, 'quantity': 2},
+            {'id': other.id, 'quantity': 2},
+            {'id': 99999999999, 'quantity': 2},
+        ]
+        res = self.client.post(CHECKOUT_URL, payload, format='json')
+        other.refresh_from_db()
+
+        self.assertEqual(res.data, [
+            {'id': self.groceries[0].id, 'moved': False},
+            {'id': other.id, 'moved': False},
+            {'id': 99999999999, 'moved': False},
+        ])
+        self.assertEqual(other.quantity, 1)
+        self.assertFalse(self.household.grocery_list.exists())
+
+    def test_checkout_invalid_payload_fails(self):
+        """Tests that duplicate, negative or huge items are rejected."""
+        grocery = self.groceries[0]
+        for payload in ([{'id': grocery.id, 'quantity': -1}],
+                        [{'id': grocery.id, 'quantity': 1},
+                         {'id': grocery.id, 'quantity': 1}],
+                        [{'id': 2 ** 63, 'quantity': 1}],
+                        []):
+            res = self.client.post(CHECKOUT_URL, payload, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExportGroceryApiTests(TestCase):
+    """Tests streaming the household groceries."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='TestPass123',
+            name='Test User',
+            household='Test Household'
+        )
+        self.client = QueryBudgetClient()
+        self.client.force_authenticate(self.user)
+        self.groceries = [
+            create_test_grocery_for_user(self.user, f'Test Grocery {i}')
+            for i in range(5)
+        ]
+        Grocery.objects.create(
+            name='Other Grocery',
+            quantity=1,
+            household=Household.objects.create(name='Other Household')
+        )
+
+    def get_expected(self):
+        return [{'id': grocery.id, 'name': grocery.name, 'quantity': 1,
+                 'min_quantity': None} for grocery in self.groceries]
+
+    @override_settings(GROCERY_EXPORT_CHUNK_SIZE=2)
+    def test_export_json(self):
+        """Tests streaming the household groceries as a JSON array."""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(b''.join(res.streaming_content)),
+                         self.get_expected())
+
+    def test_export_json_lines(self):
+        """Tests streaming the household groceries as JSON Lines."""
+        for res in (self.client.get(EXPORT_URL, {'format': 'jsonl'}),
+                    self.client.get(EXPORT_URL,
+                                    HTTP_ACCEPT='application/jsonl')):
+            lines = b''.join(res.streaming_content).splitlines()
+
+            self.assertEqual(res['Content-Type'], 'application/jsonl')
+            self.assertEqual([json.loads(line) for line in lines],
+                             self.get_expected())
+
+    def test_export_empty_household(self):
+        """Tests exporting a household without groceries."""
+        Grocery.objects.filter(household=self.user.household).delete()
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(b''.join(res.streaming_content), b'[]')
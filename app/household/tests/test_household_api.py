@@ -1,12 +1,14 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
-from rest_framework.test import APIClient
 
 
 from core.models import Household, Grocery
+from core.tests.query_budgets import QueryBudgetClient
 
 
 HOUSEHOLD_URL = reverse('household:household-list')
@@ -16,6 +18,10 @@ def get_household_detail_url(household_id):
     return reverse('household:household-detail', args=[household_id])
 
 
+def get_household_restock_url(household_id):
+    return reverse('household:household-restock', args=[household_id])
+
+
 def create_sample_household():
     return Household.objects.create(name='Test Household')
 
@@ -33,7 +39,7 @@ class PublicHouseholdApiTests(TestCase):
     """Tests the public household API."""
 
     def setUp(self):
-        self.client = APIClient()
+        self.client = QueryBudgetClient()
 
     def test_get_household_not_successful(self):
         """Tests that getting the household information fails."""
@@ -55,7 +61,7 @@ class PrivateHouseholdApiTests(TestCase):
     """Tests the household API for authenticated users."""
 
     def setUp(self):
-        self.client = APIClient()
+        self.client = QueryBudgetClient()
         self.user = get_user_model().objects.create_user(
             email='test@test.com',
             password='TestPass123',
@@ -106,3 +112,172 @@ class PrivateHouseholdApiTests(TestCase):
             self.user.household.id), payload)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_expand_household_lists(self):
+        """Tests embedding both lists and users in a fixed query count."""
+        household = self.user.household
+        groceries = Grocery.objects.bulk_create([
+            Grocery(name=f'Test Grocery {i}', quantity=i,
+                    household=household) for i in range(1, 21)
+        ])
+        household.grocery_list.set(groceries[:10])
+        household.shopping_list.set(groceries[10:])
+
+        # Household version, household, both lists and the users.
+        with self.assertNumQueries(4):
+            res = self.client.get(
+                get_household_detail_url(household.id),
+                {'expand': 'grocery_list,shopping_list,users'}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['grocery_list']), 10)
+        self.assertEqual(res.data['shopping_list'][0], {
+            'id': groceries[10].id,
+            'name': groceries[10].name,
+            'quantity': groceries[10].quantity,
+            'min_quantity': None,
+        })
+        self.assertEqual(res.data['users'], [{
+            'id': self.user.id,
+            'email': self.user.email,
+            'name': self.user.name,
+        }])
+
+    def test_household_lists_not_expanded_by_default(self):
+        """Tests that lists are returned as primary keys by default."""
+        grocery = Grocery.objects.create(name='Test Grocery', quantity=1,
+                                         household=self.user.household)
+        self.user.household.grocery_list.add(grocery)
+        res = self.client.get(get_household_detail_url(
+            self.user.household.id))
+
+        self.assertEqual(res.data['grocery_list'], [grocery.id])
+        self.assertNotIn('users', res.data)
+
+    def test_expand_unknown_relation_fails(self):
+        """Tests that unknown relations cannot be expanded."""
+        res = self.client.get(HOUSEHOLD_URL, {'expand': 'password'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_put_household_lists_validated_in_bulk(self):
+        """Tests replacing a list validates all ids with one query."""
+        household = self.user.household
+        groceries = Grocery.objects.bulk_create([
+            Grocery(name=f'Test Grocery {i}', quantity=i,
+                    household=household) for i in range(1, 101)
+        ])
+        payload = {
+            'name': household.name,
+            'grocery_list': [grocery.id for grocery in groceries],
+            'shopping_list': [],
+        }
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.put(get_household_detail_url(household.id),
+                                  payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # Independent of the number of submitted ids.
+        self.assertLessEqual(len(context.captured_queries), 15)
+        self.assertEqual(household.grocery_list.count(), 100)
+        self.assertEqual(res.data['grocery_list'],
+                         [grocery.id for grocery in groceries])
+
+    def test_put_household_lists_foreign_ids_fail(self):
+        """Tests that all missing or foreign ids are reported at once."""
+        household = self.user.household
+        own = Grocery.objects.create(name='Test Grocery', quantity=1,
+                                     household=household)
+        other = Grocery.objects.create(
+            name='Other Grocery',
+            quantity=1,
+            household=Household.objects.create(name='Other Household')
+        )
+        payload = {
+            'grocery_list': [own.id, other.id, other.id + 1000],
+        }
+        res = self.client.patch(get_household_detail_url(household.id),
+                                payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(other.id), res.data['grocery_list'][0])
+        self.assertIn(str(other.id + 1000), res.data['grocery_list'][0])
+        self.assertFalse(household.grocery_list.exists())
+
+    def test_put_household_grocery_on_both_lists_fails(self):
+        """Tests that a grocery cannot be put on both lists."""
+        household = self.user.household
+        groceries = Grocery.objects.bulk_create([
+            Grocery(name=f'Test Grocery {i}', quantity=1,
+                    household=household) for i in range(3)
+        ])
+        payload = {
+            'name': household.name,
+            'grocery_list': [groceries[0].id, groceries[1].id],
+            'shopping_list': [groceries[1].id, groceries[2].id],
+        }
+        res = self.client.put(get_household_detail_url(household.id),
+                              payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(groceries[1].id),
+                      res.data['non_field_errors'][0])
+        self.assertFalse(household.grocery_list.exists())
+        self.assertFalse(household.shopping_list.exists())
+
+
+class RestockApiTests(TestCase):
+    """Tests restocking the shopping list from minimum quantities."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='TestPass123',
+            name='Test User',
+            household='Test Household'
+        )
+        self.client = QueryBudgetClient()
+        self.client.force_authenticate(self.user)
+        self.household = self.user.household
+
+    def create_grocery(self, name, quantity, min_quantity=None):
+        return Grocery.objects.create(name=name, quantity=quantity,
+                                      min_quantity=min_quantity,
+                                      household=self.household)
+
+    def test_restock_adds_low_stock_items(self):
+        """Tests that items at or below their minimum are added."""
+        low = self.create_grocery('Milk', 1, min_quantity=2)
+        empty = self.create_grocery('Eggs', 0, min_quantity=0)
+        self.create_grocery('Flour', 3, min_quantity=2)
+        self.create_grocery('Salt', 0)
+        self.household.grocery_list.add(low)
+
+        res = self.client.post(get_household_restock_url(self.household.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'added': [low.id, empty.id]})
+        self.assertEqual(list(self.household.shopping_list.all()),
+                         [low, empty])
+        self.assertFalse(self.household.grocery_list.exists())
+
+    def test_restock_constant_queries(self):
+        """Tests that a restock moves any number of items at once."""
+        Grocery.objects.bulk_create([
+            Grocery(name=f'Test Grocery {i}', quantity=0, min_quantity=1,
+                    household=self.household) for i in range(100)
+        ])
+        # Savepoint, restock, household version and release.
+        with self.assertNumQueries(4):
+            res = self.client.post(
+                get_household_restock_url(self.household.id))
+
+        self.assertEqual(len(res.data['added']), 100)
+
+    def test_restock_other_household_fails(self):
+        """Tests that another household cannot be restocked."""
+        other = Household.objects.create(name='Other Household')
+        res = self.client.post(get_household_restock_url(other.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import LiveServerTestCase, SimpleTestCase, \
+                        override_settings
+
+from household.loadtest import LatencyHistogram, LoadTest, RequestFailed
+
+
+class LatencyHistogramTests(SimpleTestCase):
+    """Tests the load test latency histogram."""
+
+    def test_percentiles(self):
+        """Tests percentiles within a bucket of the exact value."""
+        histogram = LatencyHistogram()
+        other = LatencyHistogram()
+        for ms in range(1, 101):
+            (histogram if ms % 2 else other).add(ms / 1000)
+        histogram.merge(other)
+
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.percentile(50), 0.05, delta=0.006)
+        self.assertAlmostEqual(histogram.percentile(99), 0.099, delta=0.012)
+        self.assertEqual(histogram.percentile(100), 0.1)
+        self.assertIsNone(LatencyHistogram().percentile(50))
+
+
+def broken_flow(client, rng):
+    raise KeyError('token')
+
+
+class LoadTestErrorTests(SimpleTestCase):
+    """Tests that unexpected client errors end up in the results."""
+
+    @patch('household.loadtest.Client.set_up',
+           side_effect=ValueError('not JSON'))
+    def test_setup_error(self, set_up):
+        """Tests that a failed setup fails the run instead of hanging."""
+        load_test = LoadTest('http://127.0.0.1:1', clients=2)
+
+        with self.assertRaisesMessage(RequestFailed, 'ValueError: not JSON'):
+            load_test.run()
+
+    @patch('household.loadtest.Client.set_up')
+    @patch.dict('household.loadtest.FLOWS', {'broken': broken_flow})
+    def test_flow_error(self, set_up):
+        """Tests that a flow raising is counted as failed."""
+        load_test = LoadTest('http://127.0.0.1:1', {'broken': 1}, rate=100,
+                             clients=1, duration=0.2, seed=1)
+        results = load_test.run()
+
+        self.assertGreater(results['flows']['broken']['failed'], 0)
+        self.assertEqual(results['flows']['broken']['last_error'],
+                         "KeyError: 'token'")
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+])
+class LoadTestCommandTests(LiveServerTestCase):
+    """Tests the loadtest command against a live server."""
+
+    def test_loadtest(self):
+        """Tests running every flow and reporting the endpoints."""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command('loadtest', f'--url={self.live_server_url}',
+                         '--rate=50', '--clients=2', '--duration=1',
+                         '--seed=1', f'--output={output}', stdout=StringIO())
+            with open(output) as file:
+                results = json.load(file)
+
+        self.assertGreater(sum(flow['completed']
+                               for flow in results['flows'].values()), 0)
+        self.assertFalse(any(flow['failed']
+                             for flow in results['flows'].values()))
+        self.assertIn('GET /api/household/grocerylist/',
+                      results['endpoints'])
+        endpoint = results['endpoints']['GET /api/household/grocerylist/']
+        self.assertEqual(endpoint['error_rate'], 0)
+        self.assertLessEqual(endpoint['p50_ms'], endpoint['p99_ms'])
+
+    def test_loadtest_unknown_flow_fails(self):
+        """Tests that unknown flows are rejected."""
+        with self.assertRaises(CommandError):
+            call_command('loadtest', f'--url={self.live_server_url}',
+                         '--flow=browse=1', stdout=StringIO())
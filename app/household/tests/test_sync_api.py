@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from rest_framework import status
+
+from core.models import Grocery, Household
+from core.tests.query_budgets import QueryBudgetClient
+
+
+SYNC_URL = reverse('household:sync')
+
+
+def get_grocery_detail_url(grocery_id):
+    return reverse('household:grocery-detail', args=[grocery_id])
+
+
+class PublicSyncApiTests(TestCase):
+    """Tests the publicly available sync API."""
+
+    def test_login_required(self):
+        """Tests that login is required to sync."""
+        res = QueryBudgetClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(HOUSEHOLD_SYNC_CURSOR_LAG=0)
+class PrivateSyncApiTests(TestCase):
+    """Tests the authorized user delta-sync API."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='TestPass123',
+            name='Test User',
+            household='Test Household'
+        )
+        self.client = QueryBudgetClient()
+        self.client.force_authenticate(self.user)
+        self.household = self.user.household
+        self.groceries = [
+            Grocery.objects.create(name=f'Test Grocery {i}', quantity=1,
+                                   household=self.household)
+            for i in range(3)
+        ]
+        self.household.shopping_list.add(self.groceries[0])
+
+    def sync(self, since):
+        return self.client.get(SYNC_URL, {'since': since})
+
+    def test_full_sync(self):
+        """Tests that a sync without cursor returns every grocery."""
+        Grocery.objects.create(
+            name='Other Grocery',
+            quantity=1,
+            household=Household.objects.create(name='Other Household')
+        )
+        res = self.client.get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(item['id'] for item in res.data['groceries']),
+                         [grocery.id for grocery in self.groceries])
+        self.assertEqual(res.data['shopping_list'], [self.groceries[0].id])
+        self.assertEqual(res.data['grocery_list'], [])
+        self.assertEqual(res.data['deleted'], [])
+
+    def test_sync_returns_changes_only(self):
+        """Tests that only changes after the cursor are returned."""
+        cursor = self.client.get(SYNC_URL).data['cursor']
+        moved, deleted, unchanged = self.groceries
+        self.household.grocery_list.add(moved)
+        self.client.delete(get_grocery_detail_url(deleted.id))
+        res = self.sync(cursor)
+
+        self.assertEqual([item['id'] for item in res.data['groceries']],
+                         [moved.id])
+        self.assertEqual(res.data['grocery_list'], [moved.id])
+        self.assertEqual(res.data['shopping_list'], [])
+        self.assertEqual(res.data['deleted'], [deleted.id])
+        self.assertEqual(self.sync(res.data['cursor']).data['groceries'], [])
+
+    def test_sync_cursor_lag(self):
+        """Tests that changes within the lag are sent again."""
+        with self.settings(HOUSEHOLD_SYNC_CURSOR_LAG=60):
+            cursor = self.client.get(SYNC_URL).data['cursor']
+        res = self.sync(cursor)
+
+        self.assertEqual(len(res.data['groceries']), 3)
+
+    def test_sync_bulk_changes(self):
+        """Tests that bulk updates and deletes are tracked."""
+        cursor = self.client.get(SYNC_URL).data['cursor']
+        self.client.patch(reverse('household:grocery-list'), [
+            {'id': self.groceries[0].id, 'quantity': 5},
+        ], format='json')
+        self.client.delete(reverse('household:grocery-list'), [
+            self.groceries[1].id,
+        ], format='json')
+        res = self.sync(cursor)
+
+        self.assertEqual(res.data['groceries'][0]['quantity'], 5)
+        self.assertEqual(res.data['deleted'], [self.groceries[1].id])
+
+    def test_sync_constant_queries(self):
+        """Tests that a sync reads groceries and tombstones once."""
+        since = timezone.now() - timedelta(days=1)
+        cursor = str(int(since.timestamp()) * 10 ** 6)
+        with self.assertNumQueries(2):
+            self.sync(cursor)
+
+    def test_sync_invalid_cursor_fails(self):
+        """Tests that a malformed cursor is rejected."""
+        for cursor in ('abc', '-1', '9' * 30):
+            res = self.sync(cursor)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('since', res.data)
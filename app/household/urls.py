@@ -1,9 +1,9 @@
 from django.urls import path, include
-from rest_framework.routers import DefaultRouter
 
 from household import views
+from household.routers import BulkRouter
 
-router = DefaultRouter()
+router = BulkRouter()
 app_name = 'household'
 
 router.register('household', views.HouseholdViewset)
@@ -14,5 +14,10 @@ router.register('shoppinglist', views.ShoppingListViewSet,
                 basename='shoppinglist')
 
 urlpatterns = [
+    path('cache-stats/', views.ListCacheStatsView.as_view(),
+         name='cache-stats'),
+    path('sync/', views.HouseholdSyncView.as_view(), name='sync'),
+    path('events/ticket/', views.HouseholdEventsTicketView.as_view(),
+         name='events-ticket'),
     path('', include(router.urls))
 ]
@@ -0,0 +1,56 @@
+import threading
+from contextlib import contextmanager
+
+from core.models import Household
+
+
+_pending = threading.local()
+
+
+def household_changed(*household_ids):
+    """Draw a new version for each of the changed households.
+
+    Inside `batch_household_changes()` the households are only recorded
+    and handled once when the block exits.
+    """
+    household_ids = {pk for pk in household_ids if pk is not None}
+    if not household_ids:
+        return
+
+    pending = getattr(_pending, 'household_ids', None)
+    if pending is not None:
+        pending.update(household_ids)
+        return
+
+    Household.objects.filter(id__in=household_ids).update(
+        version=Household.next_version())
+
+
+@contextmanager
+def batch_household_changes():
+    """Collapse the household changes of a block into one UPDATE."""
+    if getattr(_pending, 'household_ids', None) is not None:
+        yield
+        return
+
+    _pending.household_ids = set()
+    try:
+        yield
+    finally:
+        household_ids = _pending.household_ids
+        _pending.household_ids = None
+    household_changed(*household_ids)
+
+
+def get_household_version(household_id):
+    """Return the current version of a household, or None.
+
+    The version is read with one primary key lookup on every request.
+    Caching it would let processes that missed a change serve its old
+    version, and with it a wrong 304.
+    """
+    if household_id is None:
+        return None
+
+    return Household.objects.filter(id=household_id).values_list(
+        'version', flat=True).first()
@@ -1,14 +1,41 @@
-from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from datetime import datetime, timedelta
 
-from core.models import Household, Grocery
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.fields import IntegerField, ListField
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.authentication import CachedTokenAuthentication
+from core.models import Grocery, GroceryTombstone, Household, \
+                        HouseholdList, ListState
 from household import serializers
+from household.cache import list_cache
+from household.events import publish_event
+from household.export import iter_chunks, iter_json, iter_json_lines
+from household.mixins import GroceryCreateMixin, HouseholdETagMixin
+from household.pagination import HouseholdCursorPagination
+from household.renderers import JSONLinesRenderer
+from household.sse import create_ticket
+from household.versions import batch_household_changes, household_changed
 
 
-class HouseholdViewset(viewsets.ModelViewSet, viewsets.GenericViewSet):
+class HouseholdViewset(HouseholdETagMixin,
+                       viewsets.ModelViewSet,
+                       viewsets.GenericViewSet):
     """Viewset for the household."""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     serializer_class = serializers.HouseholdSerializer
     queryset = Household.objects.all()
@@ -26,19 +53,183 @@ class HouseholdViewset(viewsets.ModelViewSet, viewsets.GenericViewSet):
         if assigned_only:
             queryset = queryset.filter(household__isnull=False)
 
+        expand = self.get_expand()
+        queryset = queryset.prefetch_related(self.get_lists_prefetch())
+        if 'users' in expand:
+            queryset = queryset.prefetch_related(Prefetch(
+                'user_set',
+                queryset=get_user_model().objects.order_by('id')
+            ))
+
         return queryset.filter(user=self.request.user)
 
+    def perform_create(self, serializer):
+        with batch_household_changes():
+            household = serializer.save()
+        prefetch_related_objects([household], self.get_lists_prefetch())
+
+    def perform_update(self, serializer):
+        """Save the household, bumping its version once.
+
+        The lists moved by the update are fetched again with one query.
+        """
+        with batch_household_changes():
+            household = serializer.save()
+        prefetch_related_objects([household], self.get_lists_prefetch())
+
+    def perform_destroy(self, instance):
+        """Delete the household, bumping its version once.
+
+        Each deleted grocery would otherwise bump it in a post_delete
+        signal.
+        """
+        with batch_household_changes():
+            instance.delete()
+
+    @action(detail=True, methods=['post'])
+    def restock(self, request, pk=None):
+        """Move every grocery at or below its minimum to the shopping list."""
+        household = request.user.household
+        if household is None or str(household.pk) != pk:
+            raise NotFound()
 
-class GroceryViewSet(viewsets.ModelViewSet):
+        with transaction.atomic():
+            added = household.shopping_list.add_low_stock()
+
+        return Response({'added': sorted(added)})
+
+    def get_expand(self):
+        """Return the relations to expand for a read request."""
+        expand = self.request.query_params.get('expand')
+        if not expand or self.request.method not in ('GET', 'HEAD'):
+            return set()
+
+        expand = set(expand.split(','))
+        unknown = expand.difference(
+            serializers.HouseholdSerializer.expandable_fields)
+        if unknown:
+            raise ValidationError({'expand': [
+                _('Unknown relation "{name}".').format(name=name)
+                for name in sorted(unknown)
+            ]})
+
+        return expand
+
+    def get_lists_prefetch(self):
+        """Prefetch the lists, only by id unless they are expanded."""
+        expand = self.get_expand()
+        groceries = Grocery.objects.order_by('id')
+        if 'grocery_list' not in expand and 'shopping_list' not in expand:
+            groceries = groceries.only('id', 'household_id', 'state')
+        return HouseholdList.prefetch(groceries)
+
+    def get_serializer_context(self):
+        """Pass the expanded relations to the serializer."""
+        context = super().get_serializer_context()
+        context['expand'] = self.get_expand()
+        return context
+
+
+class GroceryViewSet(HouseholdETagMixin,
+                     GroceryCreateMixin,
+                     viewsets.ModelViewSet):
     """Viewset for grocery item."""
     queryset = Grocery.objects.all()
     serializer_class = serializers.GrocerySerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = HouseholdCursorPagination
+    lookup_value_regex = '[0-9]+'
 
     def perform_create(self, serializer):
         """Save grocery in user household."""
-        serializer.save(household=self.request.user.household)
+        self.save_groceries(serializer)
+
+    @transaction.atomic
+    def bulk_partial_update(self, request, *args, **kwargs):
+        """Partially update a list of groceries in one transaction."""
+        serializer = self.get_serializer(self.get_queryset(),
+                                         data=request.data,
+                                         many=True,
+                                         partial=True)
+        serializer.is_valid(raise_exception=True)
+        groceries = serializer.save()
+        household_id = self.request.user.household_id
+        household_changed(household_id)
+        publish_event(household_id, 'grocery', 'updated',
+                      [grocery.id for grocery in groceries])
+
+        return Response(serializer.data)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        self.delete_groceries([instance.pk])
+
+    @transaction.atomic
+    def bulk_destroy(self, request, *args, **kwargs):
+        """Delete a list of groceries by id with a single DELETE."""
+        ids = ListField(
+            child=IntegerField(min_value=1),
+            max_length=settings.GROCERY_BULK_MAX_BATCH_SIZE
+        ).run_validation(request.data)
+        deleted = set(self.delete_groceries(ids))
+
+        return Response(
+            [{'id': pk, 'deleted': pk in deleted} for pk in ids],
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=True, methods=['post'],
+            serializer_class=serializers.GroceryAdjustSerializer)
+    def adjust(self, request, pk=None):
+        """Atomically add a signed delta to the grocery quantity."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        pk = int(pk)
+        household_id = request.user.household_id
+        quantity = Grocery.objects.adjust_quantity(
+            pk, household_id, serializer.validated_data['delta'])
+        if quantity is None:
+            raise NotFound()
+
+        household_changed(household_id)
+        publish_event(household_id, 'grocery', 'updated', [pk])
+
+        return Response({'id': pk, 'quantity': quantity})
+
+    @action(detail=False, methods=['get'],
+            renderer_classes=(JSONRenderer, JSONLinesRenderer))
+    def export(self, request):
+        """Stream every grocery of the household as JSON or JSON Lines.
+
+        Rows are read through a server-side cursor and written as they
+        are encoded, so memory use does not grow with the household.
+        """
+        chunk_size = settings.GROCERY_EXPORT_CHUNK_SIZE
+        rows = self.get_queryset().order_by('id').values(
+            *serializers.GrocerySerializer.Meta.fields
+        ).iterator(chunk_size=chunk_size)
+        renderer = request.accepted_renderer
+        if renderer.format == JSONLinesRenderer.format:
+            pieces = iter_json_lines(rows)
+        else:
+            pieces = iter_json(rows)
+
+        response = StreamingHttpResponse(iter_chunks(pieces, chunk_size),
+                                         content_type=renderer.media_type)
+        response['Content-Disposition'] = \
+            f'attachment; filename="groceries.{renderer.format}"'
+        return response
+
+    def delete_groceries(self, ids):
+        """Delete groceries, leaving tombstones for delta syncs."""
+        household_id = self.request.user.household_id
+        deleted = Grocery.objects.delete_recorded(household_id, ids)
+        if deleted:
+            household_changed(household_id)
+            publish_event(household_id, 'grocery', 'deleted', deleted)
+
+        return deleted
 
     def get_queryset(self):
         """Return only groceries in user household."""
@@ -46,49 +237,178 @@ class GroceryViewSet(viewsets.ModelViewSet):
         return self.queryset.filter(household=household)
 
 
-class GroceryListViewSet(viewsets.GenericViewSet,
-                         mixins.ListModelMixin,
-                         mixins.CreateModelMixin):
-    authentication_classes = (TokenAuthentication,)
+class BaseHouseholdListViewSet(HouseholdETagMixin,
+                               GroceryCreateMixin,
+                               viewsets.GenericViewSet,
+                               mixins.ListModelMixin,
+                               mixins.CreateModelMixin):
+    """Base viewset for the grocery and shopping lists of a household."""
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
-    serializer_class = serializers.GroceryListSerializer
+    pagination_class = HouseholdCursorPagination
+    # Name of the `Household` list, also naming its `ListState`.
+    list_field = None
+
+    def get_state(self):
+        return ListState[self.list_field.upper()]
 
     def get_queryset(self):
         """Return objects for the current authenticated user only."""
-        household = self.request.user.household
-        queryset = Household.objects.filter(name=household.name)
-        return queryset[0].grocery_list
+        return Grocery.objects.filter(
+            household_id=self.request.user.household_id,
+            state=self.get_state()
+        )
+
+    def list(self, request, *args, **kwargs):
+        """Serve the unpaginated list from the household list cache."""
+        if self.paginator.page_requested(request):
+            return super().list(request, *args, **kwargs)
+
+        household_id = request.user.household_id
+        version = self.household_version
+        if version is None:
+            return super().list(request, *args, **kwargs)
+
+        data = list_cache.get(household_id, version, self.list_field)
+        if data is None:
+            response = super().list(request, *args, **kwargs)
+            list_cache.set(household_id, version, self.list_field,
+                           list(response.data))
+            return response
+
+        return Response(data)
 
     def perform_create(self, serializer):
-        """Create a new item in grocery list."""
-        household = Household.objects.filter(
-            name=self.request.user.household.name)[0]
-        grocery = Grocery.objects.create(**serializer.validated_data,
-                                         household=household)
-        household.grocery_list.add(grocery)
-        household.save()
-        serializer.save(household=self.request.user.household)
-
-
-class ShoppingListViewSet(viewsets.GenericViewSet,
-                          mixins.ListModelMixin,
-                          mixins.CreateModelMixin):
-    authentication_classes = (TokenAuthentication,)
-    permission_classes = (IsAuthenticated,)
+        """Create the items on the list with a single INSERT.
+
+        Upserts announce the groceries they move onto the list, and off
+        another one, themselves.
+        """
+        household_id = self.request.user.household_id
+        groceries = self.save_groceries(serializer, state=self.get_state())
+        if not serializer.context['upsert']:
+            household_changed(household_id)
+            publish_event(household_id, self.list_field, 'add',
+                          [grocery.id for grocery in groceries])
+
+
+class GroceryListViewSet(BaseHouseholdListViewSet):
+    serializer_class = serializers.GroceryListSerializer
+    list_field = 'grocery_list'
+
+
+class ShoppingListViewSet(BaseHouseholdListViewSet):
     serializer_class = serializers.ShoppingListSerializer
+    list_field = 'shopping_list'
 
-    def get_queryset(self):
-        """Return objects for the current authenticated user only."""
-        household = self.request.user.household
-        queryset = Household.objects.filter(name=household.name)
-        return queryset[0].shopping_list
+    @action(detail=False, methods=['post'])
+    def checkout(self, request):
+        """Move bought items to the grocery list and add the quantities."""
+        items = ListField(
+            child=serializers.CheckoutItemSerializer(),
+            allow_empty=False,
+            max_length=settings.GROCERY_BULK_MAX_BATCH_SIZE
+        ).run_validation(request.data)
+        bought = {item['id']: item['quantity'] for item in items}
+        if len(bought) != len(items):
+            raise ValidationError({'id': [_('Duplicate pk.')]})
 
-    def perform_create(self, serializer):
-        """Create a new item in shopping list."""
-        household = Household.objects.filter(
-            name=self.request.user.household.name)[0]
-        grocery = Grocery.objects.create(**serializer.validated_data,
-                                         household=household)
-        household.shopping_list.add(grocery)
-        household.save()
-        serializer.save(household=self.request.user.household)
+        household_id = request.user.household_id
+        with transaction.atomic():
+            moved = {grocery.id: grocery for grocery in
+                     Grocery.objects.checkout(household_id, bought)}
+            if moved:
+                household_changed(household_id)
+                for event, action_name in (('shopping_list', 'remove'),
+                                           ('grocery_list', 'add'),
+                                           ('grocery', 'updated')):
+                    publish_event(household_id, event, action_name,
+                                  list(moved))
+
+        return Response([
+            {'id': pk, 'moved': True, 'quantity': moved[pk].quantity}
+            if pk in moved else {'id': pk, 'moved': False}
+            for pk in bought
+        ])
+
+
+class HouseholdEventsTicketView(APIView):
+    """Short-lived ticket to open the event stream from a browser."""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        return Response({
+            'ticket': create_ticket(request.user),
+            'expires_in': settings.HOUSEHOLD_EVENTS_TICKET_MAX_AGE,
+        }, status=status.HTTP_201_CREATED)
+
+
+class ListCacheStatsView(APIView):
+    """Hit and miss counters of the household list cache."""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        return Response(list_cache.stats())
+
+
+SYNC_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class HouseholdSyncView(APIView):
+    """Changes to the household groceries and lists since a cursor.
+
+    Without `since` every grocery is returned. Otherwise only groceries
+    changed after the cursor are, each listed in `grocery_list` or
+    `shopping_list` if it is on that list, and deleted groceries by id.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        since = self.get_since(request)
+        household_id = request.user.household_id
+        # Taken before reading, and trailing the clock, so no change is
+        # missed by the next sync; some are sent twice instead.
+        cursor = timezone.now() - timedelta(
+            seconds=settings.HOUSEHOLD_SYNC_CURSOR_LAG)
+
+        groceries = Grocery.objects.filter(household_id=household_id)
+        deleted = []
+        if since is not None:
+            groceries = groceries.filter(updated_at__gt=since)
+            deleted = GroceryTombstone.objects.filter(
+                household_id=household_id,
+                deleted_at__gt=since
+            ).values_list('grocery_id', flat=True)
+        groceries = list(groceries.order_by('updated_at', 'id'))
+
+        data = {
+            'cursor': self.format_cursor(cursor),
+            'groceries': serializers.GrocerySerializer(groceries,
+                                                       many=True).data,
+            'deleted': sorted(deleted),
+        }
+        for state in (ListState.GROCERY_LIST, ListState.SHOPPING_LIST):
+            data[state.name.lower()] = [grocery.id for grocery in groceries
+                                        if grocery.state == state]
+
+        return Response(data)
+
+    def get_since(self, request):
+        """Parse the `since` cursor, in microseconds since the epoch."""
+        since = request.query_params.get('since')
+        if since is None:
+            return None
+
+        try:
+            since = IntegerField(min_value=0).run_validation(since)
+            return SYNC_EPOCH + timedelta(microseconds=since)
+        except ValidationError as exc:
+            raise ValidationError({'since': exc.detail})
+        except OverflowError:
+            raise ValidationError({'since': [_('Invalid cursor.')]})
+
+    def format_cursor(self, value):
+        return str((value - SYNC_EPOCH) // timedelta(microseconds=1))
@@ -3,7 +3,9 @@ from django.test import TestCase
 from django.urls import reverse
 
 from rest_framework import status
-from rest_framework.test import APIClient
+
+from core.models import Household
+from core.tests.query_budgets import QueryBudgetClient
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
@@ -18,7 +20,7 @@ class PublicUserApiTests(TestCase):
     """Tests the public user API."""
 
     def setUp(self):
-        self.client = APIClient()
+        self.client = QueryBudgetClient()
 
     def test_create_valid_user_success(self):
         """Tests that creating user with valid data is successful."""
@@ -34,6 +36,21 @@ class PublicUserApiTests(TestCase):
         self.assertTrue(user.check_password(payload['password']))
         self.assertNotIn('password', res.data)
 
+    def test_create_user_in_household(self):
+        """Tests creating a user in an existing household by id."""
+        household = Household.objects.create(name='Test Household')
+        payload = {
+            'email': 'test@test.com',
+            'password': 'TestPass123',
+            'name': 'Test User',
+            'household': household.id
+        }
+        res = self.client.post(CREATE_USER_URL, payload)
+        user = get_user_model().objects.get(email=payload['email'])
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(user.household, household)
+
     def test_create_duplicate_user_fails(self):
         """Tests that creating a duplicate user fails."""
         payload = {
@@ -120,7 +137,7 @@ class PrivateUserApiTests(TestCase):
     """Tests the authenticated user API."""
 
     def setUp(self):
-        self.client = APIClient()
+        self.client = QueryBudgetClient()
         self.user = create_user(
             email='test@test.com',
             password='TestPass123',
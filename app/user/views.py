@@ -1,7 +1,9 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from core.authentication import CachedTokenAuthentication
+
 from .serializers import UserSerializer, AuthTokenSerializer
 
 
@@ -19,7 +21,7 @@ class CreateTokenView(ObtainAuthToken):
 class ManageUserViews(generics.RetrieveUpdateAPIView):
     """Manage authenticated users."""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):